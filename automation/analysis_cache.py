@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+ResLibs 文件分析缓存
+按 文件内容哈希 + 文件类型 + 提取器版本 + 提取参数 持久化元数据提取结果（MIME 类型、压缩包清单、
+文件头探测结果和预览图），同一文件再次出现（含改名后重复上传）时直接读取，不再解析文件
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+
+
+class AnalysisCache:
+    """元数据提取结果的本地持久化缓存（SQLite，预览图以 BLOB 保存）"""
+
+    # 每写入多少条执行一次淘汰
+    EVICT_INTERVAL = 100
+
+    def __init__(
+        self,
+        db_path: str = "./data/analysis_cache.db",
+        max_entries: int = 20000,
+        max_age_days: int = 180,
+        failure_ttl_hours: float = 24.0
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.failure_ttl_hours = failure_ttl_hours
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self._create_tables()
+        self.evict()
+
+    def _create_tables(self):
+        """创建缓存表"""
+        with self._lock:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,  -- md5:... / sha256:... / sample:大小:...
+                    filename TEXT,
+                    file_type TEXT NOT NULL,
+                    metadata TEXT NOT NULL,  -- JSON 字符串
+                    warnings TEXT,  -- JSON 字符串
+                    failed INTEGER DEFAULT 0,  -- 超时或进程崩溃，按 failure_ttl_hours 过期
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+            ''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_previews (
+                    cache_key TEXT NOT NULL REFERENCES analysis_cache(cache_key) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    extension TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (cache_key, position)
+                )
+            ''')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_analysis_cache_digest ON analysis_cache(digest)'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache(last_accessed)'
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def make_key(digest: str, file_type: str, extractor_version: int, options_key: str) -> str:
+        """组合缓存键"""
+        raw = "\x1f".join([digest, file_type, str(extractor_version), options_key])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存，命中时更新访问时间；失败记录超过 failure_ttl_hours 视为未命中
+
+        Returns:
+            {"metadata", "warnings", "failed", "previews": [(扩展名, 内容)]}，未命中返回 None
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT metadata, warnings, failed, created_at FROM analysis_cache WHERE cache_key = ?',
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[2] and time.time() - row[3] > self.failure_ttl_hours * 3600:
+                return None
+
+            previews = self.connection.execute(
+                'SELECT extension, data FROM analysis_previews WHERE cache_key = ? ORDER BY position',
+                (cache_key,)
+            ).fetchall()
+            self.connection.execute(
+                'UPDATE analysis_cache SET last_accessed = ?, hits = hits + 1 WHERE cache_key = ?',
+                (time.time(), cache_key)
+            )
+            self.connection.commit()
+
+        return {
+            "metadata": json.loads(row[0]),
+            "warnings": json.loads(row[1]) if row[1] else [],
+            "failed": bool(row[2]),
+            "previews": [(extension, bytes(data)) for extension, data in previews]
+        }
+
+    def put(
+        self,
+        cache_key: str,
+        digest: str,
+        filename: str,
+        file_type: str,
+        metadata: Dict[str, Any],
+        warnings: List[str],
+        preview_images: List[str],
+        failed: bool = False
+    ):
+        """写入缓存，预览图读入数据库（原文件处理完后会被清理）"""
+        previews: List[Tuple[int, str, bytes]] = []
+        for position, image_path in enumerate(preview_images):
+            try:
+                previews.append((position, Path(image_path).suffix, Path(image_path).read_bytes()))
+            except OSError:
+                continue
+
+        now = time.time()
+        with self._lock:
+            self.connection.execute('DELETE FROM analysis_cache WHERE cache_key = ?', (cache_key,))
+            self.connection.execute('''
+                INSERT INTO analysis_cache (
+                    cache_key, digest, filename, file_type, metadata, warnings,
+                    failed, created_at, last_accessed, hits
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (
+                cache_key, digest, filename, file_type,
+                json.dumps(metadata, ensure_ascii=False), json.dumps(warnings, ensure_ascii=False),
+                int(failed), now, now
+            ))
+            self.connection.executemany(
+                'INSERT INTO analysis_previews (cache_key, position, extension, data) VALUES (?, ?, ?, ?)',
+                [(cache_key, position, extension, data) for position, extension, data in previews]
+            )
+            self.connection.commit()
+            self._puts_since_evict += 1
+
+        if self._puts_since_evict >= self.EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self) -> int:
+        """淘汰过期条目，并按最近访问时间（LRU）裁剪到容量上限"""
+        with self._lock:
+            self._puts_since_evict = 0
+            removed = 0
+
+            if self.max_age_days > 0:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self.connection.execute(
+                    'DELETE FROM analysis_cache WHERE last_accessed < ?', (cutoff,)
+                ).rowcount
+
+            removed += self.connection.execute(
+                'DELETE FROM analysis_cache WHERE failed = 1 AND created_at < ?',
+                (time.time() - self.failure_ttl_hours * 3600,)
+            ).rowcount
+
+            if self.max_entries > 0:
+                removed += self.connection.execute('''
+                    DELETE FROM analysis_cache WHERE cache_key IN (
+                        SELECT cache_key FROM analysis_cache
+                        ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,)).rowcount
+
+            self.connection.commit()
+            return removed
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """
+        清除缓存
+
+        Args:
+            key: 文件哈希（可省略 md5: / sha256: / sample:大小: 前缀）或文件名，为空表示全部清除
+
+        Returns:
+            清除的条目数
+        """
+        sql = 'DELETE FROM analysis_cache'
+        params: List[str] = []
+        if key:
+            sql += ' WHERE digest = ? OR digest LIKE ? OR filename = ?'
+            params = [key, f"%:{key}", key]
+
+        with self._lock:
+            removed = self.connection.execute(sql, params).rowcount
+            self.connection.commit()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(failed), 0) FROM analysis_cache'
+            ).fetchone()
+        return {'entries': row[0], 'total_hits': row[1], 'failed_entries': row[2]}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+ResLibs 压缩包检查器
+只读取目录/头部信息列出压缩包内容（zip 中央目录、7z 头、rar 块头、tar 成员），不解压到磁盘
+"""
+
+import gzip
+import hashlib
+import struct
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+try:
+    import py7zr
+    import py7zr.exceptions
+    try:
+        import py7zr.io  # py7zr 1.x
+    except ImportError:
+        pass
+    PY7ZR_AVAILABLE = True
+except ImportError:
+    PY7ZR_AVAILABLE = False
+
+try:
+    import rarfile
+    RARFILE_AVAILABLE = True
+except ImportError:
+    RARFILE_AVAILABLE = False
+
+
+# 可列出内容的压缩包扩展名
+ARCHIVE_EXTENSIONS = frozenset({
+    ".zip", ".rar", ".7z", ".tar", ".gz", ".tgz", ".tar.gz", ".bz2", ".tbz2", ".xz", ".txz"
+})
+
+_RAR4_SIGNATURE = b"Rar!\x1a\x07\x00"
+_RAR5_SIGNATURE = b"Rar!\x1a\x07\x01\x00"
+_7Z_SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+
+_TAR_FORMAT_NAMES = {"tar": "tar", "gzip": "tar.gz", "bzip2": "tar.bz2", "xz": "tar.xz"}
+
+
+class ArchiveError(Exception):
+    """压缩包无法识别或头部损坏"""
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """压缩包中的一个条目"""
+    name: str
+    size: int  # 解压后大小
+    compressed_size: int = 0
+    is_dir: bool = False
+
+
+@dataclass
+class ArchiveListing:
+    """压缩包内容清单"""
+    format: str
+    entries: List[ArchiveEntry] = field(default_factory=list)
+    encrypted: bool = False  # 头部加密，无法列出文件名
+
+    @property
+    def files(self) -> List[ArchiveEntry]:
+        return [entry for entry in self.entries if not entry.is_dir]
+
+    @property
+    def file_count(self) -> int:
+        return sum(1 for entry in self.entries if not entry.is_dir)
+
+    @property
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.entries if not entry.is_dir)
+
+
+def detect_format(header: bytes) -> Optional[str]:
+    """根据文件头判断压缩格式"""
+    if header.startswith((b"PK\x03\x04", b"PK\x05\x06", b"PK\x07\x08")):
+        return "zip"
+    if header.startswith(_7Z_SIGNATURE):
+        return "7z"
+    if header.startswith(_RAR5_SIGNATURE):
+        return "rar5"
+    if header.startswith(_RAR4_SIGNATURE):
+        return "rar4"
+    if header.startswith(b"\x1f\x8b"):
+        return "gzip"
+    if header.startswith(b"BZh"):
+        return "bzip2"
+    if header.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    if header[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+def list_archive(path: str) -> ArchiveListing:
+    """
+    列出压缩包内容（阻塞调用，应在线程池中执行）
+
+    zip / 7z / rar / 未压缩 tar 只读取头部，随机访问；
+    gz / bz2 / xz 封装的 tar 需要顺序解压一遍数据流，但不写磁盘、内存占用恒定。
+    """
+    with open(path, "rb") as f:
+        header = f.read(512)
+
+    archive_format = detect_format(header)
+    if archive_format == "zip":
+        return _list_zip(path)
+    if archive_format == "7z":
+        return _list_7z(path)
+    if archive_format in ("rar4", "rar5"):
+        return _list_rar(path, archive_format)
+    if archive_format in ("tar", "gzip", "bzip2", "xz"):
+        return _list_tar(path, archive_format)
+    raise ArchiveError(f"无法识别的压缩格式: {Path(path).name}")
+
+
+def _list_zip(path: str) -> ArchiveListing:
+    """读取 zip 中央目录"""
+    with zipfile.ZipFile(path) as archive:
+        entries = [
+            ArchiveEntry(info.filename, info.file_size, info.compress_size, info.is_dir())
+            for info in archive.infolist()
+        ]
+    return ArchiveListing("zip", entries)
+
+
+def _list_7z(path: str) -> ArchiveListing:
+    """读取 7z 头部"""
+    if not PY7ZR_AVAILABLE:
+        raise ArchiveError("py7zr 未安装，无法读取 7z 文件")
+
+    try:
+        with py7zr.SevenZipFile(path, mode="r") as archive:
+            entries = [
+                ArchiveEntry(info.filename, info.uncompressed or 0, info.compressed or 0, info.is_directory)
+                for info in archive.list()
+            ]
+    except py7zr.exceptions.PasswordRequired:
+        # 头部加密的 7z 没有密码无法列出文件名
+        return ArchiveListing("7z", encrypted=True)
+    return ArchiveListing("7z", entries)
+
+
+def _list_tar(path: str, archive_format: str) -> ArchiveListing:
+    """
+    遍历 tar 成员：未压缩的 tar 按成员头逐个 seek，只读头部；
+    压缩的 tar 无法随机访问，以流式模式顺序解压，成员数据被跳过而不缓存
+    """
+    if archive_format == "gzip" and not _is_gzipped_tar(path):
+        return _list_single_gzip(path)
+
+    entries = []
+    with tarfile.open(path, mode="r:" if archive_format == "tar" else "r|*") as archive:
+        for member in archive:
+            entries.append(ArchiveEntry(member.name, member.size, 0, member.isdir()))
+    return ArchiveListing(_TAR_FORMAT_NAMES[archive_format], entries)
+
+
+def _is_gzipped_tar(path: str) -> bool:
+    """gzip 内是否为 tar（只解压第一个块）"""
+    try:
+        with gzip.open(path, "rb") as f:
+            block = f.read(512)
+        return block[257:262] == b"ustar"
+    except (OSError, EOFError):
+        return False
+
+
+def _list_single_gzip(path: str) -> ArchiveListing:
+    """单文件 gzip：文件名取自文件名去掉 .gz，大小取自尾部 ISIZE（模 4GB）"""
+    with open(path, "rb") as f:
+        f.seek(-4, 2)
+        size = struct.unpack("<I", f.read(4))[0]
+    name = Path(path).name
+    if name.lower().endswith(".gz"):
+        name = name[:-3]
+    return ArchiveListing("gzip", [ArchiveEntry(name, size, Path(path).stat().st_size)])
+
+
+def _list_rar(path: str, archive_format: str) -> ArchiveListing:
+    """读取 rar 块头，优先使用 rarfile，未安装时使用内置解析器"""
+    if RARFILE_AVAILABLE:
+        try:
+            with rarfile.RarFile(path) as archive:
+                entries = [
+                    ArchiveEntry(info.filename, info.file_size, info.compress_size, info.is_dir())
+                    for info in archive.infolist()
+                ]
+            return ArchiveListing("rar", entries)
+        except rarfile.NeedFirstVolume:
+            raise ArchiveError("分卷 rar 需要从第一卷开始读取")
+        except rarfile.PasswordRequired:
+            return ArchiveListing("rar", encrypted=True)
+
+    with open(path, "rb") as f:
+        if archive_format == "rar5":
+            return _parse_rar5(f)
+        return _parse_rar4(f)
+
+
+def _parse_rar4(f: BinaryIO) -> ArchiveListing:
+    """解析 RAR 1.5-4.x 块头"""
+    listing = ArchiveListing("rar")
+    position = len(_RAR4_SIGNATURE)
+    file_size = f.seek(0, 2)
+
+    while position + 7 <= file_size:
+        f.seek(position)
+        block = f.read(7)
+        if len(block) < 7:
+            break
+        _, head_type, flags, head_size = struct.unpack("<HBHH", block)
+        if head_size < 7:
+            raise ArchiveError("rar 块头损坏")
+
+        add_size = 0
+        if head_type == 0x73:  # 主头
+            if flags & 0x0080:
+                listing.encrypted = True
+                break
+        elif head_type == 0x74:  # 文件头
+            fields = f.read(25)
+            if len(fields) < 25:
+                break
+            pack_size, unpack_size = struct.unpack("<II", fields[:8])
+            name_size = struct.unpack("<H", fields[19:21])[0]
+            if flags & 0x0100:
+                high_pack, high_unpack = struct.unpack("<II", f.read(8))
+                pack_size |= high_pack << 32
+                unpack_size |= high_unpack << 32
+            name = _decode_rar4_name(f.read(name_size), flags)
+            is_dir = (flags & 0x00E0) == 0x00E0
+            listing.entries.append(ArchiveEntry(name, unpack_size, pack_size, is_dir))
+            add_size = pack_size
+        elif head_type == 0x7B:  # 结束块
+            break
+        elif flags & 0x8000:
+            add_size = struct.unpack("<I", f.read(4))[0]
+
+        position += head_size + add_size
+
+    return listing
+
+
+def _decode_rar4_name(raw: bytes, flags: int) -> str:
+    """RAR4 文件名：带 Unicode 标志时前半部分为 OEM 名称，取 0 字节之前的部分兜底"""
+    if flags & 0x0200 and b"\x00" in raw:
+        raw = raw.split(b"\x00", 1)[0]
+    for encoding in ("utf-8", "gbk"):
+        try:
+            return raw.decode(encoding).replace("\\", "/")
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("latin-1").replace("\\", "/")
+
+
+def _read_vint(data: bytes, offset: int) -> Tuple[int, int]:
+    """读取 RAR5 变长整数，返回 (值, 新偏移)"""
+    value = 0
+    shift = 0
+    while offset < len(data):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+    raise ArchiveError("rar5 变长整数越界")
+
+
+def _parse_rar5(f: BinaryIO) -> ArchiveListing:
+    """解析 RAR5 块头"""
+    listing = ArchiveListing("rar")
+    position = len(_RAR5_SIGNATURE)
+    file_size = f.seek(0, 2)
+
+    while position + 7 <= file_size:
+        f.seek(position + 4)  # 跳过 CRC32
+        size_bytes = f.read(3)
+        header_size, consumed = _read_vint(size_bytes + b"\x00", 0)
+        header_start = position + 4 + consumed
+        f.seek(header_start)
+        header = f.read(header_size)
+        if len(header) < header_size:
+            break
+
+        header_type, offset = _read_vint(header, 0)
+        header_flags, offset = _read_vint(header, offset)
+        if header_flags & 0x0001:
+            _, offset = _read_vint(header, offset)  # 扩展区大小
+        data_size = 0
+        if header_flags & 0x0002:
+            data_size, offset = _read_vint(header, offset)
+
+        if header_type == 4:  # 加密头，之后的块头都已加密
+            listing.encrypted = True
+            break
+        if header_type == 5:  # 结束块
+            break
+        if header_type == 2:  # 文件头
+            file_flags, offset = _read_vint(header, offset)
+            unpack_size, offset = _read_vint(header, offset)
+            _, offset = _read_vint(header, offset)  # 属性
+            if file_flags & 0x0002:
+                offset += 4  # 修改时间
+            if file_flags & 0x0004:
+                offset += 4  # 数据 CRC32
+            _, offset = _read_vint(header, offset)  # 压缩信息
+            _, offset = _read_vint(header, offset)  # 主机系统
+            name_length, offset = _read_vint(header, offset)
+            name = header[offset:offset + name_length].decode("utf-8", errors="replace")
+            listing.entries.append(ArchiveEntry(name, unpack_size, data_size, bool(file_flags & 0x0001)))
+
+        position = header_start + header_size + data_size
+
+    return listing
+
+
+# 预览图候选
+PREVIEW_IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".webp", ".gif"})
+PREVIEW_MIN_BYTES = 20 * 1024  # 过小的多为图标或 UI 贴图
+PREVIEW_MAX_BYTES = 5 * 1024 * 1024
+
+# 文件名/目录关键词 -> 权重
+_PREVIEW_KEYWORDS = (
+    ("screenshot", 3), ("screen_shot", 3), ("截图", 3),
+    ("preview", 3), ("预览", 3),
+    ("cover", 2), ("封面", 2), ("banner", 2), ("promo", 2), ("showcase", 2), ("keyart", 2),
+    ("thumb", 1), ("poster", 1)
+)
+
+# 明显是贴图而非展示图的名称片段
+_TEXTURE_HINTS = ("normal", "albedo", "diffuse", "roughness", "metallic", "specular", "_ao", "mask", "icon", "sprite")
+
+# 支持按成员随机读取的格式（压缩 tar 只能顺序读取，不参与）
+_RANDOM_ACCESS_FORMATS = frozenset({"zip", "7z", "rar", "tar"})
+
+
+def _preview_score(name: str) -> int:
+    """预览图得分，0 表示不是预览图"""
+    lowered = name.lower()
+    if Path(lowered).suffix not in PREVIEW_IMAGE_EXTENSIONS:
+        return 0
+    if any(hint in Path(lowered).name for hint in _TEXTURE_HINTS):
+        return 0
+
+    score = sum(weight for keyword, weight in _PREVIEW_KEYWORDS if keyword in lowered)
+    if score:
+        return score
+    # 没有关键词时，只接受位于压缩包根目录（或唯一顶层目录下）的图片
+    return 1 if lowered.count("/") <= 1 else 0
+
+
+def rank_previews(listing: ArchiveListing, limit: int = 5) -> List[ArchiveEntry]:
+    """按名称关键词和大小挑选最可能是预览图的条目"""
+    candidates = []
+    for entry in listing.files:
+        if not PREVIEW_MIN_BYTES <= entry.size <= PREVIEW_MAX_BYTES:
+            continue
+        score = _preview_score(entry.name)
+        if score:
+            candidates.append((score, entry.size, entry))
+    candidates.sort(key=lambda item: (-item[0], -item[1]))
+    return [entry for _, _, entry in candidates[:limit]]
+
+
+def preview_prefix(path: str) -> str:
+    """
+    预览图文件名前缀（取自文件名，只保留安全字符）
+
+    预览图共用一个目录，并发处理的同名资源（如 demo.zip 与 demo.unitypackage）需要区分，
+    因此附加完整路径的短哈希
+    """
+    stem = "".join(c for c in Path(path).stem if c.isalnum() or c in "._-") or "archive"
+    suffix = hashlib.sha1(str(Path(path).resolve()).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{suffix}"
+
+
+def extract_previews(path: str, listing: ArchiveListing, dest_dir: str, limit: int = 5) -> List[str]:
+    """
+    按成员随机读取预览图并写入目标目录（阻塞调用，应在线程池中执行）
+
+    Returns:
+        保存的图片路径列表，按推荐顺序排列
+    """
+    if listing.encrypted or listing.format not in _RANDOM_ACCESS_FORMATS:
+        return []
+    entries = rank_previews(listing, limit)
+    if not entries:
+        return []
+
+    data = _read_members(path, listing.format, [entry.name for entry in entries])
+
+    output_dir = Path(dest_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefix = preview_prefix(path)
+    saved = []
+    for index, entry in enumerate(entries, 1):
+        content = data.get(entry.name)
+        if not content:
+            continue
+        target = output_dir / f"{prefix}_preview_{index}{Path(entry.name).suffix.lower()}"
+        target.write_bytes(content)
+        saved.append(str(target))
+    return saved
+
+
+def _read_members(path: str, archive_format: str, names: List[str], limit: int = PREVIEW_MAX_BYTES) -> dict:
+    """读取指定成员的内容（7z 每个成员最多保留约 limit 字节）"""
+    if archive_format == "zip":
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in names}
+
+    if archive_format == "tar":
+        with tarfile.open(path, mode="r:") as archive:
+            return {name: archive.extractfile(name).read() for name in names}
+
+    if archive_format == "7z":
+        if not PY7ZR_AVAILABLE:
+            return {}
+        with py7zr.SevenZipFile(path, mode="r") as archive:
+            if hasattr(archive, "read"):
+                # py7zr 0.x
+                return {name: stream.read() for name, stream in archive.read(targets=names).items()}
+            # py7zr 1.x 移除了 read()，改为解压到内存写入器
+            factory = py7zr.io.BytesIOFactory(limit)
+            archive.extract(targets=names, factory=factory)
+            data = {}
+            for name, product in factory.products.items():
+                product.seek(0)
+                data[name] = product.read()
+            return data
+
+    if archive_format == "rar" and RARFILE_AVAILABLE:
+        # 内置解析器只读取块头，无法解压数据
+        with rarfile.RarFile(path) as archive:
+            return {name: archive.read(name) for name in names}
+    return {}
+
+
+# 说明文档类别 -> 文件名前缀（小写，不含扩展名）
+_DOCUMENT_KINDS = (
+    ("readme", ("readme", "read_me", "说明", "使用说明")),
+    ("package", ("package.json",)),
+    ("license", ("license", "licence", "copying", "eula")),
+    ("changelog", ("changelog", "changes", "history", "release_notes", "releasenotes", "更新日志"))
+)
+_DOCUMENT_EXTENSIONS = frozenset({"", ".md", ".txt", ".rst", ".json", ".markdown"})
+_DOCUMENT_SKIP_DIRS = ("node_modules/", "__macosx/", "library/packagecache/")
+
+
+def _document_kind(name: str) -> Optional[str]:
+    lowered = name.lower()
+    if any(skip in lowered for skip in _DOCUMENT_SKIP_DIRS):
+        return None
+    basename = lowered.rsplit("/", 1)[-1]
+    if basename == "package.json":
+        return "package"
+    if Path(basename).suffix not in _DOCUMENT_EXTENSIONS:
+        return None
+    for kind, prefixes in _DOCUMENT_KINDS:
+        if kind != "package" and basename.startswith(prefixes):
+            return kind
+    return None
+
+
+def find_documents(listing: ArchiveListing) -> List[Tuple[str, ArchiveEntry]]:
+    """每类说明文档取目录层级最浅的一个"""
+    chosen = {}
+    for entry in listing.files:
+        kind = _document_kind(entry.name)
+        if not kind or entry.size == 0:
+            continue
+        current = chosen.get(kind)
+        if current is None or (entry.name.count("/"), len(entry.name)) < (current.name.count("/"), len(current.name)):
+            chosen[kind] = entry
+    return [(kind, chosen[kind]) for kind, _ in _DOCUMENT_KINDS if kind in chosen]
+
+
+def read_documents(path: str, listing: ArchiveListing, max_bytes: int = 8192) -> List[Tuple[str, str, str]]:
+    """
+    读取 README / package.json / LICENSE / 更新日志的开头部分（阻塞调用，应在线程池中执行）
+
+    每个文件最多解压 max_bytes 字节，只支持可按成员随机读取的格式。
+
+    Returns:
+        [(类别, 成员路径, 文本)]
+    """
+    if listing.encrypted or listing.format not in _RANDOM_ACCESS_FORMATS:
+        return []
+    documents = find_documents(listing)
+    if not documents:
+        return []
+
+    data = _read_member_heads(path, listing.format, [entry.name for _, entry in documents], max_bytes)
+    return [
+        (kind, entry.name, _decode_text(data[entry.name]))
+        for kind, entry in documents
+        if data.get(entry.name)
+    ]
+
+
+def _read_member_heads(path: str, archive_format: str, names: List[str], max_bytes: int) -> dict:
+    """读取成员开头的 max_bytes 字节"""
+    if archive_format == "zip":
+        with zipfile.ZipFile(path) as archive:
+            heads = {}
+            for name in names:
+                with archive.open(name) as member:
+                    heads[name] = member.read(max_bytes)
+            return heads
+
+    if archive_format == "tar":
+        with tarfile.open(path, mode="r:") as archive:
+            return {name: archive.extractfile(name).read(max_bytes) for name in names}
+
+    if archive_format == "rar" and RARFILE_AVAILABLE:
+        with rarfile.RarFile(path) as archive:
+            heads = {}
+            for name in names:
+                with archive.open(name) as member:
+                    heads[name] = member.read(max_bytes)
+            return heads
+
+    # 7z 只能整块解压，说明文档通常很小，按整文件读取后截断
+    members = _read_members(path, archive_format, names, limit=max_bytes)
+    return {name: content[:max_bytes] for name, content in members.items()}
+
+
+def _decode_text(raw: bytes) -> str:
+    """解码文档文本（截断处可能切断多字节字符）"""
+    for encoding in ("utf-8", "gbk"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError as e:
+            if e.start >= len(raw) - 3:
+                return raw[:e.start].decode(encoding)
+    return raw.decode("utf-8", errors="replace")
+
@@ -6,16 +6,223 @@ ResLibs 百度网盘客户端
 
 import os
 import json
+import time
+import sqlite3
 import asyncio
 import logging
-from typing import List, Dict, Optional, Any
+import threading
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
 from pathlib import Path
 from datetime import datetime
+from dataclasses import dataclass
+from collections import deque
 import requests
 from urllib.parse import urlencode
 
-from automation.config import config
+from automation.config import config, BaiduAccount
 from automation.logger import setup_logger
+from automation.resource_classifier import ResourceClassifier, Classification
+
+
+class TransferStats:
+    """
+    下载流量统计（最近 24 小时滚动窗口）
+
+    指定 db_path 时每次下载写入 SQLite，启动时恢复窗口内的记录，
+    使每日流量上限在多次定时运行之间累计生效，而不是每次运行从零开始。
+    """
+
+    WINDOW_SECONDS = 86400
+
+    def __init__(self, db_path: str = ""):
+        self.total_bytes = 0  # 本次运行累计下载量
+        self.recent_speeds: deque = deque(maxlen=5)
+        self._records: deque = deque()  # (完成时间, 字节数, 耗时)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open(db_path)
+
+    def _open(self, db_path: str):
+        """打开流量记录库并加载窗口内的记录"""
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS transfer_log (
+                finished_at REAL NOT NULL,
+                bytes INTEGER NOT NULL,
+                seconds REAL NOT NULL
+            )
+        ''')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_transfer_log_finished ON transfer_log(finished_at)'
+        )
+        cutoff = time.time() - self.WINDOW_SECONDS
+        self._connection.execute('DELETE FROM transfer_log WHERE finished_at < ?', (cutoff,))
+        self._connection.commit()
+        self._records.extend(self._connection.execute(
+            'SELECT finished_at, bytes, seconds FROM transfer_log ORDER BY finished_at'
+        ).fetchall())
+
+    def record(self, num_bytes: int, seconds: float):
+        """记录一次下载"""
+        now = time.time()
+        with self._lock:
+            self._records.append((now, num_bytes, seconds))
+            self.total_bytes += num_bytes
+            if seconds > 0:
+                self.recent_speeds.append(num_bytes / seconds)
+            if self._connection is not None:
+                self._connection.execute(
+                    'INSERT INTO transfer_log (finished_at, bytes, seconds) VALUES (?, ?, ?)',
+                    (now, num_bytes, seconds)
+                )
+                self._connection.commit()
+
+    def _window(self) -> List[Tuple[float, int, float]]:
+        """丢弃 24 小时之前的记录，返回窗口内记录"""
+        cutoff = time.time() - self.WINDOW_SECONDS
+        with self._lock:
+            while self._records and self._records[0][0] < cutoff:
+                self._records.popleft()
+            return list(self._records)
+
+    def window_bytes(self) -> int:
+        """当前窗口内已下载字节数"""
+        return sum(record[1] for record in self._window())
+
+    @property
+    def download_count(self) -> int:
+        """当前窗口内的下载次数"""
+        return len(self._window())
+
+    def average_speed(self) -> float:
+        """当前窗口平均下载速度（字节/秒）"""
+        records = self._window()
+        seconds = sum(record[2] for record in records)
+        return sum(record[1] for record in records) / seconds if seconds else 0.0
+
+    def recent_speed(self) -> float:
+        """最近几次下载的平均速度（字节/秒）"""
+        return sum(self.recent_speeds) / len(self.recent_speeds) if self.recent_speeds else 0.0
+
+
+@dataclass
+class AccountState:
+    """单个账号的运行状态"""
+    account: BaiduAccount
+    active_downloads: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    throughput: float = 0.0  # 下载速度指数滑动平均（字节/秒）
+    downloaded_bytes: int = 0
+    download_count: int = 0
+    failure_count: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.account.name
+
+    @property
+    def access_token(self) -> str:
+        return self.account.access_token
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+# 文件或目录不存在的错误码（filemetas / multimedia 接口）
+FILE_NOT_FOUND_ERRNOS = frozenset({-9, 31066})
+
+
+class BaiduFileNotFound(Exception):
+    """当前账号的网盘中没有该文件（不计入账号失败次数）"""
+
+
+class BaiduTokenPool:
+    """
+    百度网盘多账号凭据池
+
+    每次下载分配给当前活跃下载数最少的健康账号（相同时优先历史速度更快的账号），
+    连续失败的账号进入冷却，从而把单账号限速分摊到多个账号上。
+    """
+
+    THROUGHPUT_SMOOTHING = 0.3
+
+    def __init__(self, accounts: List[BaiduAccount], failure_threshold: int = 3, cooldown: int = 300):
+        self.states = [AccountState(account) for account in accounts]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    @property
+    def primary(self) -> Optional[AccountState]:
+        return self.states[0] if self.states else None
+
+    def acquire(self, exclude: Iterable[AccountState] = ()) -> AccountState:
+        """为一次下载分配账号（exclude 中的账号不参与分配）"""
+        excluded = {id(state) for state in exclude}
+        candidates = [state for state in self.states if id(state) not in excluded]
+        if not candidates:
+            raise Exception("没有可用的百度网盘账号")
+
+        now = time.monotonic()
+        healthy = [state for state in candidates if state.is_healthy(now)]
+        if healthy:
+            state = min(
+                healthy,
+                key=lambda s: (s.active_downloads, -s.throughput, s.downloaded_bytes)
+            )
+        else:
+            # 全部账号都在冷却中，选择最早恢复的账号
+            state = min(candidates, key=lambda s: s.cooldown_until)
+
+        state.active_downloads += 1
+        return state
+
+    def release(self, state: AccountState, num_bytes: int, seconds: float, success: bool):
+        """下载结束后归还账号并更新健康度和吞吐统计"""
+        state.active_downloads = max(state.active_downloads - 1, 0)
+        state.downloaded_bytes += num_bytes
+
+        if success:
+            state.consecutive_failures = 0
+            state.download_count += 1
+            if seconds > 0 and num_bytes:
+                speed = num_bytes / seconds
+                if state.throughput:
+                    alpha = self.THROUGHPUT_SMOOTHING
+                    state.throughput = alpha * speed + (1 - alpha) * state.throughput
+                else:
+                    state.throughput = speed
+        else:
+            state.failure_count += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                state.cooldown_until = time.monotonic() + self.cooldown
+                state.consecutive_failures = 0
+
+    def abandon(self, state: AccountState):
+        """归还未使用的账号，不影响健康度（如该账号中没有要下载的文件）"""
+        state.active_downloads = max(state.active_downloads - 1, 0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """各账号状态（用于运行报告）"""
+        now = time.monotonic()
+        return [
+            {
+                'name': state.name,
+                'healthy': state.is_healthy(now),
+                'active_downloads': state.active_downloads,
+                'throughput': state.throughput,
+                'downloaded_bytes': state.downloaded_bytes,
+                'download_count': state.download_count,
+                'failure_count': state.failure_count
+            }
+            for state in self.states
+        ]
 
 
 class BaiduPanClient:
@@ -26,8 +233,22 @@ class BaiduPanClient:
         self.base_url = "https://pan.baidu.com/rest/2.0/xpan"
         self.access_token = config.baidu_pan.access_token
         self.refresh_token = config.baidu_pan.refresh_token
+        self.token_pool = BaiduTokenPool(
+            config.baidu_pan.accounts,
+            failure_threshold=config.baidu_pan.account_failure_threshold,
+            cooldown=config.baidu_pan.account_cooldown
+        )
+        if not self.access_token and self.token_pool.primary:
+            self.access_token = self.token_pool.primary.access_token
         self.session = requests.Session()
         self.proxies = config.get_proxy_config()
+        self.classifier = ResourceClassifier.load(config.classifier.rules_file)
+
+        # 配额缓存与流量统计
+        self._quota_cache: Optional[Dict[str, Any]] = None
+        self._quota_cached_at = 0.0
+        self.transfer_stats = TransferStats(config.baidu_pan.transfer_stats_path)
+        self._reservations: Dict[str, int] = {}  # 远程路径 -> 已分配给进行中任务但尚未下载完成的流量
 
         # 设置请求头
         self.session.headers.update({
@@ -38,7 +259,7 @@ class BaiduPanClient:
 
     def is_configured(self) -> bool:
         """检查是否已配置百度网盘"""
-        return bool(self.access_token or config.baidu_pan.open_api_key)
+        return bool(self.access_token or len(self.token_pool) or config.baidu_pan.open_api_key)
 
     async def list_files(self, path: str = "/", recursive: bool = False) -> List[Dict[str, Any]]:
         """
@@ -96,13 +317,16 @@ class BaiduPanClient:
         # 解析文件列表
         for item in data.get('list', []):
             if item.get('isdir') == 0:  # 只处理文件，不处理目录
+                filename = item.get('server_filename', '')
+                classification = self.classify_resource(filename)
                 file_info = {
                     'path': item.get('path', ''),
-                    'filename': item.get('server_filename', ''),
+                    'filename': filename,
                     'size': item.get('size', 0),
                     'modified_time': datetime.fromtimestamp(item.get('server_mtime', 0)),
-                    'file_type': self._get_file_extension(item.get('server_filename', '')),
-                    'resource_type': self._detect_resource_type(item.get('server_filename', '')),
+                    'file_type': self._get_file_extension(filename),
+                    'resource_type': classification.resource_type,
+                    'resource_type_confidence': classification.confidence,
                     'md5': item.get('md5', ''),
                     'fs_id': item.get('fs_id', 0)
                 }
@@ -199,25 +423,47 @@ class BaiduPanClient:
             return await self._simulate_download(local_dir, filename)
 
     async def _download_from_api(self, remote_path: str, filename: str, local_dir: str) -> Optional[str]:
-        """从API下载文件"""
+        """从API下载文件（使用凭据池中负载最低的健康账号）"""
         # 1. 获取下载链接
-        download_url = await self._get_download_url(remote_path)
-        if not download_url:
-            raise Exception("获取下载链接失败")
+        account, download_url = await self._acquire_download_url(remote_path)
+        started_at = time.monotonic()
+        downloaded = 0
 
-        # 2. 下载文件
-        local_path = Path(local_dir) / filename
-        local_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # 2. 下载文件
+            local_path = Path(local_dir) / filename
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+
+            self.logger.info(f"开始下载 {filename} 到 {local_path} (账号: {account.name})")
+
+            response = self.session.get(
+                download_url,
+                params={'access_token': account.access_token},
+                stream=True,
+                proxies=self.proxies,
+                timeout=30
+            )
+            response.raise_for_status()
 
-        self.logger.info(f"开始下载 {filename} 到 {local_path}")
+            # 3. 写入文件（在线程池中执行，不阻塞事件循环，多个账号的下载可以并行）
+            loop = asyncio.get_running_loop()
+            downloaded = await loop.run_in_executor(None, self._write_response, response, local_path)
 
-        response = self.session.get(download_url, stream=True, proxies=self.proxies, timeout=30)
-        response.raise_for_status()
+        except Exception:
+            self.token_pool.release(account, downloaded, time.monotonic() - started_at, success=False)
+            raise
 
-        # 3. 写入文件
+        elapsed = time.monotonic() - started_at
+        self.token_pool.release(account, downloaded, elapsed, success=True)
+        self._record_transfer(remote_path, downloaded, elapsed)
+        self.logger.info(f"文件下载完成: {local_path}")
+        return str(local_path)
+
+    def _write_response(self, response: requests.Response, local_path: Path) -> int:
+        """将下载响应写入本地文件，返回写入字节数"""
+        downloaded = 0
         with open(local_path, 'wb') as f:
             total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
 
             for chunk in response.iter_content(chunk_size=8192):
                 if chunk:
@@ -229,16 +475,106 @@ class BaiduPanClient:
                         progress = (downloaded / total_size) * 100
                         self.logger.info(f"下载进度: {progress:.1f}% ({downloaded}/{total_size} bytes)")
 
-        self.logger.info(f"文件下载完成: {local_path}")
-        return str(local_path)
+        return downloaded
+
+    async def open_download_stream(self, remote_path: str, filename: str) -> Tuple[Iterator[bytes], int]:
+        """
+        打开下载流（流式中转模式，数据不写入本地磁盘）
+
+        Args:
+            remote_path: 远程文件路径
+            filename: 文件名
+
+        Returns:
+            (数据块迭代器, 文件大小)，大小未知时为 0
+        """
+        if not self.is_configured() or config.system.dry_run:
+            self.logger.info(f"模拟下载流: {filename}")
+            content = self._build_simulated_content(filename, remote_path)
+            return iter([content]), len(content)
+
+        account, download_url = await self._acquire_download_url(remote_path)
+        started_at = time.monotonic()
+
+        try:
+            self.logger.info(f"开始流式下载 {filename} (账号: {account.name})")
+
+            response = self.session.get(
+                download_url,
+                params={'access_token': account.access_token},
+                stream=True,
+                proxies=self.proxies,
+                timeout=30
+            )
+            response.raise_for_status()
+
+        except Exception:
+            self.token_pool.release(account, 0, time.monotonic() - started_at, success=False)
+            raise
+
+        total_size = int(response.headers.get('content-length', 0))
+        return self._iter_response(response, account, remote_path), total_size
+
+    def _iter_response(
+        self,
+        response: requests.Response,
+        account: AccountState,
+        remote_path: str
+    ) -> Iterator[bytes]:
+        """按块迭代响应内容，迭代结束或被关闭时释放连接、归还账号并记录流量"""
+        started_at = time.monotonic()
+        downloaded = 0
+        completed = False
+        try:
+            for chunk in response.iter_content(chunk_size=config.download.stream_chunk_size):
+                if chunk:
+                    downloaded += len(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            response.close()
+            elapsed = time.monotonic() - started_at
+            self.token_pool.release(account, downloaded, elapsed, success=completed)
+            self._record_transfer(remote_path, downloaded, elapsed)
+
+    async def _acquire_download_url(self, remote_path: str) -> Tuple[AccountState, str]:
+        """
+        分配账号并获取下载链接
+
+        文件路径来自主账号的文件列表，其他账号不一定有同一路径的文件；
+        账号中没有该文件时换用其他账号，不计入该账号的失败次数。
+
+        Returns:
+            (账号, 下载链接)，调用方负责归还账号
+        """
+        tried: List[AccountState] = []
+        while True:
+            account = self.token_pool.acquire(exclude=tried)
+            started_at = time.monotonic()
+            try:
+                download_url = await self._get_download_url(remote_path, account.access_token)
+                if not download_url:
+                    raise Exception("获取下载链接失败")
+                return account, download_url
+            except BaiduFileNotFound:
+                self.token_pool.abandon(account)
+                tried.append(account)
+                if len(tried) >= len(self.token_pool):
+                    raise
+                self.logger.info(f"账号 {account.name} 中没有该文件，换用其他账号: {remote_path}")
+            except Exception:
+                self.token_pool.release(account, 0, time.monotonic() - started_at, success=False)
+                raise
+
+    async def _get_download_url(self, remote_path: str, access_token: Optional[str] = None) -> Optional[str]:
+        """获取文件下载链接（dlink 与签发它的账号绑定）"""
+        access_token = access_token or self.access_token
 
-    async def _get_download_url(self, remote_path: str) -> Optional[str]:
-        """获取文件下载链接"""
         # 1. 获取文件信息
         url = f"{self.base_url}/file"
         params = {
             'method': 'filemetas',
-            'access_token': self.access_token,
+            'access_token': access_token,
             'paths': json.dumps([remote_path])
         }
 
@@ -247,12 +583,15 @@ class BaiduPanClient:
 
         data = response.json()
 
+        if data.get('errno') in FILE_NOT_FOUND_ERRNOS:
+            raise BaiduFileNotFound(f"文件不存在: {remote_path}")
+
         if data.get('errno') != 0:
             error_msg = data.get('errmsg', '未知错误')
             raise Exception(f"获取文件信息失败: {error_msg}")
 
         if not data.get('list'):
-            raise Exception("文件不存在")
+            raise BaiduFileNotFound(f"文件不存在: {remote_path}")
 
         file_info = data['list'][0]
         fs_id = file_info.get('fs_id')
@@ -261,7 +600,7 @@ class BaiduPanClient:
         download_url = f"{self.base_url}/multimedia"
         params = {
             'method': 'filemetas',
-            'access_token': self.access_token,
+            'access_token': access_token,
             'dlink': '1',
             'fsids': json.dumps([fs_id])
         }
@@ -288,11 +627,21 @@ class BaiduPanClient:
         self.logger.info(f"模拟下载: 创建测试文件 {local_path}")
 
         # 创建一个小的测试文件
-        test_content = f"""
+        test_content = self._build_simulated_content(filename, local_dir)
+
+        with open(local_path, 'wb') as f:
+            f.write(test_content)
+
+        self.logger.info(f"模拟下载完成: {local_path}")
+        return str(local_path)
+
+    def _build_simulated_content(self, filename: str, location: str) -> bytes:
+        """生成模拟文件内容"""
+        return f"""
 This is a simulated download file for ResLibs automation testing.
 
 File: {filename}
-Remote Path: {local_dir}
+Remote Path: {location}
 Download Time: {datetime.now().isoformat()}
 Size: Simulated
 Type: Test File
@@ -301,60 +650,37 @@ This file contains simulated content for testing the automation pipeline.
 In production, this would be the actual downloaded file.
 """.encode('utf-8')
 
-        with open(local_path, 'wb') as f:
-            f.write(test_content)
-
-        self.logger.info(f"模拟下载完成: {local_path}")
-        return str(local_path)
-
     def _get_file_extension(self, filename: str) -> str:
         """获取文件扩展名"""
         return Path(filename).suffix.lower()
 
     def _detect_resource_type(self, filename: str) -> str:
         """检测资源类型"""
-        extension = self._get_file_extension(filename)
-        filename_lower = filename.lower()
-
-        # Unity 资源
-        if extension in ['.unitypackage', '.unity'] or 'unity' in filename_lower:
-            return 'unity-assets'
-
-        # 软件工具
-        elif extension in ['.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm']:
-            return 'software-tools'
-
-        # 设计素材
-        elif extension in ['.psd', '.ai', '.sketch', '.fig', '.svg'] or 'ui' in filename_lower:
-            return 'design-assets'
-
-        # 视频课程
-        elif extension in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv'] or 'course' in filename_lower:
-            return 'video-courses'
-
-        # 音频资源
-        elif extension in ['.mp3', '.wav', '.flac', '.aac', '.m4a']:
-            return 'audio-resources'
-
-        # 文档资料
-        elif extension in ['.pdf', '.epub', '.mobi', '.azw', '.azw3', '.doc', '.docx']:
-            return 'documents'
-
-        # 3D 模型
-        elif extension in ['.fbx', '.obj', '.3ds', '.blend', '.max', '.c4d']:
-            return '3d-models'
-
-        # 其他压缩文件
-        elif extension in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-            return 'archives'
-
-        else:
-            return 'unknown'
-
-    async def check_quota(self) -> Dict[str, Any]:
-        """检查网盘配额"""
-        if not self.is_configured():
-            self.logger.warning("百度网盘未配置，返回模拟配额信息")
+        return self.classify_resource(filename).resource_type
+
+    def classify_resource(self, filename: str) -> Classification:
+        """根据文件名分类资源，返回类型及置信度"""
+        return self.classifier.classify(filename)
+
+    def refine_resource_type(self, classification: Classification, local_path: str) -> Classification:
+        """读取已下载文件的文件头，校正低置信度的分类结果"""
+        if classification.confidence >= config.classifier.sniff_threshold:
+            return classification
+        return self.classifier.refine_with_file(
+            classification, local_path, config.classifier.sniff_bytes
+        )
+
+    async def check_quota(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """检查网盘配额（结果按 BAIDU_QUOTA_CACHE_TTL 缓存）"""
+        if (
+            not force_refresh
+            and self._quota_cache is not None
+            and time.monotonic() - self._quota_cached_at < config.baidu_pan.quota_cache_ttl
+        ):
+            return self._quota_cache
+
+        if not self.is_configured() or config.system.dry_run:
+            self.logger.info("百度网盘未配置或试运行模式，返回模拟配额信息")
             return {
                 'total': 2199023255552,  # 2TB
                 'used': 1073741824000,   # 1TB
@@ -376,12 +702,17 @@ In production, this would be the actual downloaded file.
             if data.get('errno') != 0:
                 raise Exception(f"获取配额信息失败: {data.get('errmsg', '未知错误')}")
 
-            return {
+            quota = {
                 'total': data.get('total', 0),
                 'used': data.get('used', 0),
                 'free': data.get('total', 0) - data.get('used', 0)
             }
 
+            # 只缓存成功的结果，失败时下次重新请求
+            self._quota_cache = quota
+            self._quota_cached_at = time.monotonic()
+            return quota
+
         except Exception as e:
             self.logger.error(f"检查配额失败: {e}")
             return {
@@ -390,9 +721,91 @@ In production, this would be the actual downloaded file.
                 'free': 0
             }
 
-    async def refresh_access_token(self) -> bool:
-        """刷新访问令牌"""
-        if not self.refresh_token:
+    def remaining_transfer(self) -> Optional[int]:
+        """当日剩余下载流量，未设置上限时返回 None"""
+        limit = config.baidu_pan.parse_daily_transfer_limit()
+        if not limit:
+            return None
+        reserved = sum(self._reservations.values())
+        return max(limit - self.transfer_stats.window_bytes() - reserved, 0)
+
+    def can_download(self, size: int) -> bool:
+        """判断当日剩余流量是否足够下载该文件"""
+        remaining = self.remaining_transfer()
+        return remaining is None or size <= remaining
+
+    def reserve_transfer(self, remote_path: str, size: int) -> bool:
+        """为即将开始的下载预留流量，并发处理时避免多个任务同时超出额度"""
+        if not self.can_download(size):
+            return False
+        self._reservations[remote_path] = self._reservations.get(remote_path, 0) + size
+        return True
+
+    def release_transfer(self, remote_path: str):
+        """任务结束后释放尚未转为实际下载量的预留流量（如下载前失败）"""
+        self._reservations.pop(remote_path, None)
+
+    def _record_transfer(self, remote_path: str, num_bytes: int, seconds: float):
+        """记录实际下载量，同时释放该文件的预留流量，避免处理后续步骤期间重复占用额度"""
+        self._reservations.pop(remote_path, None)
+        self.transfer_stats.record(num_bytes, seconds)
+
+    def plan_downloads(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按剩余流量重新排序待处理文件
+
+        能在剩余流量内完成的文件保持原有顺序排在前面，超出剩余流量的文件推迟到最后，
+        避免一个大文件耗尽额度导致后续小文件全部无法处理。
+        """
+        remaining = self.remaining_transfer()
+        if remaining is None:
+            return files
+
+        planned, deferred = [], []
+        for file_info in files:
+            size = file_info.get('size', 0)
+            if size <= remaining:
+                planned.append(file_info)
+                remaining -= size
+            else:
+                deferred.append(file_info)
+
+        if deferred:
+            self.logger.info(f"剩余下载流量不足，推迟 {len(deferred)} 个文件")
+        return planned + deferred
+
+    def throttle_delay(self) -> int:
+        """近期下载速度低于阈值（疑似被限速）时返回建议等待秒数"""
+        threshold = config.baidu_pan.parse_throttle_speed()
+        recent_speed = self.transfer_stats.recent_speed()
+        if threshold and recent_speed and recent_speed < threshold:
+            return config.baidu_pan.throttle_backoff
+        return 0
+
+    async def get_quota_stats(self) -> Dict[str, Any]:
+        """获取配额与下载流量统计（用于运行报告）"""
+        quota = await self.check_quota()
+        stats = self.transfer_stats
+        return {
+            'quota_total': quota.get('total', 0),
+            'quota_used': quota.get('used', 0),
+            'quota_free': quota.get('free', 0),
+            'downloaded_bytes_today': stats.window_bytes(),
+            'downloaded_bytes_total': stats.total_bytes,
+            'download_count': stats.download_count,
+            'average_speed': stats.average_speed(),
+            'recent_speed': stats.recent_speed(),
+            'remaining_transfer': self.remaining_transfer(),
+            'accounts': self.token_pool.snapshot()
+        }
+
+    async def refresh_access_token(self, account: Optional[AccountState] = None) -> bool:
+        """刷新访问令牌（默认刷新主账号）"""
+        account = account or self.token_pool.primary
+        refresh_token = account.account.refresh_token if account else self.refresh_token
+        is_primary = account is None or account is self.token_pool.primary
+
+        if not refresh_token:
             self.logger.warning("未配置refresh_token，无法刷新")
             return False
 
@@ -400,7 +813,7 @@ In production, this would be the actual downloaded file.
             url = "https://openapi.baidu.com/oauth/2.0/token"
             params = {
                 'grant_type': 'refresh_token',
-                'refresh_token': self.refresh_token,
+                'refresh_token': refresh_token,
                 'client_id': config.baidu_pan.app_id,
                 'client_secret': config.baidu_pan.app_secret
             }
@@ -411,8 +824,13 @@ In production, this would be the actual downloaded file.
             data = response.json()
 
             if 'access_token' in data:
-                self.access_token = data['access_token']
-                self.logger.info("访问令牌刷新成功")
+                if account:
+                    account.account.access_token = data['access_token']
+                    account.account.refresh_token = data.get('refresh_token', refresh_token)
+                if is_primary:
+                    self.access_token = data['access_token']
+                    self.refresh_token = data.get('refresh_token', refresh_token)
+                self.logger.info(f"访问令牌刷新成功{f' (账号: {account.name})' if account else ''}")
                 return True
             else:
                 self.logger.error(f"刷新令牌失败: {data}")
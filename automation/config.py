@@ -15,6 +15,19 @@ from dotenv import load_dotenv
 load_dotenv('.env.automation')
 
 
+def parse_size_string(size_str: str) -> int:
+    """解析 "5GB" / "10MB" / "512KB" / "1024" 形式的大小字符串为字节数"""
+    size_str = size_str.strip().upper()
+    if size_str.endswith('GB'):
+        return int(float(size_str[:-2]) * 1024 * 1024 * 1024)
+    elif size_str.endswith('MB'):
+        return int(float(size_str[:-2]) * 1024 * 1024)
+    elif size_str.endswith('KB'):
+        return int(float(size_str[:-2]) * 1024)
+    else:
+        return int(size_str)
+
+
 @dataclass
 class DatabaseConfig:
     """数据库配置"""
@@ -33,12 +46,43 @@ class AIConfig:
     gemini_api_key: str
     gemini_model: str = "gemini-1.5-flash"
     content_language: str = "zh-CN"
+    max_concurrent_requests: int = 4  # 同时进行的 Gemini 请求上限（含对冲请求和超时后仍在运行的同步调用）
+    request_timeout: int = 120  # 单次请求超时（秒）
+    fast_model: str = ""  # 简单资源和对冲请求使用的快速模型，留空同 gemini_model
+    complex_model: str = ""  # 复杂资源使用的模型，留空同 gemini_model
+    latency_slo: float = 30.0  # 单次生成目标延迟（秒）
+    hedge_after: float = 10.0  # 无延迟统计时主模型多久未完成发起对冲（秒），0 为不对冲
+    stream_responses: bool = True  # 流式接收输出，结构异常时提前中止
+    stream_retries: int = 1  # 提前中止后的重试次数
+    content_cache_enabled: bool = True
+    content_cache_path: str = "./data/content_cache.db"
+    content_cache_max_entries: int = 5000
+    content_cache_max_age_days: int = 90
+    family_reuse: bool = True  # 同一产品的新版本复用上一版本内容，只增量更新版本相关字段
+    prompt_dir: str = ""  # 自定义提示模板目录，同名文件覆盖内置模板
+    max_repair_attempts: int = 1  # 字段校验失败时定向修复的最多次数
+    document_max_bytes: int = 8192  # 每个包内说明文档最多解压的字节数
+    document_token_budget: int = 800  # 包内说明文档在提示中的 token 上限
+    listing_token_budget: int = 400  # 包内文件清单压缩为目录概要后的 token 上限
+    metrics_enabled: bool = True  # 记录每次 LLM 调用的 token、延迟和费用
+    metrics_path: str = "./data/llm_metrics.db"
+    model_prices: str = ""  # "模型=输入价/输出价,..."，单位美元 / 百万 token
+    batch_size: int = 1  # 同类型资源合并为一次请求的数量，1 表示不合并
+    batch_window: float = 2.0  # 凑批等待时间（秒），超时后不足一批也发送
 
     def __post_init__(self):
         if not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY 环境变量未设置")
 
 
+@dataclass
+class BaiduAccount:
+    """百度网盘账号凭据"""
+    name: str
+    access_token: str
+    refresh_token: str = ""
+
+
 @dataclass
 class BaiduPanConfig:
     """百度网盘配置"""
@@ -49,11 +93,33 @@ class BaiduPanConfig:
     app_secret: str = ""
     open_api_key: str = ""
     open_secret_key: str = ""
+    quota_cache_ttl: int = 300  # 配额信息缓存时间（秒）
+    daily_transfer_limit: str = ""  # 每日下载流量上限，如 "50GB"，为空表示不限制
+    transfer_stats_path: str = "./data/transfer_stats.db"  # 下载流量记录，使每日上限跨多次运行生效
+    throttle_speed: str = ""  # 近期平均下载速度低于该值视为被限速，如 "100KB"
+    throttle_backoff: int = 60  # 被限速时的等待时间（秒）
+    # 多账号凭据池：下载分配到负载最低的健康账号，主账号自动加入。
+    # 文件列表只从主账号获取，其他账号需在相同路径下有相同文件（如同一分享转存到各账号）；
+    # 账号中没有该文件时换用其他账号，不计入该账号的失败次数
+    accounts: List[BaiduAccount] = field(default_factory=list)
+    account_failure_threshold: int = 3  # 连续失败次数达到该值后账号进入冷却
+    account_cooldown: int = 300  # 账号冷却时间（秒）
 
     def __post_init__(self):
         if not self.path:
             raise ValueError("BAIDU_PAN_PATH 环境变量未设置")
 
+        if self.access_token and all(a.access_token != self.access_token for a in self.accounts):
+            self.accounts.insert(0, BaiduAccount("primary", self.access_token, self.refresh_token))
+
+    def parse_daily_transfer_limit(self) -> int:
+        """解析每日下载流量上限，0 表示不限制"""
+        return parse_size_string(self.daily_transfer_limit) if self.daily_transfer_limit else 0
+
+    def parse_throttle_speed(self) -> int:
+        """解析限速判定阈值（字节/秒），0 表示不检测"""
+        return parse_size_string(self.throttle_speed) if self.throttle_speed else 0
+
 
 @dataclass
 class DownloadConfig:
@@ -63,6 +129,13 @@ class DownloadConfig:
     concurrent_downloads: int = 3
     retry_attempts: int = 3
     retry_delay: int = 5
+    # 流式中转：无需本地分析的资源直接从百度网盘转发到付费平台，不落盘
+    stream_through: bool = False
+    stream_through_types: List[str] = field(default_factory=lambda: [
+        "video-courses", "software-tools"
+    ])
+    stream_chunk_size: int = 1024 * 1024  # 1MB
+    stream_buffer_chunks: int = 16  # 每个上传流最多缓冲的数据块数
     supported_extensions: List[str] = field(default_factory=lambda: [
         ".zip", ".rar", ".7z", ".tar", ".gz", ".unitypackage",
         ".exe", ".msi", ".dmg", ".pkg", ".psd", ".ai", ".sketch",
@@ -78,15 +151,29 @@ class DownloadConfig:
 
     def parse_size(self) -> int:
         """解析文件大小字符串为字节数"""
-        size_str = self.max_file_size.upper()
-        if size_str.endswith('GB'):
-            return int(size_str[:-2]) * 1024 * 1024 * 1024
-        elif size_str.endswith('MB'):
-            return int(size_str[:-2]) * 1024 * 1024
-        elif size_str.endswith('KB'):
-            return int(size_str[:-2]) * 1024
-        else:
-            return int(size_str)
+        return parse_size_string(self.max_file_size)
+
+
+@dataclass
+class ClassifierConfig:
+    """资源类型分类配置"""
+    rules_file: str = ""
+    sniff_bytes: int = 4096
+    sniff_threshold: float = 0.8  # 低于该置信度时，下载后读取文件头校正类型
+
+
+@dataclass
+class MetadataConfig:
+    """元数据提取配置（进程池）"""
+    workers: int = 0  # 工作进程数，0 表示 CPU 核数
+    min_timeout: float = 30.0  # 单个文件的最短超时（秒）
+    timeout_factor: float = 4.0  # 超时 = 按大小估算的耗时 × 该系数
+    sequential_mbps: float = 100.0  # 需顺序读取的格式（.unitypackage、tar.gz 等）的估算吞吐量
+    cache_enabled: bool = True  # 按文件内容哈希缓存提取结果
+    cache_path: str = "./data/analysis_cache.db"
+    cache_max_entries: int = 20000
+    cache_max_age_days: int = 180
+    failure_ttl_hours: float = 24.0  # 提取超时或崩溃的结果缓存时长，过期后重试
 
 
 @dataclass
@@ -98,11 +185,20 @@ class ImageConfig:
     download_dir: str = "./temp/images"
     max_image_size: str = "5MB"
     images_per_resource: int = 5
+    archive_previews: bool = True  # 优先使用压缩包内的预览图，没有时才联网搜索
+    search_timeout: float = 10.0  # 每个图片源的搜索超时（秒），各图片源并发查询
+    download_concurrency: int = 8  # 同时下载的图片数
+    download_per_host: int = 2  # 同一主机同时下载的图片数
+    download_timeout: float = 30.0  # 单张图片的下载超时（秒）
 
     def __post_init__(self):
         # 创建图片下载目录
         Path(self.download_dir).mkdir(parents=True, exist_ok=True)
 
+    def parse_max_size(self) -> int:
+        """解析图片最大大小"""
+        return parse_size_string(self.max_image_size)
+
 
 @dataclass
 class CloudflareConfig:
@@ -158,13 +254,7 @@ class LoggingConfig:
 
     def parse_max_size(self) -> int:
         """解析日志最大文件大小"""
-        size_str = self.max_size.upper()
-        if size_str.endswith('MB'):
-            return int(size_str[:-2]) * 1024 * 1024
-        elif size_str.endswith('KB'):
-            return int(size_str[:-2]) * 1024
-        else:
-            return int(size_str)
+        return parse_size_string(self.max_size)
 
 
 @dataclass
@@ -210,7 +300,30 @@ class AutomationConfig:
         self.ai = AIConfig(
             gemini_api_key=os.getenv("GEMINI_API_KEY", ""),
             gemini_model=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
-            content_language=os.getenv("CONTENT_LANGUAGE", "zh-CN")
+            content_language=os.getenv("CONTENT_LANGUAGE", "zh-CN"),
+            max_concurrent_requests=int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", "4")),
+            request_timeout=int(os.getenv("AI_REQUEST_TIMEOUT", "120")),
+            fast_model=os.getenv("AI_FAST_MODEL", ""),
+            complex_model=os.getenv("AI_COMPLEX_MODEL", ""),
+            latency_slo=float(os.getenv("AI_LATENCY_SLO", "30")),
+            hedge_after=float(os.getenv("AI_HEDGE_AFTER", "10")),
+            stream_responses=os.getenv("AI_STREAM_RESPONSES", "true").lower() == "true",
+            stream_retries=int(os.getenv("AI_STREAM_RETRIES", "1")),
+            content_cache_enabled=os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true",
+            content_cache_path=os.getenv("CONTENT_CACHE_PATH", "./data/content_cache.db"),
+            content_cache_max_entries=int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "5000")),
+            content_cache_max_age_days=int(os.getenv("CONTENT_CACHE_MAX_AGE_DAYS", "90")),
+            family_reuse=os.getenv("CONTENT_FAMILY_REUSE", "true").lower() == "true",
+            prompt_dir=os.getenv("PROMPT_TEMPLATES_DIR", ""),
+            max_repair_attempts=int(os.getenv("AI_MAX_REPAIR_ATTEMPTS", "1")),
+            document_max_bytes=int(os.getenv("AI_DOCUMENT_MAX_BYTES", "8192")),
+            document_token_budget=int(os.getenv("AI_DOCUMENT_TOKEN_BUDGET", "800")),
+            listing_token_budget=int(os.getenv("AI_LISTING_TOKEN_BUDGET", "400")),
+            metrics_enabled=os.getenv("LLM_METRICS_ENABLED", "true").lower() == "true",
+            metrics_path=os.getenv("LLM_METRICS_PATH", "./data/llm_metrics.db"),
+            model_prices=os.getenv("AI_MODEL_PRICES", ""),
+            batch_size=int(os.getenv("AI_BATCH_SIZE", "1")),
+            batch_window=float(os.getenv("AI_BATCH_WINDOW", "2.0"))
         )
 
         self.baidu_pan = BaiduPanConfig(
@@ -220,7 +333,15 @@ class AutomationConfig:
             app_id=os.getenv("BAIDU_APP_ID", ""),
             app_secret=os.getenv("BAIDU_APP_SECRET", ""),
             open_api_key=os.getenv("BAIDU_OPEN_API_KEY", ""),
-            open_secret_key=os.getenv("BAIDU_OPEN_SECRET_KEY", "")
+            open_secret_key=os.getenv("BAIDU_OPEN_SECRET_KEY", ""),
+            quota_cache_ttl=int(os.getenv("BAIDU_QUOTA_CACHE_TTL", "300")),
+            daily_transfer_limit=os.getenv("BAIDU_DAILY_TRANSFER_LIMIT", ""),
+            transfer_stats_path=os.getenv("BAIDU_TRANSFER_STATS_PATH", "./data/transfer_stats.db"),
+            throttle_speed=os.getenv("BAIDU_THROTTLE_SPEED", ""),
+            throttle_backoff=int(os.getenv("BAIDU_THROTTLE_BACKOFF", "60")),
+            accounts=self._load_baidu_accounts(),
+            account_failure_threshold=int(os.getenv("BAIDU_ACCOUNT_FAILURE_THRESHOLD", "3")),
+            account_cooldown=int(os.getenv("BAIDU_ACCOUNT_COOLDOWN", "300"))
         )
 
         self.download = DownloadConfig(
@@ -228,7 +349,33 @@ class AutomationConfig:
             max_file_size=os.getenv("MAX_FILE_SIZE", "5GB"),
             concurrent_downloads=int(os.getenv("CONCURRENT_DOWNLOADS", "3")),
             retry_attempts=int(os.getenv("RETRY_ATTEMPTS", "3")),
-            retry_delay=int(os.getenv("RETRY_DELAY", "5"))
+            retry_delay=int(os.getenv("RETRY_DELAY", "5")),
+            stream_through=os.getenv("STREAM_THROUGH", "false").lower() == "true",
+            stream_through_types=[
+                t.strip() for t in os.getenv(
+                    "STREAM_THROUGH_TYPES", "video-courses,software-tools"
+                ).split(",") if t.strip()
+            ],
+            stream_chunk_size=int(os.getenv("STREAM_CHUNK_SIZE", str(1024 * 1024))),
+            stream_buffer_chunks=int(os.getenv("STREAM_BUFFER_CHUNKS", "16"))
+        )
+
+        self.classifier = ClassifierConfig(
+            rules_file=os.getenv("RESOURCE_RULES_FILE", ""),
+            sniff_bytes=int(os.getenv("CLASSIFIER_SNIFF_BYTES", "4096")),
+            sniff_threshold=float(os.getenv("CLASSIFIER_SNIFF_THRESHOLD", "0.8"))
+        )
+
+        self.metadata = MetadataConfig(
+            workers=int(os.getenv("METADATA_WORKERS", "0")),
+            min_timeout=float(os.getenv("METADATA_MIN_TIMEOUT", "30")),
+            timeout_factor=float(os.getenv("METADATA_TIMEOUT_FACTOR", "4")),
+            sequential_mbps=float(os.getenv("METADATA_SEQUENTIAL_MBPS", "100")),
+            cache_enabled=os.getenv("METADATA_CACHE_ENABLED", "true").lower() == "true",
+            cache_path=os.getenv("METADATA_CACHE_PATH", "./data/analysis_cache.db"),
+            cache_max_entries=int(os.getenv("METADATA_CACHE_MAX_ENTRIES", "20000")),
+            cache_max_age_days=int(os.getenv("METADATA_CACHE_MAX_AGE_DAYS", "180")),
+            failure_ttl_hours=float(os.getenv("METADATA_FAILURE_TTL_HOURS", "24"))
         )
 
         self.image = ImageConfig(
@@ -237,7 +384,12 @@ class AutomationConfig:
             pixabay_api_key=os.getenv("PIXABAY_API_KEY", ""),
             download_dir=os.getenv("IMAGE_DOWNLOAD_DIR", "./temp/images"),
             max_image_size=os.getenv("MAX_IMAGE_SIZE", "5MB"),
-            images_per_resource=int(os.getenv("IMAGES_PER_RESOURCE", "5"))
+            images_per_resource=int(os.getenv("IMAGES_PER_RESOURCE", "5")),
+            archive_previews=os.getenv("IMAGE_ARCHIVE_PREVIEWS", "true").lower() == "true",
+            search_timeout=float(os.getenv("IMAGE_SEARCH_TIMEOUT", "10")),
+            download_concurrency=int(os.getenv("IMAGE_DOWNLOAD_CONCURRENCY", "8")),
+            download_per_host=int(os.getenv("IMAGE_DOWNLOAD_PER_HOST", "2")),
+            download_timeout=float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
         )
 
         self.cloudflare = CloudflareConfig(
@@ -288,6 +440,20 @@ class AutomationConfig:
             admin_email=os.getenv("ADMIN_EMAIL", "")
         )
 
+    def _load_baidu_accounts(self) -> List[BaiduAccount]:
+        """加载额外的百度网盘账号（逗号分隔，refresh token 与 access token 按位置对应）"""
+        access_tokens = [t.strip() for t in os.getenv("BAIDU_ACCESS_TOKENS", "").split(",")]
+        refresh_tokens = [t.strip() for t in os.getenv("BAIDU_REFRESH_TOKENS", "").split(",")]
+
+        # 先按原始位置配对再跳过空位，避免 "a,,c" 中的 c 错配到第二个 refresh token
+        accounts = []
+        for i, access_token in enumerate(access_tokens):
+            if not access_token:
+                continue
+            refresh_token = refresh_tokens[i] if i < len(refresh_tokens) else ""
+            accounts.append(BaiduAccount(f"account-{i + 1}", access_token, refresh_token))
+        return accounts
+
     def validate_config(self):
         """验证配置完整性"""
         errors = []
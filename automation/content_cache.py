@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+ResLibs 内容生成缓存
+按 文件指纹 + 资源类型 + 模型 + 提示模板版本 持久化 AI 生成结果，重复处理同一文件时不再调用 LLM
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional, Tuple
+from pathlib import Path
+
+
+class ContentCache:
+    """内容生成结果的本地持久化缓存（SQLite）"""
+
+    # 每写入多少条执行一次淘汰
+    EVICT_INTERVAL = 100
+
+    def __init__(self, db_path: str = "./data/content_cache.db", max_entries: int = 5000, max_age_days: int = 90):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+        self._create_tables()
+        self.evict()
+
+    def _create_tables(self):
+        """创建缓存表"""
+        with self._lock:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS content_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    file_key TEXT NOT NULL,
+                    filename TEXT,
+                    resource_type TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    template_hash TEXT NOT NULL,
+                    content TEXT NOT NULL,  -- JSON 字符串
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hits INTEGER DEFAULT 0,
+                    family_key TEXT,  -- 产品系列键，用于同系列新版本复用内容
+                    version TEXT
+                )
+            ''')
+            # 旧版本缓存库补充系列字段
+            columns = {row[1] for row in self.connection.execute('PRAGMA table_info(content_cache)')}
+            for column in ("family_key", "version"):
+                if column not in columns:
+                    self.connection.execute(f'ALTER TABLE content_cache ADD COLUMN {column} TEXT')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_content_cache_file ON content_cache(file_key)'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_content_cache_accessed ON content_cache(last_accessed)'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_content_cache_family ON content_cache(family_key, resource_type)'
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def file_key(md5: str, filename: str, size: int) -> str:
+        """文件指纹：优先使用网盘 md5，没有时退化为 文件名 + 大小"""
+        return md5 if md5 else f"{filename}:{size}"
+
+    @staticmethod
+    def make_key(file_key: str, resource_type: str, model: str, template_hash: str) -> str:
+        """组合缓存键"""
+        raw = "\x1f".join([file_key, resource_type, model, template_hash])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，命中时更新访问时间"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT content FROM content_cache WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.connection.execute(
+                'UPDATE content_cache SET last_accessed = ?, hits = hits + 1 WHERE cache_key = ?',
+                (time.time(), cache_key)
+            )
+            self.connection.commit()
+
+        return json.loads(row[0])
+
+    def put(
+        self,
+        cache_key: str,
+        file_key: str,
+        filename: str,
+        resource_type: str,
+        model: str,
+        template_hash: str,
+        content: Dict[str, Any],
+        family_key: str = "",
+        version: str = ""
+    ):
+        """写入缓存"""
+        now = time.time()
+        with self._lock:
+            self.connection.execute('''
+                INSERT OR REPLACE INTO content_cache (
+                    cache_key, file_key, filename, resource_type, model,
+                    template_hash, content, created_at, last_accessed, hits,
+                    family_key, version
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+            ''', (
+                cache_key, file_key, filename, resource_type, model,
+                template_hash, json.dumps(content, ensure_ascii=False), now, now,
+                family_key or None, version
+            ))
+            self.connection.commit()
+            self._puts_since_evict += 1
+
+        if self._puts_since_evict >= self.EVICT_INTERVAL:
+            self.evict()
+
+    def latest_in_family(
+        self,
+        family_key: str,
+        resource_type: str,
+        exclude_file_key: str = ""
+    ) -> Optional[Tuple[Dict[str, Any], str, str]]:
+        """
+        查找同一产品系列最近生成的内容
+
+        Returns:
+            (内容, 版本号, 文件名)，没有时返回 None
+        """
+        with self._lock:
+            row = self.connection.execute('''
+                SELECT content, version, filename FROM content_cache
+                WHERE family_key = ? AND resource_type = ? AND file_key != ?
+                ORDER BY created_at DESC LIMIT 1
+            ''', (family_key, resource_type, exclude_file_key)).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1] or "", row[2] or ""
+
+    def evict(self) -> int:
+        """淘汰过期条目，并按最近访问时间（LRU）裁剪到容量上限"""
+        with self._lock:
+            self._puts_since_evict = 0
+            removed = 0
+
+            if self.max_age_days > 0:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self.connection.execute(
+                    'DELETE FROM content_cache WHERE last_accessed < ?', (cutoff,)
+                ).rowcount
+
+            if self.max_entries > 0:
+                removed += self.connection.execute('''
+                    DELETE FROM content_cache WHERE cache_key IN (
+                        SELECT cache_key FROM content_cache
+                        ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,)).rowcount
+
+            self.connection.commit()
+            return removed
+
+    def invalidate(self, file_key: Optional[str] = None, resource_type: Optional[str] = None) -> int:
+        """
+        清除缓存
+
+        Args:
+            file_key: 文件 md5 或文件名，为空表示不限
+            resource_type: 资源类型，为空表示不限
+
+        Returns:
+            清除的条目数
+        """
+        conditions, params = [], []
+        if file_key:
+            conditions.append('(file_key = ? OR filename = ?)')
+            params.extend([file_key, file_key])
+        if resource_type:
+            conditions.append('resource_type = ?')
+            params.append(resource_type)
+
+        sql = 'DELETE FROM content_cache'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        with self._lock:
+            removed = self.connection.execute(sql, params).rowcount
+            self.connection.commit()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM content_cache'
+            ).fetchone()
+        return {'entries': row[0], 'total_hits': row[1]}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.connection.close()
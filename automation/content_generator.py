@@ -5,12 +5,18 @@ ResLibs AI 内容生成器
 """
 
 import os
+import re
 import json
+import time
 import asyncio
+import threading
 import logging
-from typing import Dict, List, Optional, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Set, Deque
 from pathlib import Path
 from datetime import datetime
+from dataclasses import dataclass, replace
 
 try:
     import google.generativeai as genai
@@ -20,6 +26,75 @@ except ImportError:
 
 from automation.config import config
 from automation.logger import setup_logger
+from automation.content_cache import ContentCache
+from automation.prompt_registry import PromptRegistry, estimate_tokens, truncate_to_tokens
+from automation.model_router import ModelRouter, Route
+from automation.llm_metrics import LLMMetricsStore, parse_model_prices
+from automation.product_family import parse_family
+from automation.unity_inspector import describe_unity_info
+from automation.media_probe import describe_media
+from automation.llm_json import (
+    extract_json, CONTENT_SCHEMA, StreamingJsonMonitor, MalformedStreamError
+)
+
+# 资源类型中文名称
+TYPE_NAMES = {
+    "unity-assets": "Unity 游戏开发资源",
+    "software-tools": "专业软件工具",
+    "design-assets": "设计素材资源",
+    "video-courses": "视频教程课程",
+    "audio-resources": "音频素材资源",
+    "documents": "文档资料",
+    "3d-models": "3D 模型资源",
+    "archives": "压缩包资源"
+}
+
+
+# 包内说明文档类别名称
+DOCUMENT_LABELS = {
+    "readme": "说明文档",
+    "package": "包清单",
+    "license": "许可协议",
+    "changelog": "更新日志"
+}
+
+# package.json 中写入提示的字段
+PACKAGE_FIELDS = ("name", "displayName", "version", "description", "unity", "unityRelease", "keywords", "author", "license")
+
+
+# 同系列新版本增量更新时由模型重写的字段，其余字段沿用上一版本
+DELTA_FIELDS = ["title_zh", "title_en", "meta_description", "requirements"]
+
+
+@dataclass
+class AICallMetrics:
+    """单次 AI 调用的 token、耗时和重试统计"""
+    prompt_tokens: int  # 优先使用接口返回的用量，否则为估算值
+    resource_type: str = ""
+    filename: str = ""
+    purpose: str = "single"  # single / batch / repair / delta / hedge（对冲中落败的请求）
+    items: int = 1  # 批量请求包含的资源数
+    model: str = ""  # 实际产出结果的模型
+    response_tokens: int = 0
+    hedged: bool = False  # 是否发起了对冲请求
+    response_chars: int = 0
+    time_to_first_token: Optional[float] = None  # 秒，非流式调用为空
+    latency: float = 0.0  # 秒，含排队和重试
+    attempts: int = 0
+    aborts: int = 0  # 因格式异常提前中止的次数
+    success: bool = False
+
+
+@dataclass
+class BatchItem:
+    """等待合并生成的单个资源"""
+    filename: str
+    file_type: str
+    resource_type: str
+    metadata: Dict[str, Any]
+    file_analysis: Dict[str, Any]
+    future: asyncio.Future
+    item_id: str = ""
 
 
 class ContentGenerator:
@@ -28,7 +103,56 @@ class ContentGenerator:
     def __init__(self):
         self.logger = setup_logger("ContentGenerator")
         self.model = None
+        self._models: Dict[str, Any] = {}
         self.is_configured = False
+        self._ai_semaphore: Optional[asyncio.Semaphore] = None
+        # 同步 SDK 调用的专用线程池：超时后 asyncio 已放弃等待的线程仍会运行到 SDK 返回，
+        # 由线程数上限保证实际在途请求不超过 max_concurrent_requests
+        self._ai_executor = ThreadPoolExecutor(
+            max_workers=config.ai.max_concurrent_requests, thread_name_prefix="gemini"
+        )
+        self.cache: Optional[ContentCache] = None
+        self.prompts = PromptRegistry.load(config.ai.prompt_dir, TYPE_NAMES)
+        self.logger.info(f"已加载 {len(self.prompts)} 类提示模板")
+
+        # 批量生成：按资源类型聚合的待发送队列和凑批计时器
+        self._pending_batches: Dict[str, List[BatchItem]] = {}
+        self._batch_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+        # 按资源复杂度选择模型档位，主模型变慢时降级或对冲
+        self.router = ModelRouter(
+            {
+                "fast": config.ai.fast_model or config.ai.gemini_model,
+                "standard": config.ai.gemini_model,
+                "complex": config.ai.complex_model or config.ai.gemini_model
+            },
+            latency_slo=config.ai.latency_slo,
+            hedge_after=config.ai.hedge_after
+        )
+
+        # 最近的 AI 调用统计，同时写入本地统计库
+        self.call_metrics: Deque[AICallMetrics] = deque(maxlen=1000)
+        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.metrics_store: Optional[LLMMetricsStore] = None
+
+        if config.ai.metrics_enabled:
+            try:
+                self.metrics_store = LLMMetricsStore(
+                    config.ai.metrics_path, parse_model_prices(config.ai.model_prices)
+                )
+            except Exception as e:
+                self.logger.warning(f"LLM 调用统计库初始化失败，将不记录统计: {e}")
+
+        if config.ai.content_cache_enabled:
+            try:
+                self.cache = ContentCache(
+                    config.ai.content_cache_path,
+                    max_entries=config.ai.content_cache_max_entries,
+                    max_age_days=config.ai.content_cache_max_age_days
+                )
+            except Exception as e:
+                self.logger.warning(f"内容缓存初始化失败，将不使用缓存: {e}")
 
         if GEMINI_AVAILABLE and config.ai.gemini_api_key:
             try:
@@ -69,20 +193,66 @@ class ContentGenerator:
                     filename, file_type, resource_type, metadata
                 )
 
+            # 查询内容缓存
+            file_key = ContentCache.file_key(
+                metadata.get('md5', ''), filename, metadata.get('size', 0)
+            )
+            template_hash = self.prompts.version(resource_type)
+            route = self.router.route(resource_type, metadata)
+            cache_model = self.router.tier_model(route.tier)
+            cache_key = ContentCache.make_key(
+                file_key, resource_type, cache_model, template_hash
+            )
+            if self.cache:
+                lookup_started = time.monotonic()
+                cached = self.cache.get(cache_key)
+                if cached:
+                    self.logger.info(f"内容缓存命中: {filename}")
+                    self._store_metrics(
+                        resource_type=resource_type, filename=filename, purpose="cache",
+                        model=cache_model, latency=time.monotonic() - lookup_started,
+                        cache_hit=True, success=True
+                    )
+                    return cached
+
+            # 同一产品的其他版本已生成过内容时，只增量更新版本相关字段
+            family_key, version = parse_family(filename)
+            if self.cache and config.ai.family_reuse and family_key:
+                previous = self.cache.latest_in_family(family_key, resource_type, file_key)
+                # 只在两个版本号都已识别且不同时复用，避免把不同的资源当作同一产品
+                if previous and previous[1] and previous[1] != version:
+                    delta_content = await self._generate_delta(
+                        filename, resource_type, metadata, version, previous
+                    )
+                    if delta_content:
+                        self.cache.put(
+                            cache_key, file_key, filename, resource_type, cache_model,
+                            template_hash, delta_content, family_key, version
+                        )
+                        return delta_content
+
             # 提取文件内容分析
-            file_analysis = await self._analyze_file(local_path, resource_type)
+            file_analysis = await self._analyze_file(local_path, resource_type, metadata)
 
-            # 构建 AI 提示
-            prompt = self._build_prompt(
-                filename, file_type, resource_type, metadata, file_analysis
-            )
+            if config.ai.batch_size > 1:
+                # 与同类型资源合并为一次请求
+                result = await self._submit_batch_item(
+                    filename, file_type, resource_type, metadata, file_analysis
+                )
+            else:
+                result = await self._generate_single(
+                    filename, file_type, resource_type, metadata, file_analysis, route
+                )
 
-            # 调用 AI 生成内容
-            content = await self._call_ai(prompt)
+            if result:
+                parsed_content, is_structured = result
 
-            if content:
-                # 解析和验证内容
-                parsed_content = self._parse_content(content, resource_type)
+                # 只缓存成功解析的结构化结果，文本兜底内容下次重新生成
+                if self.cache and is_structured:
+                    self.cache.put(
+                        cache_key, file_key, filename, resource_type,
+                        cache_model, template_hash, parsed_content, family_key, version
+                    )
                 return parsed_content
             else:
                 self.logger.warning("AI 生成内容失败，使用模拟内容")
@@ -97,13 +267,204 @@ class ContentGenerator:
                 filename, file_type, resource_type, metadata
             )
 
-    async def _analyze_file(self, local_path: Optional[str], resource_type: str) -> Dict[str, Any]:
+    async def _generate_single(
+        self,
+        filename: str,
+        file_type: str,
+        resource_type: str,
+        metadata: Dict[str, Any],
+        file_analysis: Dict[str, Any],
+        route: Route
+    ) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """单个资源单独请求，返回 (内容, 是否结构化)，AI 调用失败返回 None"""
+        prompt = self._build_prompt(
+            filename, file_type, resource_type, metadata, file_analysis
+        )
+        content = await self._call_ai(
+            prompt, route, roots="{", resource_type=resource_type, filename=filename
+        )
+        if not content:
+            return None
+        return await self._parse_content(content, filename, resource_type)
+
+    async def _generate_delta(
+        self,
+        filename: str,
+        resource_type: str,
+        metadata: Dict[str, Any],
+        version: str,
+        previous: Tuple[Dict[str, Any], str, str]
+    ) -> Optional[Dict[str, Any]]:
+        """基于同系列上一版本的内容增量生成，失败返回 None 以回退到完整生成"""
+        previous_content, previous_version, previous_filename = previous
+        self.logger.info(f"复用同系列版本 {previous_filename} 的内容，增量更新: {filename}")
+
+        # 通用字段中的旧版本号直接替换，不交给模型
+        merged = self._replace_version(previous_content, previous_version, version)
+
+        summary = {name: previous_content.get(name) for name in DELTA_FIELDS}
+        summary["description"] = previous_content.get("description", "")[:200]
+        prompt = self.prompts.delta.render(
+            previous_filename=previous_filename,
+            previous_version=previous_version or "未知",
+            previous=json.dumps(summary, ensure_ascii=False, indent=2),
+            filename=filename,
+            version=version or "未知",
+            size=metadata.get('size', 0),
+            field_specs=",\n".join(self.prompts.output_fields[name] for name in DELTA_FIELDS)
+        )
+
+        content = await self._call_ai(
+            prompt, self.router.fast_route(), roots="{",
+            resource_type=resource_type, filename=filename, purpose="delta"
+        )
+        delta = extract_json(content, "{") if content else None
+        if not isinstance(delta, dict):
+            self.logger.warning("增量更新结果无效，回退到完整生成")
+            return None
+
+        merged.update({name: value for name, value in delta.items() if name in DELTA_FIELDS})
+        errors = CONTENT_SCHEMA.validate(merged)
+        if errors:
+            self.logger.warning(f"增量更新字段校验失败，回退到完整生成: {', '.join(errors)}")
+            return None
+        return self._apply_defaults(merged, resource_type)
+
+    @staticmethod
+    def _replace_version(content: Dict[str, Any], old: str, new: str) -> Dict[str, Any]:
+        """替换内容中出现的旧版本号（纯数字版本只替换带 v / version / 版本 前缀的写法）"""
+        if not old or not new or old == new:
+            return dict(content)
+
+        if "." in old:
+            pattern = re.compile(r"(?<![\d.])" + re.escape(old) + r"(?![\d]|\.\d)")
+            replacement = new
+        else:
+            pattern = re.compile(r"(?i)(?<![a-z0-9])(v|ver\.?\s*|version\s*|版本\s*)" + re.escape(old) + r"(?!\d)")
+            replacement = r"\g<1>" + new
+
+        def replace(value):
+            if isinstance(value, str):
+                return pattern.sub(replacement, value)
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            return value
+
+        return {name: replace(value) for name, value in content.items()}
+
+    async def _submit_batch_item(
+        self,
+        filename: str,
+        file_type: str,
+        resource_type: str,
+        metadata: Dict[str, Any],
+        file_analysis: Dict[str, Any]
+    ) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """将资源加入同类型批次，等待批次生成完成"""
+        loop = asyncio.get_running_loop()
+        item = BatchItem(
+            filename, file_type, resource_type, metadata, file_analysis, loop.create_future()
+        )
+
+        pending = self._pending_batches.setdefault(resource_type, [])
+        pending.append(item)
+
+        if len(pending) >= config.ai.batch_size:
+            self._flush_batch(resource_type)
+        elif resource_type not in self._batch_timers:
+            self._batch_timers[resource_type] = loop.call_later(
+                config.ai.batch_window, self._flush_batch, resource_type
+            )
+
+        return await item.future
+
+    def _flush_batch(self, resource_type: str):
+        """发送某类型当前积攒的批次"""
+        timer = self._batch_timers.pop(resource_type, None)
+        if timer:
+            timer.cancel()
+
+        items = self._pending_batches.pop(resource_type, [])
+        if not items:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(resource_type, items))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, resource_type: str, items: List[BatchItem]):
+        """执行一个批次，解析失败的条目拆分后重试"""
+        if not items:
+            return
+
+        try:
+            if len(items) == 1:
+                item = items[0]
+                result = await self._generate_single(
+                    item.filename, item.file_type, resource_type,
+                    item.metadata, item.file_analysis,
+                    self.router.route(resource_type, item.metadata)
+                )
+                self._resolve(item, result)
+                return
+
+            for index, item in enumerate(items, 1):
+                item.item_id = str(index)
+
+            # 按批次中最复杂的资源选择模型
+            route = self.router.route(resource_type, max(
+                (item.metadata for item in items),
+                key=lambda metadata: self.router.complexity(resource_type, metadata)
+            ))
+
+            self.logger.info(f"批量生成 {len(items)} 个 {resource_type} 资源内容")
+            content = await self._call_ai(
+                self._build_batch_prompt(resource_type, items), route,
+                resource_type=resource_type, purpose="batch", items=len(items)
+            )
+            results = self._parse_batch_content(content, resource_type) if content else {}
+
+            failed = []
+            for item in items:
+                parsed = results.get(item.item_id)
+                if parsed is None:
+                    failed.append(item)
+                else:
+                    self._resolve(item, (parsed, True))
+
+            if failed:
+                # 对半拆分重试，单个条目最终退化为单独请求
+                self.logger.warning(f"批量结果中 {len(failed)}/{len(items)} 个条目无效，拆分重试")
+                middle = (len(failed) + 1) // 2
+                await asyncio.gather(
+                    self._run_batch(resource_type, failed[:middle]),
+                    self._run_batch(resource_type, failed[middle:])
+                )
+
+        except Exception as e:
+            self.logger.error(f"批量生成失败: {e}")
+            for item in items:
+                self._resolve(item, None)
+
+    @staticmethod
+    def _resolve(item: BatchItem, result: Optional[Tuple[Dict[str, Any], bool]]):
+        """设置条目结果（等待方可能已取消）"""
+        if not item.future.done():
+            item.future.set_result(result)
+
+    async def _analyze_file(
+        self,
+        local_path: Optional[str],
+        resource_type: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """分析文件内容"""
         analysis = {
             "file_size_info": "",
             "content_structure": "",
             "technical_specs": "",
-            "usage_scenarios": ""
+            "usage_scenarios": "",
+            "archive_context": self._build_archive_context(metadata or {})
         }
 
         if not local_path or not Path(local_path).exists():
@@ -120,6 +481,8 @@ class ContentGenerator:
                 analysis["content_structure"] = "Unity 资源包，包含游戏开发所需的3D模型、材质、脚本等"
                 analysis["technical_specs"] = "支持 Unity 2021.3+ 版本"
                 analysis["usage_scenarios"] = "适用于独立游戏开发、VR/AR 应用、移动游戏"
+                # 已解析出包内资源时用实际内容替换通用描述
+                analysis.update(describe_unity_info((metadata or {}).get('unity_info', {})))
 
             elif resource_type == "software-tools":
                 if file_path.suffix in [".exe", ".msi"]:
@@ -142,11 +505,74 @@ class ContentGenerator:
                 analysis["technical_specs"] = f"格式: {file_path.suffix.upper()}"
                 analysis["usage_scenarios"] = "在线学习、技能培训、知识提升"
 
+            # 视频、音频、PDF 的文件头信息和 3D 模型统计
+            media_info = (metadata or {}).get('media_info')
+            if media_info:
+                media_specs = describe_media(media_info)
+                analysis["technical_specs"] = "，".join(
+                    part for part in (analysis["technical_specs"], media_specs) if part
+                )
+
         except Exception as e:
             self.logger.warning(f"文件分析失败: {e}")
 
         return analysis
 
+    def _build_archive_context(self, metadata: Dict[str, Any]) -> str:
+        """压缩包目录概要和说明文档摘录，各自不超过配置的 token 预算"""
+        sections = []
+        outline = metadata.get('archive_outline')
+        if outline:
+            # 目录概要在提取时已按 AI_LISTING_TOKEN_BUDGET 压缩，不占用文档预算
+            sections.append("**包内目录概要：**\n" + outline)
+
+        documents = metadata.get('archive_documents') or []
+        remaining = config.ai.document_token_budget
+        for index, document in enumerate(documents):
+            # 剩余预算平均分给尚未写入的文档，前面文档用不完的部分顺延
+            share = remaining // (len(documents) - index)
+            if share <= 20:
+                break
+            text = document['text']
+            if document['kind'] == "package":
+                text = self._compact_package_json(text)
+            elif document['kind'] == "license":
+                share = min(share, 80)  # 许可协议只需开头的协议名称
+            header = f"**包内{DOCUMENT_LABELS.get(document['kind'], '文档')}（{document['path']}）：**\n"
+            section = header + truncate_to_tokens(self._clean_document(text), share - estimate_tokens(header))
+            sections.append(section)
+            remaining -= estimate_tokens(section)
+
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _clean_document(text: str) -> str:
+        """去掉图片、徽章和多余空行"""
+        lines = []
+        for line in text.splitlines():
+            line = line.rstrip()
+            if line.lstrip().startswith(("![", "[![", "<img", "<!--")):
+                continue
+            if not line and (not lines or not lines[-1]):
+                continue
+            lines.append(line)
+        return "\n".join(lines).strip()
+
+    @staticmethod
+    def _compact_package_json(text: str) -> str:
+        """只保留 package.json 中描述资源的字段，依赖只列名称；截断导致无法解析时原样返回"""
+        try:
+            manifest = json.loads(text)
+        except json.JSONDecodeError:
+            return text
+        if not isinstance(manifest, dict):
+            return text
+
+        compact = {key: manifest[key] for key in PACKAGE_FIELDS if key in manifest}
+        if isinstance(manifest.get('dependencies'), dict):
+            compact['dependencies'] = list(manifest['dependencies'])
+        return json.dumps(compact, ensure_ascii=False)
+
     def _detect_platform(self, extension: str) -> str:
         """检测文件平台"""
         platform_map = {
@@ -169,256 +595,452 @@ class ContentGenerator:
         file_analysis: Dict[str, Any]
     ) -> str:
         """构建 AI 提示"""
-        # 根据资源类型选择模板
-        templates = {
-            "unity-assets": self._get_unity_template(),
-            "software-tools": self._get_software_template(),
-            "design-assets": self._get_design_template(),
-            "video-courses": self._get_video_template(),
-            "audio-resources": self._get_audio_template(),
-            "documents": self._get_document_template(),
-            "3d-models": self._get_3d_model_template(),
-            "archives": self._get_archive_template()
-        }
+        template = self.prompts.single(resource_type)
+        return template.render(
+            resource_block=self._build_resource_block(
+                filename, file_type, resource_type, metadata, file_analysis
+            )
+        )
+
+    def _build_batch_prompt(self, resource_type: str, items: List[BatchItem]) -> str:
+        """构建批量提示：类型模板、要求和输出格式只出现一次，各资源信息按编号列出"""
+        blocks = "\n\n".join(
+            f"### 资源 {item.item_id}\n"
+            + self._build_resource_block(
+                item.filename, item.file_type, resource_type, item.metadata, item.file_analysis
+            )
+            for item in items
+        )
+        return self.prompts.batch(resource_type).render(count=len(items), resource_blocks=blocks)
 
-        base_template = templates.get(resource_type, self._get_general_template())
-
-        prompt = f"""
-请为以下{self._get_type_name(resource_type)}生成 SEO 优化的内容描述：
-
-**文件信息：**
-- 文件名：{filename}
-- 文件类型：{file_type}
-- 资源类型：{resource_type}
-- 文件大小：{metadata.get('size', 0)} bytes
-- 修改时间：{metadata.get('modified_time', 'Unknown')}
-
-**文件分析：**
-{file_analysis.get('file_size_info', '')}
-{file_analysis.get('content_structure', '')}
-{file_analysis.get('technical_specs', '')}
-{file_analysis.get('usage_scenarios', '')}
-
-{base_template}
-
-**要求：**
-1. 内容必须真实准确，基于提供的文件信息
-2. 生成的内容应该对用户有价值
-3. SEO 友好，包含相关关键词
-4. 标题要吸引人且准确
-5. 描述要详细且有用
-6. 标签要相关且准确
-7. 请确保所有生成的内容都是合法合规的
-
-**输出格式：**
-请严格按照以下 JSON 格式输出：
-```json
-{{
-  "title_zh": "中文标题",
-  "title_en": "English Title",
-  "description": "详细描述（300-500字）",
-  "meta_description": "SEO元描述（150-160字符）",
-  "tags": ["标签1", "标签2", "标签3", "标签4", "标签5"],
-  "keywords": ["关键词1", "关键词2", "关键词3"],
-  "category": "分类",
-  "difficulty": "难度级别",
-  "requirements": ["使用要求1", "使用要求2"],
-  "features": ["特性1", "特性2", "特性3"]
-}}
-```
-"""
+    def _build_resource_block(
+        self,
+        filename: str,
+        file_type: str,
+        resource_type: str,
+        metadata: Dict[str, Any],
+        file_analysis: Dict[str, Any]
+    ) -> str:
+        """单个资源的文件信息和分析段落"""
+        return self.prompts.resource_block.render(
+            filename=filename,
+            file_type=file_type,
+            resource_type=resource_type,
+            size=metadata.get('size', 0),
+            modified_time=metadata.get('modified_time', 'Unknown'),
+            file_size_info=file_analysis.get('file_size_info', ''),
+            content_structure=file_analysis.get('content_structure', ''),
+            technical_specs=file_analysis.get('technical_specs', ''),
+            usage_scenarios=file_analysis.get('usage_scenarios', ''),
+            archive_context=file_analysis.get('archive_context', '')
+        )
 
-        return prompt
-
-    def _get_unity_template(self) -> str:
-        """Unity 资源模板"""
-        return """
-**Unity 资源说明：**
-这是一个 Unity 游戏开发资源包，可能包含以下内容：
-- 3D 模型和材质
-- 贴图纹理
-- 脚本组件
-- 动画和特效
-- 音效资源
-
-请重点关注：
-- 适用的 Unity 版本
-- 资源的功能和用途
-- 适用于什么类型的游戏
-- 包含哪些具体内容
-- 安装和使用方法
-"""
+    def _get_type_name(self, resource_type: str) -> str:
+        """获取资源类型的中文名称"""
+        return TYPE_NAMES.get(resource_type, "数字资源")
 
-    def _get_software_template(self) -> str:
-        """软件工具模板"""
-        return """
-**软件工具说明：**
-这是一个专业软件工具，提供特定功能。
-
-请重点关注：
-- 软件的主要功能和用途
-- 适用平台和系统要求
-- 软件的特色和优势
-- 适用的用户群体
-- 安装和基本使用说明
-"""
+    async def _call_ai(
+        self,
+        prompt: str,
+        route: Route,
+        roots: str = "{[",
+        resource_type: str = "",
+        filename: str = "",
+        purpose: str = "single",
+        items: int = 1
+    ) -> Optional[str]:
+        """
+        调用 AI 生成内容（不阻塞事件循环，受并发上限和超时约束）
 
-    def _get_design_template(self) -> str:
-        """设计素材模板"""
-        return """
-**设计素材说明：**
-这是一个专业设计素材包，包含高质量的设计元素。
-
-请重点关注：
-- 素材的风格和主题
-- 包含的设计元素类型
-- 适用项目和场景
-- 文件格式和兼容性
-- 设计理念和使用建议
-"""
+        流式接收时边收边检查结构，格式明显异常立即中止并重试。
+        超时只是停止等待：同步 SDK 调用所在的线程会继续运行到 SDK 返回，期间仍占用 AI 线程池的一个线程，
+        因此线程池大小与并发上限相同；对冲请求另占一个并发名额。
 
-    def _get_video_template(self) -> str:
-        """视频课程模板"""
-        return """
-**视频课程说明：**
-这是一个教育视频课程，提供系统的学习内容。
-
-请重点关注：
-- 课程的主题和目标
-- 适合的学习者群体
-- 课程内容和结构
-- 学习收获和技能
-- 难度级别和学习时长
-"""
+        Args:
+            prompt: 提示文本
+            route: 模型路由
+            roots: 期望的顶层 JSON 结构起始字符
+            resource_type, filename, purpose, items: 记录到调用统计的上下文
+        """
+        metrics = AICallMetrics(
+            prompt_tokens=estimate_tokens(prompt), resource_type=resource_type,
+            filename=filename, purpose=purpose, items=items, model=route.model
+        )
+        started = time.monotonic()
+        text = None
+        partial = ""
+        try:
+            async with self._get_ai_semaphore():
+                for attempt in range(1, config.ai.stream_retries + 2):
+                    metrics.attempts = attempt
+                    metrics.time_to_first_token = None
+                    try:
+                        text = await asyncio.wait_for(
+                            self._generate_routed(prompt, roots, metrics, route),
+                            timeout=config.ai.request_timeout
+                        )
+                        break
+                    except MalformedStreamError as e:
+                        metrics.aborts += 1
+                        partial = e.partial_text
+                        self.logger.warning(f"AI 输出格式异常，提前中止 (第 {attempt} 次): {e}")
+                else:
+                    # 每次都被中止：残留输出中仍能提取出 JSON 才交给校验 / 修复，否则按失败处理让调用方回退
+                    if extract_json(partial, roots) is not None:
+                        text = partial
+
+            metrics.success = bool(text) and metrics.aborts < metrics.attempts
+            metrics.response_chars = len(text or "")
+            if not metrics.response_tokens and text:
+                metrics.response_tokens = estimate_tokens(text)
+            return text
+        except asyncio.TimeoutError:
+            self.logger.error(f"AI 调用超时 ({config.ai.request_timeout} 秒)")
+            return None
+        except Exception as e:
+            self.logger.error(f"AI 调用失败: {e}")
+            return None
+        finally:
+            metrics.latency = time.monotonic() - started
+            self._record_metrics(metrics)
+            self.logger.debug(
+                f"AI 调用 ({metrics.model}): 首 token {metrics.time_to_first_token or 0:.2f} 秒, "
+                f"总耗时 {metrics.latency:.2f} 秒, 尝试 {metrics.attempts} 次"
+            )
 
-    def _get_audio_template(self) -> str:
-        """音频资源模板"""
-        return """
-**音频资源说明：**
-这是一个音频素材包，包含高质量的声音资源。
-
-请重点关注：
-- 音频的类型和风格
-- 音质和格式信息
-- 适用场景和项目
-- 时长和文件数量
-- 使用授权说明
-"""
+    def _get_ai_semaphore(self) -> asyncio.Semaphore:
+        """获取并发控制信号量（在事件循环内延迟创建）"""
+        if self._ai_semaphore is None:
+            self._ai_semaphore = asyncio.Semaphore(config.ai.max_concurrent_requests)
+        return self._ai_semaphore
+
+    def _get_model(self, name: str):
+        """获取模型实例（按名称延迟创建）"""
+        if name == config.ai.gemini_model:
+            return self.model
+        if name not in self._models:
+            self._models[name] = genai.GenerativeModel(name)
+        return self._models[name]
+
+    async def _generate_routed(
+        self,
+        prompt: str,
+        roots: str,
+        metrics: AICallMetrics,
+        route: Route
+    ) -> str:
+        """按路由调用主模型；超过对冲等待时间仍未完成时并发请求快速模型，取先成功的结果"""
+        if not route.hedge_model:
+            return await self._timed_generate(prompt, roots, metrics, route.model)
 
-    def _get_document_template(self) -> str:
-        """文档资料模板"""
-        return """
-**文档资料说明：**
-这是一个文档资料包，包含有价值的信息内容。
-
-请重点关注：
-- 文档的主题和内容
-- 资料的深度和广度
-- 适用读者群体
-- 内容结构特点
-- 实用价值和应用
-"""
+        # 两个请求都会计费，各自统计用量：胜出请求的用量并入本次调用，落败请求另记一条 hedge 记录
+        requests: Dict[asyncio.Future, Tuple[AICallMetrics, float]] = {}
 
-    def _get_3d_model_template(self) -> str:
-        """3D 模型模板"""
-        return """
-**3D 模型说明：**
-这是一个3D模型资源，用于3D项目和渲染。
-
-请重点关注：
-- 模型的类型和主题
-- 建模质量和细节
-- 支持的文件格式
-- 适用软件和平台
-- 多边形数量和材质信息
-"""
+        def launch(model: str) -> asyncio.Future:
+            request_metrics = replace(metrics, model=model, response_tokens=0, time_to_first_token=None)
+            task = asyncio.ensure_future(self._timed_generate(prompt, roots, request_metrics, model))
+            requests[task] = (request_metrics, time.monotonic())
+            return task
 
-    def _get_archive_template(self) -> str:
-        """压缩包模板"""
-        return """
-**压缩包说明：**
-这是一个压缩文件包，包含多个相关资源。
-
-请重点关注：
-- 包含的内容类型
-- 压缩格式和大小
-- 解压后的内容结构
-- 整体用途和价值
-- 使用方式和要求
-"""
+        winner = launch(route.model)
+        try:
+            done, _ = await asyncio.wait(list(requests), timeout=route.hedge_delay)
+            semaphore = self._get_ai_semaphore()
+            if not done and semaphore.locked():
+                # 对冲请求同样占用并发名额，没有空闲名额时只等待主模型
+                self.logger.debug(f"并发已满，跳过对冲请求 {route.hedge_model}")
+            elif not done:
+                self.logger.info(
+                    f"模型 {route.model} 超过 {route.hedge_delay:.1f} 秒未完成，对冲请求 {route.hedge_model}"
+                )
+                metrics.hedged = True
+                for request_metrics, _ in requests.values():
+                    request_metrics.hedged = True
+                await semaphore.acquire()  # 有空闲名额，立即返回
+                # 任务结束（含启动前被取消）时归还名额
+                launch(route.hedge_model).add_done_callback(lambda _: semaphore.release())
+
+            pending = set(requests)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in requests:
+                if not task.done():
+                    task.cancel()
+            self._settle_hedge(metrics, requests, winner)
+
+    def _settle_hedge(
+        self,
+        metrics: AICallMetrics,
+        requests: Dict[asyncio.Future, Tuple[AICallMetrics, float]],
+        winner: asyncio.Future
+    ):
+        """胜出请求（全部失败时为主模型请求）的用量并入本次调用，其余请求各记一条 hedge 记录"""
+        winner_metrics = requests[winner][0]
+        metrics.model = winner_metrics.model
+        metrics.prompt_tokens = winner_metrics.prompt_tokens
+        metrics.response_tokens = winner_metrics.response_tokens
+        metrics.time_to_first_token = winner_metrics.time_to_first_token
+
+        for task, (loser, started) in requests.items():
+            if task is winner:
+                continue
+            loser.purpose = "hedge"
+            loser.items = 0
+            loser.hedged = False
+            loser.attempts = 1
+            loser.latency = time.monotonic() - started
+            # 被取消视为正常落败（刚取消的任务可能尚未结束），只有请求本身出错才记为失败
+            loser.success = not task.done() or task.cancelled() or task.exception() is None
+            self._record_metrics(loser)
+
+    async def _timed_generate(self, prompt: str, roots: str, metrics: AICallMetrics, model: str) -> str:
+        """调用指定模型并把延迟反馈给路由器"""
+        started = time.monotonic()
+        try:
+            text = await self._generate_text(prompt, roots, metrics, model)
+        except asyncio.CancelledError:
+            # 对冲落败的请求按已等待时间记录（延迟下界），使持续变慢的模型能被降级
+            if metrics.hedged:
+                self.router.record(model, time.monotonic() - started)
+            raise
+        self.router.record(model, time.monotonic() - started)
+        metrics.model = model
+        return text
+
+    async def _generate_text(self, prompt: str, roots: str, metrics: AICallMetrics, model_name: str) -> str:
+        """单次请求，返回模型输出文本；流式模式下返回提取出的 JSON 部分"""
+        attempt_started = time.monotonic()
+        model = self._get_model(model_name)
+
+        if not config.ai.stream_responses:
+            response = await self._generate_async(model, prompt)
+            self._apply_usage(metrics, response)
+            return response.text
 
-    def _get_general_template(self) -> str:
-        """通用模板"""
-        return """
-**资源说明：**
-这是一个数字资源文件。
-
-请重点关注：
-- 资源的主要用途
-- 文件的特点和价值
-- 适用场景和应用
-- 使用要求和条件
-- 对用户的帮助和价值
-"""
+        monitor = StreamingJsonMonitor(roots)
 
-    def _get_type_name(self, resource_type: str) -> str:
-        """获取资源类型的中文名称"""
-        type_names = {
-            "unity-assets": "Unity 游戏开发资源",
-            "software-tools": "专业软件工具",
-            "design-assets": "设计素材资源",
-            "video-courses": "视频教程课程",
-            "audio-resources": "音频素材资源",
-            "documents": "文档资料",
-            "3d-models": "3D 模型资源",
-            "archives": "压缩包资源"
-        }
-        return type_names.get(resource_type, "数字资源")
+        def on_chunk(chunk) -> bool:
+            if metrics.time_to_first_token is None:
+                metrics.time_to_first_token = time.monotonic() - attempt_started
+            self._apply_usage(metrics, chunk)
+            return monitor.feed(self._chunk_text(chunk))
 
-    async def _call_ai(self, prompt: str) -> Optional[str]:
-        """调用 AI 生成内容"""
+        if hasattr(model, 'generate_content_async'):
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if on_chunk(chunk):
+                    # 顶层 JSON 已完整，不再等待后续说明文字
+                    break
+        else:
+            cancelled = threading.Event()
+
+            def consume():
+                for chunk in model.generate_content(prompt, stream=True):
+                    if cancelled.is_set() or on_chunk(chunk):
+                        break
+
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._ai_executor, consume)
+            except asyncio.CancelledError:
+                # 通知线程停止读取剩余输出
+                cancelled.set()
+                raise
+
+        return monitor.finish()
+
+    @staticmethod
+    def _apply_usage(metrics: AICallMetrics, response):
+        """读取接口返回的 token 用量（流式响应在最后的分块中返回）"""
+        usage = getattr(response, 'usage_metadata', None)
+        if not usage:
+            return
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0)
+        response_tokens = getattr(usage, 'candidates_token_count', 0)
+        if prompt_tokens:
+            metrics.prompt_tokens = prompt_tokens
+        if response_tokens:
+            metrics.response_tokens = response_tokens
+
+    def _record_metrics(self, metrics: AICallMetrics):
+        """保存一次 AI 调用的统计"""
+        self.call_metrics.append(metrics)
+        self._store_metrics(
+            resource_type=metrics.resource_type,
+            filename=metrics.filename,
+            purpose=metrics.purpose,
+            items=metrics.items,
+            model=metrics.model,
+            prompt_tokens=metrics.prompt_tokens,
+            response_tokens=metrics.response_tokens,
+            latency=metrics.latency,
+            time_to_first_token=metrics.time_to_first_token,
+            attempts=metrics.attempts,
+            aborts=metrics.aborts,
+            hedged=metrics.hedged,
+            success=metrics.success
+        )
+
+    def _store_metrics(self, **fields):
+        """写入本地统计库（失败不影响生成流程）"""
+        if not self.metrics_store:
+            return
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            self.metrics_store.record(self.run_id, **fields)
         except Exception as e:
-            self.logger.error(f"AI 调用失败: {e}")
-            return None
+            self.logger.warning(f"写入 LLM 调用统计失败: {e}")
 
-    def _parse_content(self, content: str, resource_type: str) -> Dict[str, Any]:
-        """解析 AI 生成的内容"""
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """读取流式分块文本（被安全策略拦截的分块没有文本）"""
         try:
-            # 尝试解析 JSON
-            if content.startswith("```json"):
-                # 移除 markdown 代码块标记
-                content = content.replace("```json", "").replace("```", "").strip()
-
-            parsed = json.loads(content)
-
-            # 验证必需字段
-            required_fields = ["title_zh", "description", "tags"]
-            for field in required_fields:
-                if field not in parsed or not parsed[field]:
-                    self.logger.warning(f"缺少必需字段: {field}")
-                    parsed[field] = self._get_default_field(field, resource_type)
-
-            # 设置默认值
-            parsed.setdefault("title_en", parsed.get("title_zh", ""))
-            parsed.setdefault("meta_description", parsed.get("description", "")[:150])
-            parsed.setdefault("keywords", parsed.get("tags", []))
-            parsed.setdefault("category", self._get_type_name(resource_type))
-            parsed.setdefault("difficulty", "中级")
-            parsed.setdefault("requirements", [])
-            parsed.setdefault("features", [])
-
-            return parsed
-
-        except json.JSONDecodeError as e:
-            self.logger.error(f"JSON 解析失败: {e}")
+            return chunk.text or ""
+        except ValueError:
+            return ""
+
+    async def _generate_async(self, model, prompt: str):
+        """异步调用模型：优先使用 SDK 的异步接口，否则放到线程池执行"""
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ai_executor, model.generate_content, prompt)
+
+    def get_call_stats(self) -> Dict[str, Any]:
+        """汇总最近的 AI 调用统计"""
+        calls = list(self.call_metrics)
+        first_tokens = [m.time_to_first_token for m in calls if m.time_to_first_token is not None]
+        return {
+            "run_id": self.run_id,
+            "calls": len(calls),
+            "failed": sum(1 for m in calls if not m.success),
+            "hedge_losers": sum(1 for m in calls if m.purpose == "hedge"),
+            "prompt_tokens": sum(m.prompt_tokens for m in calls),
+            "response_tokens": sum(m.response_tokens for m in calls),
+            "aborts": sum(m.aborts for m in calls),
+            "avg_time_to_first_token": sum(first_tokens) / len(first_tokens) if first_tokens else 0.0,
+            "avg_latency": sum(m.latency for m in calls) / len(calls) if calls else 0.0,
+            "max_latency": max((m.latency for m in calls), default=0.0),
+            "hedged": sum(1 for m in calls if m.hedged),
+            "models": self.router.snapshot()
+        }
+
+    async def _parse_content(
+        self,
+        content: str,
+        filename: str,
+        resource_type: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        解析 AI 生成的内容，校验失败的字段发起有限次数的定向修复
+
+        Returns:
+            (内容, 是否为成功解析的结构化结果)
+        """
+        parsed = extract_json(content, "{")
+        if not isinstance(parsed, dict):
+            self.logger.error("AI 输出中未找到有效的 JSON 对象")
             # 尝试从文本中提取信息
-            return self._extract_from_text(content, resource_type)
-        except Exception as e:
-            self.logger.error(f"内容解析失败: {e}")
-            return self._get_default_content(resource_type)
+            return self._extract_from_text(content, resource_type), False
+
+        errors = CONTENT_SCHEMA.validate(parsed)
+        for _ in range(config.ai.max_repair_attempts):
+            if not errors:
+                break
+            self.logger.warning(f"字段校验失败，请求修复: {', '.join(errors)}")
+            repaired = await self._repair_fields(filename, parsed, errors)
+            if repaired:
+                parsed.update({name: value for name, value in repaired.items() if name in errors})
+            errors = CONTENT_SCHEMA.validate(parsed)
+
+        return self._finalize_content(parsed, errors, resource_type)
+
+    async def _repair_fields(
+        self,
+        filename: str,
+        parsed: Dict[str, Any],
+        errors: Dict[str, str]
+    ) -> Optional[Dict[str, Any]]:
+        """只针对失败字段请求模型重新生成"""
+        current = {name: value for name, value in parsed.items() if name not in errors}
+        prompt = self.prompts.repair.render(
+            filename=filename,
+            errors="\n".join(f"- {name}: {reason}" for name, reason in errors.items()),
+            current=json.dumps(current, ensure_ascii=False, indent=2),
+            field_specs=",\n".join(
+                self.prompts.output_fields.get(name, f'  "{name}": ""') for name in errors
+            )
+        )
+
+        content = await self._call_ai(
+            prompt, self.router.fast_route(), roots="{", filename=filename, purpose="repair"
+        )
+        repaired = extract_json(content, "{") if content else None
+        return repaired if isinstance(repaired, dict) else None
+
+    def _finalize_content(
+        self,
+        parsed: Dict[str, Any],
+        errors: Dict[str, str],
+        resource_type: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """处理仍未通过校验的字段并补全默认值，返回 (内容, 必需字段是否全部有效)"""
+        complete = True
+        for field_name in errors:
+            if field_name in CONTENT_SCHEMA.required:
+                self.logger.warning(f"必需字段无效，使用默认值: {field_name}")
+                parsed[field_name] = self._get_default_field(field_name, resource_type)
+                complete = False
+            else:
+                # 可选字段丢弃后由默认值补全
+                parsed.pop(field_name, None)
+        return self._apply_defaults(parsed, resource_type), complete
+
+    def _parse_batch_content(self, content: str, resource_type: str) -> Dict[str, Dict[str, Any]]:
+        """解析批量结果，返回 {资源编号: 内容}，只包含必需字段有效的条目"""
+        parsed = extract_json(content)
+        if parsed is None:
+            self.logger.error("批量结果中未找到有效的 JSON")
+            return {}
+
+        # 兼容模型输出 {"编号": {...}} 的对象形式
+        if isinstance(parsed, dict):
+            parsed = [
+                dict(value, id=key) for key, value in parsed.items() if isinstance(value, dict)
+            ]
+        if not isinstance(parsed, list):
+            return {}
+
+        results = {}
+        for entry in parsed:
+            if not isinstance(entry, dict) or "id" not in entry:
+                continue
+            item_id = str(entry.pop("id"))
+            errors = CONTENT_SCHEMA.validate(entry)
+            if any(field_name in CONTENT_SCHEMA.required for field_name in errors):
+                # 交给拆分重试，单独请求时可以定向修复
+                continue
+            results[item_id], _ = self._finalize_content(entry, errors, resource_type)
+        return results
+
+    def _apply_defaults(self, parsed: Dict[str, Any], resource_type: str) -> Dict[str, Any]:
+        """补全可选字段的默认值"""
+        parsed.setdefault("title_en", parsed.get("title_zh", ""))
+        parsed.setdefault("meta_description", parsed.get("description", "")[:150])
+        parsed.setdefault("keywords", parsed.get("tags", []))
+        parsed.setdefault("category", self._get_type_name(resource_type))
+        parsed.setdefault("difficulty", "中级")
+        parsed.setdefault("requirements", [])
+        parsed.setdefault("features", [])
+        return parsed
 
     def _extract_from_text(self, text: str, resource_type: str) -> Dict[str, Any]:
         """从纯文本中提取内容"""
@@ -7,7 +7,8 @@ ResLibs 付费下载平台管理器
 import os
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import concurrent.futures
+from typing import Dict, List, Optional, Any, Iterable
 from pathlib import Path
 from datetime import datetime
 import requests
@@ -16,6 +17,7 @@ import time
 
 from automation.config import config
 from automation.logger import setup_logger
+from automation.stream_relay import StreamFanout, FanoutReader, MultipartStreamBody
 
 
 class HostingManager:
@@ -360,6 +362,151 @@ class HostingManager:
 
         return results
 
+    async def stream_to_all_platforms(
+        self,
+        source: Iterable[bytes],
+        filename: str,
+        size: int,
+        platforms: Optional[List[str]] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        流式上传到所有配置的平台（数据源只读取一次，不落盘）
+
+        Args:
+            source: 数据块迭代器（如百度网盘下载流）
+            filename: 文件名
+            size: 文件大小，用于设置 Content-Length
+            platforms: 指定平台列表，None表示全部
+
+        Returns:
+            平台名称到下载链接的映射
+        """
+        if platforms is None:
+            platforms = ['rapidgator', 'turbobit', 'filecat']
+
+        targets = [
+            platform for platform in platforms
+            if getattr(config.hosting, f'{platform}_api_key', '')
+        ]
+
+        if not targets:
+            self.logger.warning("未配置付费下载平台，跳过流式上传")
+            return {}
+
+        if config.system.dry_run:
+            self.logger.info(f"试运行模式：模拟流式上传 {filename}")
+            return {
+                platform: await getattr(self, f'upload_to_{platform}')("", filename)
+                for platform in targets
+            }
+
+        fanout = StreamFanout(source, len(targets), config.download.stream_buffer_chunks)
+        loop = asyncio.get_running_loop()
+        # 生产者和各平台上传线程互相等待队列，使用独立线程池保证它们都能同时运行，
+        # 共享的默认线程池被其他任务占满时会死锁
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(targets) + 1, thread_name_prefix="stream-fanout"
+        )
+        try:
+            producer = loop.run_in_executor(executor, fanout.run)
+
+            uploads = [
+                self._stream_to_platform(platform, reader, filename, size, executor)
+                for platform, reader in zip(targets, fanout.readers)
+            ]
+            urls = await asyncio.gather(*uploads)
+            await producer
+        finally:
+            executor.shutdown(wait=False)
+
+        results = dict(zip(targets, urls))
+        successful_uploads = [url for url in urls if url]
+        self.logger.info(
+            f"流式上传完成: {len(successful_uploads)}/{len(targets)} 个平台成功，"
+            f"中转 {fanout.bytes_relayed} bytes"
+        )
+        return results
+
+    async def _stream_to_platform(
+        self,
+        platform: str,
+        reader: FanoutReader,
+        filename: str,
+        size: int,
+        executor: concurrent.futures.Executor
+    ) -> Optional[str]:
+        """单个平台的流式上传（在 fanout 专用线程池中发送），结束时释放读取端以免阻塞其他平台"""
+        try:
+            self.logger.info(f"开始流式上传到 {platform.title()}")
+            loop = asyncio.get_running_loop()
+
+            if platform == 'rapidgator':
+                await self._login_rapidgator()
+                upload_url = await self._get_rapidgator_upload_url()
+                if not upload_url:
+                    raise Exception("获取上传URL失败")
+
+                body = MultipartStreamBody('file', filename, reader, size)
+                result = await loop.run_in_executor(executor, self._post_stream, upload_url, body)
+                file_id = result.get('response', {}).get('file_id') if result.get('response_status') == 200 else None
+                if not file_id:
+                    raise Exception("文件上传失败")
+                return await self._get_rapidgator_download_url(file_id)
+
+            elif platform == 'turbobit':
+                await self._login_turbobit()
+                upload_data = await self._get_turbobit_upload_url()
+                if not upload_data:
+                    raise Exception("获取上传URL失败")
+
+                body = MultipartStreamBody(
+                    'user_file', filename, reader, size,
+                    fields={'user_hash': upload_data['user_hash']}
+                )
+                result = await loop.run_in_executor(executor, self._post_stream, upload_data['url'], body)
+                file_id = result.get('id') if result.get('status') == 'success' else None
+                if not file_id:
+                    raise Exception("文件上传失败")
+                return await self._get_turbobit_download_url(file_id)
+
+            elif platform == 'filecat':
+                await self._login_filecat()
+
+                body = MultipartStreamBody(
+                    'file', filename, reader, size,
+                    fields={'api_key': config.hosting.filecat_api_key}
+                )
+                result = await loop.run_in_executor(
+                    executor, self._post_stream, "https://filecat.net/api/upload", body
+                )
+                file_id = result.get('file_id') if result.get('success') else None
+                if not file_id:
+                    raise Exception("文件上传失败")
+                return f"https://filecat.net/d/{file_id}"
+
+            else:
+                self.logger.warning(f"未知平台: {platform}")
+                return None
+
+        except Exception as e:
+            self.logger.error(f"{platform.title()} 流式上传失败: {e}")
+            return None
+
+        finally:
+            reader.close()
+
+    def _post_stream(self, url: str, body: MultipartStreamBody) -> Dict[str, Any]:
+        """发送流式 multipart 请求（阻塞，在线程池中执行）"""
+        response = self.session.post(
+            url,
+            data=body,
+            headers={'Content-Type': body.content_type},
+            proxies=self.proxies,
+            timeout=config.hosting.upload_timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
     async def get_upload_progress(self, file_path: str) -> Dict[str, Any]:
         """获取上传进度信息"""
         try:
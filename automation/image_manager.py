@@ -4,6 +4,7 @@ ResLibs 图片管理器
 搜索、下载和管理相关图片，集成多个图片源API
 """
 
+import io
 import os
 import json
 import asyncio
@@ -11,25 +12,31 @@ import logging
 from typing import List, Dict, Optional, Any
 from pathlib import Path
 from datetime import datetime
-import requests
+import aiohttp
 from urllib.parse import urlencode, quote
 
 from automation.config import config
 from automation.logger import setup_logger
 
 
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# 流式下载图片时每次读取的大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
 class ImageManager:
     """图片管理器"""
 
     def __init__(self):
         self.logger = setup_logger("ImageManager")
-        self.session = requests.Session()
-        self.proxies = config.get_proxy_config()
-
-        # 设置请求头
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # aiohttp 只支持 HTTP 代理
+        self.proxy = config.system.https_proxy or config.system.http_proxy or None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self.max_image_size = config.image.parse_max_size()
 
     async def search_and_download_images(
         self,
@@ -37,7 +44,8 @@ class ImageManager:
         description: str,
         tags: List[str],
         resource_type: str,
-        max_images: int = 5
+        max_images: int = 5,
+        preferred_images: Optional[List[str]] = None
     ) -> List[str]:
         """
         搜索并下载相关图片
@@ -48,11 +56,21 @@ class ImageManager:
             tags: 标签列表
             resource_type: 资源类型
             max_images: 最大图片数量
+            preferred_images: 优先使用的本地图片（如压缩包内的预览图），有可用图片时不再联网搜索
 
         Returns:
             下载的图片路径列表
         """
         try:
+            if preferred_images:
+                local_images = [
+                    path for path in preferred_images
+                    if Path(path).exists() and self._is_valid_image(Path(path))
+                ][:max_images]
+                if local_images:
+                    self.logger.info(f"使用资源自带的 {len(local_images)} 张预览图，跳过图片搜索")
+                    return local_images
+
             if config.system.dry_run:
                 self.logger.info("试运行模式：模拟图片搜索和下载")
                 return await self._simulate_image_download(max_images)
@@ -62,43 +80,26 @@ class ImageManager:
 
             self.logger.info(f"搜索图片关键词: {search_query}")
 
-            # 从多个源搜索图片
-            all_images = []
-
-            # Unsplash
-            if config.image.unsplash_access_key:
-                unsplash_images = await self._search_unsplash(search_query, max_images // 2)
-                all_images.extend(unsplash_images)
-
-            # Pexels
-            if config.image.pexels_api_key:
-                pexels_images = await self._search_pexels(search_query, max_images // 2)
-                all_images.extend(pexels_images)
-
-            # Pixabay
-            if config.image.pixabay_api_key:
-                pixabay_images = await self._search_pixabay(search_query, max_images // 2)
-                all_images.extend(pixabay_images)
+            # 并发查询多个图片源
+            all_images = await self._search_providers(search_query, max_images)
 
             # 如果没有配置API，使用备用图片
             if not all_images:
                 self.logger.warning("未配置图片搜索API，使用备用图片")
                 all_images = await self._get_fallback_images(resource_type, max_images)
 
-            # 下载图片
+            # 并发下载图片（总并发数和每个主机的并发数由连接池限制）
+            results = await asyncio.gather(*[
+                self._download_image(image_info['url'], f"{resource_type}_{i+1}", image_info.get('id', ''))
+                for i, image_info in enumerate(all_images[:max_images])
+            ], return_exceptions=True)
+
             downloaded_images = []
-            for i, image_info in enumerate(all_images[:max_images]):
-                try:
-                    image_path = await self._download_image(
-                        image_info['url'],
-                        f"{resource_type}_{i+1}",
-                        image_info.get('id', '')
-                    )
-                    if image_path:
-                        downloaded_images.append(image_path)
-                except Exception as e:
-                    self.logger.warning(f"下载第 {i+1} 张图片失败: {e}")
-                    continue
+            for i, result in enumerate(results):
+                if isinstance(result, Exception):
+                    self.logger.warning(f"下载第 {i+1} 张图片失败: {result}")
+                elif result:
+                    downloaded_images.append(result)
 
             self.logger.info(f"成功下载 {len(downloaded_images)} 张图片")
             return downloaded_images
@@ -153,6 +154,65 @@ class ImageManager:
         self.logger.info(f"构建搜索关键词: {search_query}")
         return search_query
 
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """获取 HTTP 会话（需在事件循环中创建，关闭后重新创建）"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.image.download_concurrency,
+                limit_per_host=config.image.download_per_host
+            )
+            self._http = aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT})
+        return self._http
+
+    async def _search_providers(self, query: str, max_images: int) -> List[Dict[str, Any]]:
+        """
+        并发查询已配置的图片源
+
+        结果按返回先后合并并按 URL 去重，凑够 max_images 张后取消仍在进行的查询，
+        搜索耗时取决于最快的图片源而不是所有图片源之和。
+        """
+        providers = [
+            (name, search) for name, search, key in (
+                ("Unsplash", self._search_unsplash, config.image.unsplash_access_key),
+                ("Pexels", self._search_pexels, config.image.pexels_api_key),
+                ("Pixabay", self._search_pixabay, config.image.pixabay_api_key)
+            ) if key
+        ]
+        if not providers:
+            return []
+
+        tasks = [
+            asyncio.create_task(self._search_with_timeout(name, search, query, max_images))
+            for name, search in providers
+        ]
+        images: List[Dict[str, Any]] = []
+        seen_urls = set()
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                for image_info in await next_result:
+                    if image_info['url'] and image_info['url'] not in seen_urls:
+                        seen_urls.add(image_info['url'])
+                        images.append(image_info)
+                if len(images) >= max_images:
+                    break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if len(images) >= max_images and pending:
+            self.logger.info(f"已获得 {len(images)} 张候选图片，取消其余 {len(pending)} 个图片源的查询")
+        return images
+
+    async def _search_with_timeout(self, name: str, search, query: str, per_page: int) -> List[Dict[str, Any]]:
+        """单个图片源的查询，超时返回空列表"""
+        try:
+            return await asyncio.wait_for(search(query, per_page), config.image.search_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"{name} 搜索超时（{config.image.search_timeout:g} 秒）")
+            return []
+
     async def _search_unsplash(self, query: str, per_page: int = 10) -> List[Dict[str, Any]]:
         """搜索 Unsplash 图片"""
         try:
@@ -167,12 +227,12 @@ class ImageManager:
                 'Authorization': f'Client-ID {config.image.unsplash_access_key}'
             }
 
-            response = self.session.get(
-                url, params=params, headers=headers, proxies=self.proxies, timeout=30
-            )
-            response.raise_for_status()
+            async with self._get_http_session().get(
+                url, params=params, headers=headers, proxy=self.proxy
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
 
-            data = response.json()
             images = []
 
             for photo in data.get('results', []):
@@ -206,12 +266,12 @@ class ImageManager:
                 'Authorization': config.image.pexels_api_key
             }
 
-            response = self.session.get(
-                url, params=params, headers=headers, proxies=self.proxies, timeout=30
-            )
-            response.raise_for_status()
+            async with self._get_http_session().get(
+                url, params=params, headers=headers, proxy=self.proxy
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
 
-            data = response.json()
             images = []
 
             for photo in data.get('photos', []):
@@ -239,15 +299,15 @@ class ImageManager:
             params = {
                 'key': config.image.pixabay_api_key,
                 'q': query,
-                'per_page': per_page,
+                'per_page': max(per_page, 3),  # Pixabay 要求 3-200
                 'image_type': 'all',
                 'safesearch': 'true'
             }
 
-            response = self.session.get(url, params=params, proxies=self.proxies, timeout=30)
-            response.raise_for_status()
+            async with self._get_http_session().get(url, params=params, proxy=self.proxy) as response:
+                response.raise_for_status()
+                data = await response.json()
 
-            data = response.json()
             images = []
 
             for photo in data.get('hits', []):
@@ -295,7 +355,7 @@ class ImageManager:
         return images
 
     async def _download_image(self, url: str, filename: str, image_id: str = "") -> str:
-        """下载图片"""
+        """下载图片：流式读取到内存，超过大小上限立即中断，校验通过后才写入磁盘"""
         try:
             # 创建下载目录
             download_dir = Path(config.image.download_dir)
@@ -306,6 +366,7 @@ class ImageManager:
             if not file_extension:
                 file_extension = '.jpg'  # 默认使用jpg
 
+            image_id = str(image_id)
             safe_filename = f"{filename}_{image_id[:8] if image_id else 'img'}{file_extension}"
             # 确保文件名安全
             safe_filename = "".join(c for c in safe_filename if c.isalnum() or c in '._-')
@@ -314,31 +375,29 @@ class ImageManager:
 
             self.logger.info(f"下载图片: {safe_filename}")
 
-            # 下载图片
-            response = self.session.get(url, stream=True, proxies=self.proxies, timeout=30)
-            response.raise_for_status()
+            timeout = aiohttp.ClientTimeout(total=config.image.download_timeout)
+            async with self._get_http_session().get(url, proxy=self.proxy, timeout=timeout) as response:
+                response.raise_for_status()
 
-            # 检查内容类型
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                raise Exception(f"不是图片格式: {content_type}")
+                # 检查内容类型
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    raise Exception(f"不是图片格式: {content_type}")
 
-            # 检查文件大小
-            content_length = int(response.headers.get('content-length', 0))
-            max_size = config.image.parse_max_size() if hasattr(config.image, 'parse_max_size') else 5 * 1024 * 1024
-            if content_length > max_size:
-                raise Exception(f"图片文件过大: {content_length} bytes")
+                # content-length 可能缺失或不准确，仍以实际读取的字节数为准
+                if response.content_length and response.content_length > self.max_image_size:
+                    raise Exception(f"图片文件过大: {response.content_length} bytes")
 
-            # 写入文件
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    data.extend(chunk)
+                    if len(data) > self.max_image_size:
+                        raise Exception(f"图片文件过大: 超过 {config.image.max_image_size}")
 
-            # 验证下载的文件
-            if not self._is_valid_image(file_path):
-                file_path.unlink()  # 删除无效文件
+            # 验证图片内容后再写入文件
+            if not self._is_valid_image_data(bytes(data)):
                 raise Exception("下载的图片文件无效")
+            file_path.write_bytes(data)
 
             self.logger.info(f"图片下载完成: {file_path}")
             return str(file_path)
@@ -366,31 +425,34 @@ class ImageManager:
 
     def _is_valid_image(self, file_path: Path) -> bool:
         """验证图片文件是否有效"""
+        try:
+            return self._is_valid_image_data(Path(file_path).read_bytes())
+        except OSError:
+            return False
+
+    def _is_valid_image_data(self, data: bytes) -> bool:
+        """验证内存中的图片数据是否有效"""
         try:
             from PIL import Image
 
-            with Image.open(file_path) as img:
+            with Image.open(io.BytesIO(data)) as img:
                 img.verify()
             return True
         except Exception:
             # 如果 PIL 不可用，简单检查文件头
-            try:
-                with open(file_path, 'rb') as f:
-                    header = f.read(8)
-
-                # 检查常见图片格式的文件头
-                image_signatures = [
-                    b'\xFF\xD8\xFF',  # JPEG
-                    b'\x89PNG\r\n\x1a\n',  # PNG
-                    b'GIF87a',  # GIF87a
-                    b'GIF89a',  # GIF89a
-                    b'RIFF',    # WEBP (need to check further)
-                    b'BM',      # BMP
-                ]
-
-                return any(header.startswith(sig) for sig in image_signatures)
-            except Exception:
-                return False
+            header = data[:8]
+
+            # 检查常见图片格式的文件头
+            image_signatures = [
+                b'\xFF\xD8\xFF',  # JPEG
+                b'\x89PNG\r\n\x1a\n',  # PNG
+                b'GIF87a',  # GIF87a
+                b'GIF89a',  # GIF89a
+                b'RIFF',    # WEBP (need to check further)
+                b'BM',      # BMP
+            ]
+
+            return any(header.startswith(sig) for sig in image_signatures)
 
     async def _generate_placeholder_image(self, filename: str, resource_type: str) -> str:
         """生成占位符图片"""
@@ -530,7 +592,8 @@ class ImageManager:
             self.logger.warning(f"获取图片信息失败: {e}")
             return {}
 
-    def __del__(self):
-        """清理资源"""
-        if hasattr(self, 'session'):
-            self.session.close()
\ No newline at end of file
+    async def close(self):
+        """关闭 HTTP 会话"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+ResLibs 文件清单压缩
+把压缩包 / Unity 包的完整文件清单折叠为目录前缀概要（文件数、大小、扩展名分布），
+逐层展开直到用满 token 预算，使上万个文件的资源包也只占用固定长度的提示
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from automation.prompt_registry import estimate_tokens, truncate_to_tokens
+
+
+class _DirectoryNode:
+    """目录树节点，统计值包含所有子目录"""
+
+    __slots__ = ("children", "files", "count", "size", "extensions")
+
+    def __init__(self):
+        self.children: Dict[str, "_DirectoryNode"] = {}
+        self.files: List[Tuple[str, int]] = []
+        self.count = 0
+        self.size = 0
+        self.extensions: Dict[str, int] = {}
+
+    def add(self, parts: List[str], size: int):
+        node = self
+        extension = _extension(parts[-1])
+        for part in parts[:-1]:
+            node._count(extension, size)
+            node = node.children.setdefault(part, _DirectoryNode())
+        node._count(extension, size)
+        node.files.append((parts[-1], size))
+
+    def _count(self, extension: str, size: int):
+        self.count += 1
+        self.size += size
+        self.extensions[extension] = self.extensions.get(extension, 0) + 1
+
+    def height(self) -> int:
+        return 1 + max((child.height() for child in self.children.values()), default=0)
+
+
+def _extension(name: str) -> str:
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else "(无扩展名)"
+
+
+def _format_size(size: int) -> str:
+    for unit, scale in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size} B"
+
+
+class ListingCompactor:
+    """按 token 预算压缩文件清单"""
+
+    def __init__(self, token_budget: int = 400, max_files_per_dir: int = 5,
+                 max_dirs_per_dir: int = 12, max_extensions: int = 4):
+        self.token_budget = token_budget
+        self.max_files_per_dir = max_files_per_dir
+        self.max_dirs_per_dir = max_dirs_per_dir
+        self.max_extensions = max_extensions
+
+    def compact(self, entries: Iterable[Tuple[str, int]]) -> str:
+        """
+        压缩文件清单
+
+        Args:
+            entries: (路径, 大小)，路径以 / 分隔，不含目录条目
+
+        Returns:
+            不超过 token 预算的目录概要文本，清单为空或预算为 0 返回空字符串
+        """
+        if self.token_budget <= 0:
+            return ""
+        root = _DirectoryNode()
+        for path, size in entries:
+            parts = [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+            if parts:
+                root.add(parts, size)
+        if not root.count:
+            return ""
+
+        # 从只列顶层开始逐层加深，保留预算内最详细的一版
+        best = None
+        for depth in range(1, root.height() + 1):
+            text = "\n".join(self._render(root, depth))
+            if estimate_tokens(text) > self.token_budget:
+                break
+            best = text
+        if best is None:
+            best = truncate_to_tokens("\n".join(self._render(root, 1)), self.token_budget)
+        return best
+
+    def _render(self, node: _DirectoryNode, depth: int, level: int = 0) -> List[str]:
+        """渲染目录节点的子目录和文件，level 达到 depth 时子目录只输出概要"""
+        indent = "  " * level
+        lines = []
+
+        directories = sorted(node.children.items(), key=lambda item: -item[1].count)
+        for name, child in directories[:self.max_dirs_per_dir]:
+            # 只有一个子目录且没有文件的链式目录合并为一个前缀
+            while len(child.children) == 1 and not child.files:
+                (sub_name, child), = child.children.items()
+                name = f"{name}/{sub_name}"
+            lines.append(f"{indent}{name}/ {self._summary(child)}")
+            if level + 1 < depth:
+                lines.extend(self._render(child, depth, level + 1))
+        hidden_dirs = directories[self.max_dirs_per_dir:]
+        if hidden_dirs:
+            hidden = sum(child.count for _, child in hidden_dirs)
+            lines.append(f"{indent}… 其余 {len(hidden_dirs)} 个目录（{hidden} 个文件）")
+
+        files = sorted(node.files, key=lambda item: -item[1])
+        for name, size in files[:self.max_files_per_dir]:
+            lines.append(f"{indent}{name} ({_format_size(size)})")
+        if len(files) > self.max_files_per_dir:
+            lines.append(f"{indent}… 其余 {len(files) - self.max_files_per_dir} 个文件")
+        return lines
+
+    def _summary(self, node: _DirectoryNode) -> str:
+        extensions = sorted(node.extensions.items(), key=lambda item: -item[1])[:self.max_extensions]
+        histogram = ", ".join(f"{extension} {count}" for extension, count in extensions)
+        return f"({node.count} 个文件, {_format_size(node.size)}; {histogram})"
+
+
+def compact_listing(entries: Iterable[Tuple[str, int]], token_budget: int = 400) -> str:
+    """按默认参数压缩文件清单"""
+    return ListingCompactor(token_budget).compact(entries)
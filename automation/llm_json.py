@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+ResLibs LLM 输出 JSON 处理
+从模型回复中提取第一个括号平衡的 JSON 值（容忍前后说明文字和代码块），并按预编译的字段规则校验
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+
+_OPENERS = {"{": "}", "[": "]"}
+
+
+class BalancedJsonScanner:
+    """
+    增量式括号平衡扫描器
+
+    逐段 feed 文本，跟踪字符串和转义状态，在第一个顶层 JSON 对象/数组闭合时返回结束位置，
+    可用于完整文本，也可用于流式响应。
+    """
+
+    def __init__(self, openers: str = "{["):
+        self.openers = openers
+        self.buffer: List[str] = []
+        self.length = 0
+        self.start = -1
+        self.root: Optional[str] = None  # 顶层容器的起始字符
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def started(self) -> bool:
+        return self.start >= 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.buffer)
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """追加文本，顶层值闭合时返回其在全部文本中的结束位置（不含）"""
+        offset = self.length
+        self.buffer.append(chunk)
+        self.length += len(chunk)
+
+        stack = self._stack
+        for index, char in enumerate(chunk):
+            if not self.started:
+                if char in self.openers:
+                    self.start = offset + index
+                    self.root = char
+                    stack.append(_OPENERS[char])
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _OPENERS:
+                stack.append(_OPENERS[char])
+            elif char in "}]":
+                if not stack or char != stack[-1]:
+                    raise ValueError(f"括号不匹配: 位置 {offset + index}")
+                stack.pop()
+                if not stack:
+                    return offset + index + 1
+        return None
+
+
+def extract_json(text: str, openers: str = "{[") -> Optional[Any]:
+    """提取文本中第一个能成功解析的括号平衡 JSON 值，找不到返回 None"""
+    position = 0
+    while position < len(text):
+        scanner = BalancedJsonScanner(openers)
+        try:
+            end = scanner.feed(text[position:])
+        except ValueError:
+            end = None
+
+        if not scanner.started:
+            return None
+
+        start = position + scanner.start
+        if end is not None:
+            try:
+                return json.loads(text[start:position + end])
+            except json.JSONDecodeError:
+                pass
+        # 当前候选无效，从它之后继续寻找
+        position = start + 1
+    return None
+
+
+class MalformedStreamError(ValueError):
+    """流式输出已明显偏离预期结构"""
+
+    def __init__(self, reason: str, partial_text: str = ""):
+        super().__init__(reason)
+        self.partial_text = partial_text
+
+
+class StreamingJsonMonitor:
+    """
+    流式响应的结构监视器
+
+    每收到一段文本就增量扫描，一旦出现括号不匹配、长时间没有出现期望的顶层结构
+    或输出失控变长，立即抛出 MalformedStreamError 以便中止请求重试；
+    顶层 JSON 闭合后 feed 返回 True，调用方可不再读取剩余输出。
+    """
+
+    def __init__(self, roots: str = "{[", max_preamble: int = 2000, max_length: int = 60000):
+        self.roots = roots
+        self.max_preamble = max_preamble
+        self.max_length = max_length
+        # 只把期望的顶层开括号当作 JSON 起点，说明文字里的其他括号不会中止请求
+        self.scanner = BalancedJsonScanner(roots)
+        self.end: Optional[int] = None
+
+    def feed(self, chunk: str) -> bool:
+        """追加一段输出，返回顶层 JSON 是否已完整"""
+        scanner = self.scanner
+        try:
+            end = scanner.feed(chunk)
+        except ValueError as e:
+            raise MalformedStreamError(str(e), scanner.text)
+
+        if not scanner.started:
+            if scanner.length > self.max_preamble:
+                raise MalformedStreamError("输出中迟迟没有出现 JSON", scanner.text)
+            return False
+
+        if end is not None:
+            self.end = end
+            return True
+
+        if scanner.length - scanner.start > self.max_length:
+            raise MalformedStreamError("输出长度超出上限", scanner.text)
+        return False
+
+    def finish(self) -> str:
+        """流结束，返回完整的 JSON 文本；未闭合说明输出被截断"""
+        if self.end is None:
+            raise MalformedStreamError("输出在 JSON 结束前中断", self.scanner.text)
+        return self.scanner.text[self.scanner.start:self.end]
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """单个字段的校验规则"""
+    name: str
+    kind: type
+    required: bool = False
+    min_length: int = 0  # 字符串最短长度或列表最少元素数
+    max_length: int = 0  # 0 表示不限
+
+    def check(self, value: Any) -> Optional[str]:
+        """返回错误原因，合法返回 None"""
+        if not isinstance(value, self.kind):
+            return f"类型应为{_KIND_NAMES.get(self.kind, self.kind.__name__)}"
+        if self.kind is list and not all(isinstance(item, str) and item.strip() for item in value):
+            return "列表元素应为非空字符串"
+        size = len(value.strip()) if self.kind is str else len(value)
+        if size < self.min_length:
+            return f"长度不足（至少 {self.min_length}）"
+        if self.max_length and size > self.max_length:
+            return f"长度超出（至多 {self.max_length}）"
+        return None
+
+
+_KIND_NAMES = {str: "字符串", list: "字符串列表", dict: "对象"}
+
+
+class JsonSchema:
+    """预编译的扁平对象校验规则"""
+
+    def __init__(self, spec: Dict[str, Dict[str, Any]]):
+        kinds = {"string": str, "array": list, "object": dict}
+        self.rules: Tuple[FieldRule, ...] = tuple(
+            FieldRule(
+                name,
+                kinds[rule.get("type", "string")],
+                rule.get("required", False),
+                rule.get("min_length", 0),
+                rule.get("max_length", 0)
+            )
+            for name, rule in spec.items()
+        )
+        self.required = tuple(rule.name for rule in self.rules if rule.required)
+
+    def validate(self, data: Any) -> Dict[str, str]:
+        """校验对象，返回 {字段名: 错误原因}；缺失的可选字段不算错误"""
+        if not isinstance(data, dict):
+            return {"$": "应为 JSON 对象"}
+
+        errors = {}
+        for rule in self.rules:
+            if rule.name not in data or data[rule.name] in (None, "", []):
+                if rule.required:
+                    errors[rule.name] = "缺失或为空"
+                continue
+            reason = rule.check(data[rule.name])
+            if reason:
+                errors[rule.name] = reason
+        return errors
+
+
+# 生成内容的字段规则
+CONTENT_SCHEMA = JsonSchema({
+    "title_zh": {"type": "string", "required": True, "min_length": 2, "max_length": 120},
+    "title_en": {"type": "string", "max_length": 200},
+    "description": {"type": "string", "required": True, "min_length": 50},
+    "meta_description": {"type": "string", "max_length": 300},
+    "tags": {"type": "array", "required": True, "min_length": 1, "max_length": 20},
+    "keywords": {"type": "array", "max_length": 20},
+    "category": {"type": "string"},
+    "difficulty": {"type": "string"},
+    "requirements": {"type": "array"},
+    "features": {"type": "array"}
+})
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+ResLibs LLM 调用统计
+记录每次内容生成调用的 token 数、延迟、模型、重试和缓存命中情况，按运行批次和资源类型汇总
+"""
+
+import math
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+
+
+def parse_model_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """
+    解析模型价格配置
+
+    格式: "模型=输入价格/输出价格,..."，价格单位为美元 / 百万 token
+    例如: "gemini-1.5-flash=0.075/0.30,gemini-1.5-pro=1.25/5.00"
+    """
+    prices = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        model, _, price = item.partition("=")
+        input_price, _, output_price = price.partition("/")
+        try:
+            prices[model.strip()] = (float(input_price), float(output_price or input_price))
+        except ValueError:
+            continue
+    return prices
+
+
+class LLMMetricsStore:
+    """LLM 调用记录的本地存储（SQLite）"""
+
+    def __init__(self, db_path: str = "./data/llm_metrics.db",
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.prices = prices or {}
+        self._lock = threading.Lock()
+
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+        self._create_tables()
+
+    def _create_tables(self):
+        """创建统计表"""
+        with self._lock:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    resource_type TEXT,
+                    filename TEXT,
+                    purpose TEXT,  -- single / batch / repair / cache / hedge
+                    items INTEGER DEFAULT 1,  -- 批量请求包含的资源数
+                    model TEXT,
+                    prompt_tokens INTEGER DEFAULT 0,
+                    response_tokens INTEGER DEFAULT 0,
+                    latency REAL DEFAULT 0,
+                    time_to_first_token REAL,
+                    attempts INTEGER DEFAULT 0,
+                    aborts INTEGER DEFAULT 0,
+                    hedged INTEGER DEFAULT 0,
+                    cache_hit INTEGER DEFAULT 0,
+                    success INTEGER DEFAULT 0,
+                    cost REAL DEFAULT 0
+                )
+            ''')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls(run_id)'
+            )
+            self.connection.commit()
+
+    def cost(self, model: str, prompt_tokens: int, response_tokens: int) -> float:
+        """按配置价格估算费用（美元），未配置价格的模型记为 0"""
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
+
+    def record(self, run_id: str, **fields):
+        """写入一条调用记录，字段名与表结构一致"""
+        fields.setdefault("cost", self.cost(
+            fields.get("model", ""), fields.get("prompt_tokens", 0), fields.get("response_tokens", 0)
+        ))
+        columns = ["run_id", "created_at"] + list(fields)
+        values = [run_id, time.time()] + [
+            int(value) if isinstance(value, bool) else value for value in fields.values()
+        ]
+
+        with self._lock:
+            self.connection.execute(
+                f'INSERT INTO llm_calls ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                values
+            )
+            self.connection.commit()
+
+    def latest_run(self) -> Optional[str]:
+        """最近一次运行的 ID"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT run_id FROM llm_calls ORDER BY created_at DESC LIMIT 1'
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """最近的运行批次"""
+        with self._lock:
+            rows = self.connection.execute('''
+                SELECT run_id, MIN(created_at), COUNT(*), SUM(cost)
+                FROM llm_calls GROUP BY run_id ORDER BY MIN(created_at) DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        return [
+            {"run_id": run_id, "started_at": started_at, "calls": calls, "cost": cost or 0.0}
+            for run_id, started_at, calls, cost in rows
+        ]
+
+    def summary(self, run_id: Optional[str] = None, group_by: str = "resource_type") -> Dict[str, Dict[str, Any]]:
+        """
+        按维度汇总调用统计
+
+        Args:
+            run_id: 运行批次，为空表示全部
+            group_by: resource_type / model / purpose
+        """
+        if group_by not in ("resource_type", "model", "purpose"):
+            raise ValueError(f"不支持的汇总维度: {group_by}")
+
+        sql = f'''
+            SELECT {group_by}, cache_hit, prompt_tokens, response_tokens, latency,
+                   time_to_first_token, attempts, aborts, hedged, success, cost, items, purpose
+            FROM llm_calls
+        '''
+        params: Tuple = ()
+        if run_id:
+            sql += ' WHERE run_id = ?'
+            params = (run_id,)
+
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+
+        groups: Dict[str, List[tuple]] = {}
+        for row in rows:
+            groups.setdefault(row[0] or "unknown", []).append(row[1:])
+        return {key: self._aggregate(group) for key, group in sorted(groups.items())}
+
+    @staticmethod
+    def _aggregate(rows: List[tuple]) -> Dict[str, Any]:
+        """汇总一组调用记录（缓存命中和对冲落败的请求不计入延迟分布，后者只计入用量和费用）"""
+        calls = [row for row in rows if not row[0]]
+        timed = [row for row in calls if row[11] != "hedge"]
+        latencies = sorted(row[3] for row in timed)
+        first_tokens = [row[4] for row in timed if row[4] is not None]
+
+        def percentile(values: List[float], ratio: float) -> float:
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, math.ceil(len(values) * ratio) - 1)]
+
+        return {
+            "calls": len(calls),
+            "cache_hits": len(rows) - len(calls),
+            "resources": sum(1 if row[10] is None else row[10] for row in rows),
+            "prompt_tokens": sum(row[1] or 0 for row in calls),
+            "response_tokens": sum(row[2] or 0 for row in calls),
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p95_latency": percentile(latencies, 0.95),
+            "avg_time_to_first_token": sum(first_tokens) / len(first_tokens) if first_tokens else 0.0,
+            "retries": sum(max((row[5] or 1) - 1, 0) for row in calls),
+            "aborts": sum(row[6] or 0 for row in calls),
+            "hedged": sum(row[7] or 0 for row in calls),
+            "failed": sum(1 for row in calls if not row[8]),
+            "cost": sum(row[9] or 0.0 for row in rows)
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.connection.close()
@@ -21,7 +21,12 @@ from automation.config import config
 from automation.logger import setup_logger
 from automation.simple_database import SimpleDatabaseManager as DatabaseManager
 from automation.baidu_client import BaiduPanClient
+from automation.resource_classifier import Classification
+from automation.metadata_extractor import ExtractionOptions, MetadataExtractor
 from automation.content_generator import ContentGenerator
+from automation.content_cache import ContentCache
+from automation.analysis_cache import AnalysisCache
+from automation.llm_metrics import LLMMetricsStore, parse_model_prices
 from automation.image_manager import ImageManager
 from automation.cloudflare_r2 import CloudflareR2Manager
 from automation.hosting_manager import HostingManager
@@ -36,15 +41,21 @@ class ResourceInfo:
     modified_time: datetime
     file_type: str
     resource_type: str
+    type_confidence: float = 1.0
+    md5: str = ""
     download_url: Optional[str] = None
     local_path: Optional[str] = None
     content_data: Optional[Dict[str, Any]] = None
     images: List[str] = None
+    preview_images: List[str] = None  # 从资源包内提取的预览图
+    media_info: Optional[Dict[str, Any]] = None  # 媒体文件头信息（时长、分辨率、页数等）
     hosting_links: List[Dict[str, str]] = None
 
     def __post_init__(self):
         if self.images is None:
             self.images = []
+        if self.preview_images is None:
+            self.preview_images = []
         if self.hosting_links is None:
             self.hosting_links = []
 
@@ -60,14 +71,41 @@ class ResourceProcessor:
         self.image_manager = ImageManager()
         self.r2_manager = CloudflareR2Manager()
         self.hosting_manager = HostingManager()
+        self.metadata_extractor = MetadataExtractor(
+            workers=config.metadata.workers,
+            min_timeout=config.metadata.min_timeout,
+            timeout_factor=config.metadata.timeout_factor,
+            sequential_mbps=config.metadata.sequential_mbps,
+            cache=self._create_analysis_cache()
+        )
+
+    def _create_analysis_cache(self) -> Optional[AnalysisCache]:
+        """创建分析缓存，初始化失败时不使用缓存"""
+        if not config.metadata.cache_enabled:
+            return None
+        try:
+            return AnalysisCache(
+                config.metadata.cache_path,
+                max_entries=config.metadata.cache_max_entries,
+                max_age_days=config.metadata.cache_max_age_days,
+                failure_ttl_hours=config.metadata.failure_ttl_hours
+            )
+        except Exception as e:
+            self.logger.warning(f"分析缓存初始化失败，将不使用缓存: {e}")
+            return None
 
     async def process_single_resource(self, resource_info: ResourceInfo) -> bool:
         """处理单个资源的完整流程"""
         self.logger.info(f"开始处理资源: {resource_info.filename}")
 
         try:
+            # 流式中转模式跳过本地下载，上传时直接转发百度网盘下载流
+            stream_through = self._should_stream_through(resource_info)
+
             # 步骤1: 下载文件
-            if not await self._download_resource(resource_info):
+            if stream_through:
+                self.logger.info(f"步骤1: 流式中转模式，跳过本地下载 {resource_info.filename}")
+            elif not await self._download_resource(resource_info):
                 return False
 
             # 步骤2: 生成AI内容
@@ -79,7 +117,10 @@ class ResourceProcessor:
                 return False
 
             # 步骤4: 上传到付费下载平台
-            if not await self._upload_to_hosting(resource_info):
+            if stream_through:
+                if not await self._stream_to_hosting(resource_info):
+                    return False
+            elif not await self._upload_to_hosting(resource_info):
                 return False
 
             # 步骤5: 保存到数据库
@@ -97,6 +138,14 @@ class ResourceProcessor:
             # 清理临时文件
             await self._cleanup(resource_info)
 
+    def _should_stream_through(self, resource_info: ResourceInfo) -> bool:
+        """判断资源是否走流式中转（无需本地分析且分类可信）"""
+        return (
+            config.download.stream_through
+            and resource_info.resource_type in config.download.stream_through_types
+            and resource_info.type_confidence >= config.classifier.sniff_threshold
+        )
+
     async def _download_resource(self, resource_info: ResourceInfo) -> bool:
         """下载资源文件"""
         self.logger.info(f"步骤1: 下载文件 {resource_info.filename}")
@@ -115,12 +164,30 @@ class ResourceProcessor:
 
             resource_info.local_path = local_path
             self.logger.info(f"文件下载完成: {local_path}")
+
+            # 低置信度分类：根据文件头校正资源类型
+            self._refine_resource_type(resource_info)
             return True
 
         except Exception as e:
             self.logger.error(f"下载文件出错 {resource_info.filename}: {e}")
             return False
 
+    def _refine_resource_type(self, resource_info: ResourceInfo):
+        """使用文件头嗅探校正资源类型"""
+        classification = Classification(
+            resource_info.resource_type, resource_info.type_confidence, "listing"
+        )
+        refined = self.baidu_client.refine_resource_type(classification, resource_info.local_path)
+
+        if refined.resource_type != resource_info.resource_type:
+            self.logger.info(
+                f"资源类型校正: {resource_info.resource_type} -> {refined.resource_type} "
+                f"(置信度 {refined.confidence:.2f})"
+            )
+        resource_info.resource_type = refined.resource_type
+        resource_info.type_confidence = refined.confidence
+
     async def _generate_content(self, resource_info: ResourceInfo) -> bool:
         """生成AI内容"""
         self.logger.info(f"步骤2: 生成AI内容 {resource_info.filename}")
@@ -157,69 +224,31 @@ class ResourceProcessor:
             "size": resource_info.size,
             "file_type": resource_info.file_type,
             "resource_type": resource_info.resource_type,
-            "modified_time": resource_info.modified_time.isoformat()
+            "modified_time": resource_info.modified_time.isoformat(),
+            "md5": resource_info.md5
         }
 
-        # 如果是本地文件，提取更多元数据
+        # 如果是本地文件，在进程池中提取更多元数据（MIME 类型、压缩包 / Unity 包内容）
         if resource_info.local_path and os.path.exists(resource_info.local_path):
             try:
-                import magic
-                file_path = Path(resource_info.local_path)
-
-                # 检测文件MIME类型
-                mime_type = magic.from_file(str(file_path), mime=True)
-                metadata["mime_type"] = mime_type
-
-                # 如果是压缩文件，列出内容
-                if resource_info.file_type in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-                    metadata["archive_contents"] = await self._list_archive_contents(file_path)
-
-                # 如果是Unity包，提取Unity信息
-                if resource_info.file_type in ['.unitypackage', '.unity']:
-                    metadata["unity_info"] = await self._extract_unity_info(file_path)
+                options = ExtractionOptions(
+                    document_max_bytes=config.ai.document_max_bytes,
+                    listing_token_budget=config.ai.listing_token_budget,
+                    preview_dir=config.image.download_dir if config.image.archive_previews else "",
+                    max_previews=config.image.images_per_resource
+                )
+                result = await self.metadata_extractor.extract(
+                    resource_info.local_path, resource_info.file_type, options, resource_info.md5
+                )
+                metadata.update(result["metadata"])
+                resource_info.preview_images = result["preview_images"]
+                resource_info.media_info = result["metadata"].get("media_info")
 
             except Exception as e:
                 self.logger.warning(f"提取元数据失败: {e}")
 
         return metadata
 
-    async def _list_archive_contents(self, file_path: Path) -> List[str]:
-        """列出压缩文件内容"""
-        try:
-            import patoolib
-            temp_dir = Path(config.download.base_dir) / "temp_extract"
-            temp_dir.mkdir(exist_ok=True)
-
-            # 解压文件
-            patoolib.extract_archive(str(file_path), outdir=str(temp_dir))
-
-            # 获取文件列表
-            contents = []
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), temp_dir)
-                    contents.append(rel_path)
-
-            # 清理临时目录
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-
-            return contents[:50]  # 返回前50个文件
-
-        except Exception as e:
-            self.logger.warning(f"解压文件失败: {e}")
-            return []
-
-    async def _extract_unity_info(self, file_path: Path) -> Dict[str, Any]:
-        """提取Unity包信息"""
-        # 这里可以实现Unity包的详细解析
-        # 暂时返回基本信息
-        return {
-            "package_type": "unitypackage",
-            "unity_version": "unknown",
-            "assets_count": 0
-        }
-
     async def _process_images(self, resource_info: ResourceInfo) -> bool:
         """处理相关图片"""
         self.logger.info(f"步骤3: 搜索和下载相关图片 {resource_info.filename}")
@@ -235,7 +264,8 @@ class ResourceProcessor:
                 description=resource_info.content_data.get('description', ''),
                 tags=resource_info.content_data.get('tags', []),
                 resource_type=resource_info.resource_type,
-                max_images=config.image.images_per_resource
+                max_images=config.image.images_per_resource,
+                preferred_images=resource_info.preview_images
             )
 
             if not images:
@@ -319,6 +349,38 @@ class ResourceProcessor:
             self.logger.error(f"上传到付费平台出错 {resource_info.filename}: {e}")
             return False
 
+    async def _stream_to_hosting(self, resource_info: ResourceInfo) -> bool:
+        """流式中转：百度网盘下载流直接转发到付费下载平台"""
+        self.logger.info(f"步骤4: 流式上传到付费下载平台 {resource_info.filename}")
+
+        try:
+            source, size = await self.baidu_client.open_download_stream(
+                resource_info.path, resource_info.filename
+            )
+
+            results = await self.hosting_manager.stream_to_all_platforms(
+                source,
+                resource_info.filename,
+                size or resource_info.size
+            )
+
+            platform_names = {
+                "rapidgator": "Rapidgator",
+                "turbobit": "Turbobit",
+                "filecat": "FileCat"
+            }
+            resource_info.hosting_links = [
+                {"platform": platform, "url": url, "name": platform_names.get(platform, platform)}
+                for platform, url in results.items() if url
+            ]
+
+            self.logger.info(f"流式上传完成，成功上传到 {len(resource_info.hosting_links)} 个平台")
+            return len(resource_info.hosting_links) > 0
+
+        except Exception as e:
+            self.logger.error(f"流式上传到付费平台出错 {resource_info.filename}: {e}")
+            return False
+
     async def _save_to_database(self, resource_info: ResourceInfo) -> bool:
         """保存到数据库"""
         self.logger.info(f"步骤5: 保存到数据库 {resource_info.filename}")
@@ -336,6 +398,7 @@ class ResourceProcessor:
                 "download_links": json.dumps(resource_info.hosting_links),
                 "image_urls": json.dumps(resource_info.images),
                 "tags": json.dumps(resource_info.content_data.get('tags', [])),
+                "media_info": resource_info.media_info,
                 "status": "published",
                 "created_at": datetime.now(),
                 "updated_at": datetime.now()
@@ -370,6 +433,12 @@ class ResourceProcessor:
                         os.remove(image_path)
                         self.logger.debug(f"已清理图片文件: {image_path}")
 
+            # 清理从资源包内提取的预览图
+            for image_path in resource_info.preview_images:
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                    self.logger.debug(f"已清理预览图: {image_path}")
+
         except Exception as e:
             self.logger.warning(f"清理临时文件失败: {e}")
 
@@ -380,10 +449,12 @@ class AutomationOrchestrator:
     def __init__(self):
         self.logger = setup_logger("AutomationOrchestrator")
         self.processor = ResourceProcessor()
-        self.baidu_client = BaiduPanClient()
+        # 与处理器共用同一个客户端，使配额和流量统计覆盖全部下载
+        self.baidu_client = self.processor.baidu_client
+        self.run_report: Dict[str, Any] = {}
 
-    async def run_automation(self, target_path: str = None, limit: int = 1):
-        """运行自动化流程"""
+    async def run_automation(self, target_path: str = None, limit: int = 1) -> Dict[str, Any]:
+        """运行自动化流程，返回运行报告"""
         self.logger.info("=== 开始 ResLibs 百度网盘自动化流程 ===")
 
         try:
@@ -396,14 +467,72 @@ class AutomationOrchestrator:
 
             if not files:
                 self.logger.warning("未找到任何文件")
-                return
+                return self.run_report
 
             self.logger.info(f"找到 {len(files)} 个文件，开始处理前 {limit} 个")
 
-            # 处理文件
-            processed_count = 0
-            for i, file_info in enumerate(files[:limit]):
-                self.logger.info(f"\n--- 处理第 {i+1}/{min(limit, len(files))} 个文件 ---")
+            # 按剩余下载流量调整处理顺序
+            files = self.baidu_client.plan_downloads(files)
+
+            # 并发处理文件，同时进行的资源数受 MAX_CONCURRENT_RESOURCES 限制
+            total_count = min(limit, len(files))
+            semaphore = asyncio.Semaphore(max(config.system.max_concurrent_resources, 1))
+            outcomes = await asyncio.gather(*[
+                self._process_file(i, total_count, file_info, semaphore)
+                for i, file_info in enumerate(files[:limit])
+            ])
+
+            processed_count = outcomes.count("processed")
+            skipped_count = outcomes.count("skipped")
+
+            self.run_report = {
+                "total": total_count,
+                "processed": processed_count,
+                "skipped": skipped_count,
+                "failed": total_count - processed_count - skipped_count,
+                "baidu": await self.baidu_client.get_quota_stats(),
+                "ai": self.processor.content_generator.get_call_stats()
+            }
+
+            self.logger.info(f"\n=== 自动化流程完成 ===")
+            self.logger.info(f"总共处理: {total_count} 个文件")
+            self.logger.info(f"成功处理: {processed_count} 个文件")
+            self.logger.info(f"跳过处理: {skipped_count} 个文件")
+            self.logger.info(f"失败处理: {self.run_report['failed']} 个文件")
+            self._log_baidu_stats(self.run_report["baidu"])
+            self._log_ai_stats(self.run_report["ai"])
+
+            return self.run_report
+
+        except Exception as e:
+            self.logger.error(f"自动化流程出错: {e}")
+            raise
+
+        finally:
+            self.processor.metadata_extractor.shutdown()
+            await self.processor.image_manager.close()
+
+    async def _process_file(
+        self,
+        index: int,
+        total_count: int,
+        file_info: Dict[str, Any],
+        semaphore: asyncio.Semaphore
+    ) -> str:
+        """在并发槽位内处理单个文件，返回 processed / skipped / failed"""
+        async with semaphore:
+            self.logger.info(f"\n--- 处理第 {index+1}/{total_count} 个文件: {file_info['filename']} ---")
+
+            if not self.baidu_client.reserve_transfer(file_info['path'], file_info['size']):
+                self.logger.warning(f"⏭️ 当日剩余下载流量不足，跳过: {file_info['filename']}")
+                return "skipped"
+
+            try:
+                # 疑似被限速时退避
+                delay = self.baidu_client.throttle_delay()
+                if delay:
+                    self.logger.warning(f"百度网盘下载速度过低，等待 {delay} 秒...")
+                    await asyncio.sleep(delay)
 
                 # 创建资源信息对象
                 resource_info = ResourceInfo(
@@ -412,31 +541,92 @@ class AutomationOrchestrator:
                     size=file_info['size'],
                     modified_time=file_info['modified_time'],
                     file_type=file_info['file_type'],
-                    resource_type=file_info['resource_type']
+                    resource_type=file_info['resource_type'],
+                    type_confidence=file_info.get('resource_type_confidence', 1.0),
+                    md5=file_info.get('md5', '')
                 )
 
                 # 处理资源
                 success = await self.processor.process_single_resource(resource_info)
+            finally:
+                self.baidu_client.release_transfer(file_info['path'])
 
-                if success:
-                    processed_count += 1
-                    self.logger.info(f"✅ 文件处理成功: {resource_info.filename}")
-                else:
-                    self.logger.error(f"❌ 文件处理失败: {resource_info.filename}")
+            if success:
+                self.logger.info(f"✅ 文件处理成功: {resource_info.filename}")
+            else:
+                self.logger.error(f"❌ 文件处理失败: {resource_info.filename}")
 
-                # 步骤间暂停
-                if i < min(limit, len(files)) - 1:
-                    self.logger.info(f"暂停 {config.system.pause_between_steps} 秒...")
-                    await asyncio.sleep(config.system.pause_between_steps)
+            # 步骤间暂停（占用当前槽位，控制整体节奏）
+            if index < total_count - 1:
+                self.logger.info(f"暂停 {config.system.pause_between_steps} 秒...")
+                await asyncio.sleep(config.system.pause_between_steps)
 
-            self.logger.info(f"\n=== 自动化流程完成 ===")
-            self.logger.info(f"总共处理: {min(limit, len(files))} 个文件")
-            self.logger.info(f"成功处理: {processed_count} 个文件")
-            self.logger.info(f"失败处理: {min(limit, len(files)) - processed_count} 个文件")
+            return "processed" if success else "failed"
 
-        except Exception as e:
-            self.logger.error(f"自动化流程出错: {e}")
-            raise
+    def _log_baidu_stats(self, stats: Dict[str, Any]):
+        """输出百度网盘配额与流量统计"""
+        gb = 1024 ** 3
+        mb = 1024 ** 2
+        self.logger.info(
+            f"网盘配额: 已用 {stats['quota_used'] / gb:.1f} GB / 总计 {stats['quota_total'] / gb:.1f} GB"
+        )
+        self.logger.info(
+            f"今日下载: {stats['downloaded_bytes_today'] / gb:.2f} GB "
+            f"({stats['download_count']} 个文件, 平均 {stats['average_speed'] / mb:.2f} MB/s)"
+        )
+        if stats['remaining_transfer'] is not None:
+            self.logger.info(f"剩余下载流量: {stats['remaining_transfer'] / gb:.2f} GB")
+        for account in stats.get('accounts', []):
+            self.logger.info(
+                f"  账号 {account['name']}: {'健康' if account['healthy'] else '冷却中'}, "
+                f"下载 {account['download_count']} 个 / {account['downloaded_bytes'] / gb:.2f} GB, "
+                f"速度 {account['throughput'] / mb:.2f} MB/s, 失败 {account['failure_count']} 次"
+            )
+
+    def _log_ai_stats(self, stats: Dict[str, Any]):
+        """输出 AI 调用耗时统计"""
+        if not stats['calls']:
+            return
+        self.logger.info(
+            f"AI 调用 (运行 {stats['run_id']}): {stats['calls']} 次 "
+            f"(失败 {stats['failed']} 次, 提前中止 {stats['aborts']} 次, 对冲 {stats['hedged']} 次), "
+            f"tokens {stats['prompt_tokens']}/{stats['response_tokens']}, "
+            f"平均首 token {stats['avg_time_to_first_token']:.2f} 秒, "
+            f"平均耗时 {stats['avg_latency']:.2f} 秒, 最长 {stats['max_latency']:.2f} 秒"
+        )
+
+
+def print_llm_stats(run_id: str, group_by: str):
+    """打印 LLM 调用统计"""
+    store = LLMMetricsStore(config.ai.metrics_path, parse_model_prices(config.ai.model_prices))
+    try:
+        if run_id == "all":
+            run_id = ""
+        elif not run_id:
+            run_id = store.latest_run() or ""
+            if not run_id:
+                print("暂无 LLM 调用记录")
+                return
+
+        print(f"=== LLM 调用统计 ({run_id or '全部运行'}) ===")
+        summary = store.summary(run_id or None, group_by)
+        for key, stats in summary.items():
+            print(
+                f"{key:<18} 调用 {stats['calls']:>4} 次 | 缓存命中 {stats['cache_hits']:>4} | "
+                f"资源 {stats['resources']:>4} | tokens {stats['prompt_tokens']}/{stats['response_tokens']} | "
+                f"平均 {stats['avg_latency']:.2f}s p95 {stats['p95_latency']:.2f}s "
+                f"首token {stats['avg_time_to_first_token']:.2f}s | "
+                f"重试 {stats['retries']} 中止 {stats['aborts']} 对冲 {stats['hedged']} 失败 {stats['failed']} | "
+                f"${stats['cost']:.4f}"
+            )
+
+        if not run_id:
+            print("\n最近运行:")
+            for run in store.list_runs():
+                started = datetime.fromtimestamp(run['started_at']).strftime('%Y-%m-%d %H:%M:%S')
+                print(f"  {run['run_id']}  {started}  {run['calls']} 条记录  ${run['cost']:.4f}")
+    finally:
+        store.close()
 
 
 async def main():
@@ -448,6 +638,23 @@ async def main():
     parser.add_argument("--limit", type=int, default=1, help="处理文件数量限制")
     parser.add_argument("--dry-run", action="store_true", help="试运行模式")
     parser.add_argument("--config", action="store_true", help="显示配置信息")
+    parser.add_argument(
+        "--invalidate-cache", nargs="?", const="", metavar="FILE_KEY",
+        help="清除内容生成缓存（可指定文件 md5 或文件名，不指定则全部清除）"
+    )
+    parser.add_argument("--cache-type", help="配合 --invalidate-cache 使用，仅清除该资源类型的缓存")
+    parser.add_argument(
+        "--invalidate-analysis-cache", nargs="?", const="", metavar="DIGEST",
+        help="清除文件分析缓存（可指定文件 md5/SHA-256 或文件名，不指定则全部清除）"
+    )
+    parser.add_argument(
+        "--llm-stats", nargs="?", const="", metavar="RUN_ID",
+        help="查看 LLM 调用统计（默认最近一次运行，all 表示全部）"
+    )
+    parser.add_argument(
+        "--group-by", choices=["resource_type", "model", "purpose"], default="resource_type",
+        help="配合 --llm-stats 使用的汇总维度"
+    )
 
     args = parser.parse_args()
 
@@ -456,6 +663,27 @@ async def main():
         config.print_config_summary()
         return
 
+    # 清除内容生成缓存
+    if args.invalidate_cache is not None:
+        cache = ContentCache(config.ai.content_cache_path)
+        removed = cache.invalidate(file_key=args.invalidate_cache or None, resource_type=args.cache_type)
+        cache.close()
+        print(f"🧹 已清除 {removed} 条内容生成缓存")
+        return
+
+    # 清除文件分析缓存
+    if args.invalidate_analysis_cache is not None:
+        cache = AnalysisCache(config.metadata.cache_path)
+        removed = cache.invalidate(args.invalidate_analysis_cache or None)
+        cache.close()
+        print(f"🧹 已清除 {removed} 条文件分析缓存")
+        return
+
+    # 查看 LLM 调用统计
+    if args.llm_stats is not None:
+        print_llm_stats(args.llm_stats, args.group_by)
+        return
+
     # 设置试运行模式
     if args.dry_run:
         config.system.dry_run = True
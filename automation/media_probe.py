@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+ResLibs 媒体文件头探测
+只读取容器头部获取时长、分辨率、编码、码率和页数等信息：
+MP4/MOV 的 moov atom、MP3 帧头与 Xing/Info、FLAC STREAMINFO、WAV fmt/data 块、PDF 交叉引用表与 Info 字典。
+全部通过 seek 定位，不顺序扫描文件，几 GB 的视频也只需读取几 KB 到几 MB
+"""
+
+import re
+import zlib
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+
+VIDEO_EXTENSIONS = frozenset({".mp4", ".m4v", ".mov"})
+AUDIO_EXTENSIONS = frozenset({".mp3", ".flac", ".wav", ".m4a"})
+DOCUMENT_EXTENSIONS = frozenset({".pdf"})
+DESIGN_EXTENSIONS = frozenset({".psd", ".psb"})
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS | DOCUMENT_EXTENSIONS | DESIGN_EXTENSIONS
+
+# moov 通常只有几百 KB，超过该大小视为异常
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+# PDF 尾部读取长度（包含 startxref 和 trailer）
+PDF_TAIL_BYTES = 4096
+
+# PDF 压缩的交叉引用流 / 对象流允许解压的最大字节数
+PDF_MAX_STREAM_BYTES = 8 * 1024 * 1024
+
+
+class ProbeError(Exception):
+    """文件头不符合预期格式"""
+
+
+def probe_media(path: str, file_type: str, thumbnail_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    按扩展名探测媒体文件（阻塞调用，应在线程池或进程池中执行）
+
+    Args:
+        thumbnail_path: 文件内嵌缩略图（PSD）的保存路径，为空则不保存
+
+    Returns:
+        媒体信息字典，不支持的格式返回 None
+    """
+    file_type = file_type.lower()
+    with open(path, "rb") as f:
+        if file_type in (".mp4", ".m4v", ".mov", ".m4a"):
+            return _probe_mp4(f)
+        if file_type == ".mp3":
+            return _probe_mp3(f)
+        if file_type == ".flac":
+            return _probe_flac(f)
+        if file_type == ".wav":
+            return _probe_wav(f)
+        if file_type == ".pdf":
+            return _probe_pdf(f)
+        if file_type in DESIGN_EXTENSIONS:
+            return _probe_psd(f, thumbnail_path)
+    return None
+
+
+def _file_size(f: BinaryIO) -> int:
+    size = f.seek(0, 2)
+    f.seek(0)
+    return size
+
+
+def _with_bitrate(info: Dict[str, Any], size: int) -> Dict[str, Any]:
+    """按文件大小和时长计算平均码率（kbps）"""
+    if info.get("duration") and "bitrate" not in info:
+        info["bitrate"] = round(size * 8 / info["duration"] / 1000)
+    return info
+
+
+# ---------- MP4 / MOV ----------
+
+def _iter_atoms(data: bytes, offset: int = 0, end: Optional[int] = None):
+    """遍历内存中的 atom，返回 (类型, 内容起点, 内容终点)"""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            break
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _find_atom(data: bytes, path: List[bytes], start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    for kind, body_start, body_end in _iter_atoms(data, start, end):
+        if kind == path[0]:
+            if len(path) == 1:
+                return body_start, body_end
+            return _find_atom(data, path[1:], body_start, body_end)
+    return None
+
+
+def _read_moov(f: BinaryIO) -> bytes:
+    """逐个读取顶层 atom 头并 seek 跳过 mdat 等数据块，直到找到 moov"""
+    file_size = _file_size(f)
+    position = 0
+    while position + 8 <= file_size:
+        f.seek(position)
+        header = f.read(16)
+        size, kind = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - position
+        if size < header_size:
+            raise ProbeError("atom 大小无效")
+
+        if kind == b"moov":
+            if size > MAX_MOOV_BYTES:
+                raise ProbeError("moov 过大")
+            f.seek(position + header_size)
+            return f.read(size - header_size)
+        position += size
+    raise ProbeError("未找到 moov atom")
+
+
+def _probe_mp4(f: BinaryIO) -> Dict[str, Any]:
+    size = _file_size(f)
+    moov = _read_moov(f)
+    info: Dict[str, Any] = {"container": "mp4"}
+
+    mvhd = _find_atom(moov, [b"mvhd"])
+    if mvhd:
+        start = mvhd[0]
+        version = moov[start]
+        if version == 1:
+            timescale, duration = struct.unpack(">IQ", moov[start + 20:start + 32])
+        else:
+            timescale, duration = struct.unpack(">II", moov[start + 12:start + 20])
+        if timescale:
+            info["duration"] = round(duration / timescale, 2)
+
+    for kind, body_start, body_end in _iter_atoms(moov):
+        if kind != b"trak":
+            continue
+        hdlr = _find_atom(moov, [b"mdia", b"hdlr"], body_start, body_end)
+        handler = moov[hdlr[0] + 8:hdlr[0] + 12] if hdlr else b""
+        stsd = _find_atom(moov, [b"mdia", b"minf", b"stbl", b"stsd"], body_start, body_end)
+        codec = ""
+        if stsd and stsd[1] - stsd[0] >= 16:
+            codec = moov[stsd[0] + 12:stsd[0] + 16].decode("latin-1").strip()
+
+        if handler == b"vide" and "video_codec" not in info:
+            info["video_codec"] = codec
+            tkhd = _find_atom(moov, [b"tkhd"], body_start, body_end)
+            if tkhd and tkhd[1] - tkhd[0] >= 8:
+                width, height = struct.unpack(">II", moov[tkhd[1] - 8:tkhd[1]])
+                info["width"], info["height"] = width >> 16, height >> 16
+        elif handler == b"soun" and "audio_codec" not in info:
+            info["audio_codec"] = codec
+
+    return _with_bitrate(info, size)
+
+
+# ---------- MP3 ----------
+
+_MP3_BITRATES = {
+    # (MPEG-1, Layer III) / (MPEG-2/2.5, Layer III)，单位 kbps
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _probe_mp3(f: BinaryIO) -> Dict[str, Any]:
+    size = _file_size(f)
+    head = f.read(10)
+    audio_start = 0
+    if head[:3] == b"ID3":
+        # ID3v2 标签长度为 syncsafe 整数
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    f.seek(audio_start)
+    block = f.read(4096)
+    index = 0
+    while index + 4 <= len(block):
+        if block[index] == 0xFF and block[index + 1] & 0xE0 == 0xE0:
+            break
+        index += 1
+    else:
+        raise ProbeError("未找到 MP3 帧头")
+
+    header = struct.unpack(">I", block[index:index + 4])[0]
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    channel_mode = (header >> 6) & 0x3
+    if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        raise ProbeError("不支持的 MP3 帧头")
+
+    mpeg1 = version_bits == 3
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index]
+    samples_per_frame = 1152 if mpeg1 else 576
+    info: Dict[str, Any] = {
+        "container": "mp3",
+        "audio_codec": "mp3",
+        "sample_rate": sample_rate,
+        "channels": 1 if channel_mode == 3 else 2
+    }
+
+    # VBR 文件的第一帧带 Xing/Info 头，记录总帧数
+    side_info = (17 if channel_mode == 3 else 32) if mpeg1 else (9 if channel_mode == 3 else 17)
+    xing = index + 4 + side_info
+    if block[xing:xing + 4] in (b"Xing", b"Info") and struct.unpack(">I", block[xing + 4:xing + 8])[0] & 0x1:
+        frames = struct.unpack(">I", block[xing + 8:xing + 12])[0]
+        info["duration"] = round(frames * samples_per_frame / sample_rate, 2)
+    else:
+        info["duration"] = round((size - audio_start - index) * 8 / (bitrate * 1000), 2)
+        info["bitrate"] = bitrate
+    return _with_bitrate(info, size)
+
+
+# ---------- FLAC ----------
+
+def _probe_flac(f: BinaryIO) -> Dict[str, Any]:
+    size = _file_size(f)
+    head = f.read(42)
+    if head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        raise ProbeError("不是 FLAC 文件")
+
+    # STREAMINFO 第 10 字节起：采样率 20 位、声道 3 位、位深 5 位、总采样数 36 位
+    packed = int.from_bytes(head[18:26], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    bits = ((packed >> 36) & 0x1F) + 1
+    total_samples = packed & 0xFFFFFFFFF
+
+    info: Dict[str, Any] = {
+        "container": "flac",
+        "audio_codec": "flac",
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bits_per_sample": bits
+    }
+    if sample_rate and total_samples:
+        info["duration"] = round(total_samples / sample_rate, 2)
+    return _with_bitrate(info, size)
+
+
+# ---------- WAV ----------
+
+def _probe_wav(f: BinaryIO) -> Dict[str, Any]:
+    size = _file_size(f)
+    head = f.read(12)
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        raise ProbeError("不是 WAV 文件")
+
+    info: Dict[str, Any] = {"container": "wav"}
+    byte_rate = 0
+    position = 12
+    while position + 8 <= size:
+        f.seek(position)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            fmt = f.read(16)
+            audio_format, channels, sample_rate, byte_rate, _, bits = struct.unpack("<HHIIHH", fmt)
+            info.update({
+                "audio_codec": "pcm" if audio_format in (1, 0xFFFE) else f"0x{audio_format:04x}",
+                "sample_rate": sample_rate,
+                "channels": channels,
+                "bits_per_sample": bits,
+                "bitrate": round(byte_rate * 8 / 1000)
+            })
+        elif chunk_id == b"data":
+            if byte_rate:
+                # 流式写入的 WAV data 大小可能是占位值，取与实际文件大小的较小者
+                data_size = min(chunk_size, size - position - 8)
+                info["duration"] = round(data_size / byte_rate, 2)
+            break
+        position += 8 + chunk_size + (chunk_size & 1)
+    return info
+
+
+# ---------- PDF ----------
+
+_STARTXREF_PATTERN = re.compile(rb"startxref\s+(\d+)")
+_REF_PATTERN = rb"/%s\s+(\d+)\s+\d+\s+R"
+_LINEARIZED_PATTERN = re.compile(rb"/Linearized.*?/N\s+(\d+)", re.DOTALL)
+
+
+def _dict_ref(data: bytes, key: bytes) -> Optional[int]:
+    match = re.search(_REF_PATTERN % key, data)
+    return int(match.group(1)) if match else None
+
+
+def _probe_pdf(f: BinaryIO) -> Dict[str, Any]:
+    size = _file_size(f)
+    head = f.read(1024)
+    if not head.startswith(b"%PDF-"):
+        raise ProbeError("不是 PDF 文件")
+    info: Dict[str, Any] = {"container": "pdf", "pdf_version": head[5:8].decode("latin-1")}
+
+    # 线性化 PDF 在文件头直接给出页数
+    linearized = _LINEARIZED_PATTERN.search(head)
+    if linearized:
+        info["pages"] = int(linearized.group(1))
+
+    f.seek(max(size - PDF_TAIL_BYTES, 0))
+    tail = f.read()
+    matches = _STARTXREF_PATTERN.findall(tail)
+    if not matches:
+        return info
+
+    try:
+        resolver = _PdfObjects(f, int(matches[-1]))
+    except (ProbeError, zlib.error, struct.error, ValueError):
+        return info
+
+    if "pages" not in info and resolver.root is not None:
+        root = resolver.get(resolver.root)
+        pages_ref = _dict_ref(root, b"Pages") if root else None
+        pages = resolver.get(pages_ref) if pages_ref is not None else None
+        count = re.search(rb"/Count\s+(\d+)", pages) if pages else None
+        if count:
+            info["pages"] = int(count.group(1))
+
+    if resolver.info is not None:
+        document_info = resolver.get(resolver.info)
+        if document_info:
+            for key, field in ((b"Title", "title"), (b"Author", "author")):
+                value = _pdf_string(document_info, key)
+                if value:
+                    info[field] = value
+    return info
+
+
+class _PdfObjects:
+    """按交叉引用表（或交叉引用流）随机读取 PDF 对象"""
+
+    def __init__(self, f: BinaryIO, startxref: int):
+        self.f = f
+        self.offsets: Dict[int, int] = {}
+        self.compressed: Dict[int, Tuple[int, int]] = {}  # 对象号 -> (对象流号, 序号)
+        self.sections: List[Tuple[int, int, int]] = []  # 交叉引用表子节 (起始对象号, 数量, 表体位置)
+        self.root: Optional[int] = None
+        self.info: Optional[int] = None
+
+        f.seek(startxref)
+        block = f.read(64)
+        if block.startswith(b"xref"):
+            self._read_table(startxref)
+        else:
+            self._read_stream(startxref)
+
+    def _read_table(self, position: int):
+        """传统交叉引用表：子节头后每条记录固定 20 字节，按序号直接定位，跳过表体读取 trailer"""
+        f = self.f
+        f.seek(position)
+        f.readline()  # xref
+        while True:
+            line_start = f.tell()
+            parts = f.readline().split()
+            if len(parts) != 2 or not all(part.isdigit() for part in parts):
+                break
+            first, count = int(parts[0]), int(parts[1])
+            self.sections.append((first, count, f.tell()))
+            f.seek(f.tell() + count * 20)
+
+        f.seek(line_start)
+        trailer = f.read(PDF_TAIL_BYTES)
+        self.root = _dict_ref(trailer, b"Root")
+        self.info = _dict_ref(trailer, b"Info")
+
+    def _table_offset(self, number: int) -> Optional[int]:
+        for first, count, table_start in self.sections:
+            if first <= number < first + count:
+                self.f.seek(table_start + (number - first) * 20)
+                entry = self.f.read(20)
+                if entry[17:18] == b"n":
+                    return int(entry[:10])
+        return None
+
+    def _read_stream(self, position: int):
+        """交叉引用流（PDF 1.5+）：解压后按 /W 字段宽度解析"""
+        dictionary, content = self._read_stream_object(position)
+        widths = [int(w) for w in re.search(rb"/W\s*\[\s*([\d\s]+)\]", dictionary).group(1).split()]
+        size = int(re.search(rb"/Size\s+(\d+)", dictionary).group(1))
+        index_match = re.search(rb"/Index\s*\[\s*([\d\s]+)\]", dictionary)
+        index = [int(v) for v in index_match.group(1).split()] if index_match else [0, size]
+
+        entry_size = sum(widths)
+        cursor = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for number in range(first, first + count):
+                entry = content[cursor:cursor + entry_size]
+                cursor += entry_size
+                fields, at = [], 0
+                for width in widths:
+                    fields.append(int.from_bytes(entry[at:at + width], "big") if width else None)
+                    at += width
+                kind = 1 if fields[0] is None else fields[0]
+                if kind == 1:
+                    self.offsets[number] = fields[1]
+                elif kind == 2:
+                    self.compressed[number] = (fields[1], fields[2])
+
+        self.root = _dict_ref(dictionary, b"Root")
+        self.info = _dict_ref(dictionary, b"Info")
+
+    def _read_stream_object(self, position: int) -> Tuple[bytes, bytes]:
+        """读取 position 处的流对象，返回 (字典, 解压后的内容)"""
+        self.f.seek(position)
+        header = self.f.read(4096)
+        stream_at = header.find(b"stream")
+        if stream_at < 0:
+            raise ProbeError("未找到流对象")
+        dictionary = header[:stream_at]
+        length = int(re.search(rb"/Length\s+(\d+)", dictionary).group(1))
+        if length > PDF_MAX_STREAM_BYTES:
+            raise ProbeError("流对象过大")
+
+        data_start = stream_at + 6
+        data_start += 2 if header[data_start:data_start + 2] == b"\r\n" else 1
+        self.f.seek(position + data_start)
+        raw = self.f.read(length)
+        if b"/FlateDecode" not in dictionary:
+            raise ProbeError("不支持的流编码")
+        content = zlib.decompressobj().decompress(raw, PDF_MAX_STREAM_BYTES)
+
+        predictor = re.search(rb"/Predictor\s+(\d+)", dictionary)
+        if predictor and int(predictor.group(1)) >= 10:
+            columns = int(re.search(rb"/Columns\s+(\d+)", dictionary).group(1))
+            content = _png_unpredict(content, columns)
+        return dictionary, content
+
+    def get(self, number: Optional[int]) -> Optional[bytes]:
+        """读取对象内容（只取对象开头一段，足够解析字典）"""
+        if number is None:
+            return None
+        offset = self.offsets.get(number)
+        if offset is None and self.sections:
+            offset = self._table_offset(number)
+        if offset is not None:
+            self.f.seek(offset)
+            data = self.f.read(4096)
+            end = data.find(b"endobj")
+            return data[:end] if end >= 0 else data
+
+        if number in self.compressed:
+            stream_number, position = self.compressed[number]
+            stream_offset = self.offsets.get(stream_number)
+            if stream_offset is None:
+                return None
+            dictionary, content = self._read_stream_object(stream_offset)
+            first = int(re.search(rb"/First\s+(\d+)", dictionary).group(1))
+            pairs = [int(v) for v in content[:first].split()]
+            starts = pairs[1::2]
+            if position >= len(starts):
+                return None
+            start = first + starts[position]
+            end = first + starts[position + 1] if position + 1 < len(starts) else len(content)
+            return content[start:end]
+        return None
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """还原交叉引用流的 PNG Up 预测"""
+    row_size = columns + 1
+    previous = bytearray(columns)
+    output = bytearray()
+    for row_start in range(0, len(data) - columns, row_size):
+        kind = data[row_start]
+        row = bytearray(data[row_start + 1:row_start + row_size])
+        if kind == 2:
+            row = bytearray((value + above) & 0xFF for value, above in zip(row, previous))
+        output.extend(row)
+        previous = row
+    return bytes(output)
+
+
+def _pdf_string(data: bytes, key: bytes) -> str:
+    """读取字典中的字符串值，支持字面量和十六进制（含 UTF-16BE）"""
+    match = re.search(rb"/" + key + rb"\s*(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)", data, re.DOTALL)
+    if not match:
+        return ""
+    token = match.group(1)
+    if token.startswith(b"<"):
+        raw = bytes.fromhex(re.sub(rb"\s", b"", token[1:-1]).decode("ascii"))
+    else:
+        raw = re.sub(
+            rb"\\([nrtbf()\\]|[0-7]{1,3})",
+            lambda m: _PDF_ESCAPES.get(m.group(1), bytes([int(m.group(1), 8) & 0xFF]) if m.group(1).isdigit() else m.group(1)),
+            token[1:-1]
+        )
+    if raw.startswith(b"\xfe\xff"):
+        return raw[2:].decode("utf-16-be", errors="replace").strip()
+    return raw.decode("latin-1").strip()
+
+
+# ---------- PSD / PSB ----------
+
+_PSD_COLOR_MODES = {
+    0: "Bitmap", 1: "Grayscale", 2: "Indexed", 3: "RGB", 4: "CMYK",
+    7: "Multichannel", 8: "Duotone", 9: "Lab"
+}
+
+# 图像资源 ID：1036 为 Photoshop 5.0+ 的 JPEG 缩略图（1033 为旧版 BGR 顺序，颜色不正确，不使用）
+_PSD_THUMBNAIL_RESOURCE = 1036
+
+
+def _probe_psd(f: BinaryIO, thumbnail_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取文件头、图像资源段和图层段开头，图层像素和合成图像数据全部跳过
+
+    指定 thumbnail_path 时把内嵌的 JPEG 缩略图写入该路径。
+    """
+    header = f.read(26)
+    signature, version, _, channels, height, width, depth, color_mode = struct.unpack(">4sH6sHIIHH", header)
+    if signature != b"8BPS" or version not in (1, 2):
+        raise ProbeError("不是 PSD 文件")
+    psb = version == 2
+
+    info: Dict[str, Any] = {
+        "container": "psb" if psb else "psd",
+        "width": width,
+        "height": height,
+        "channels": channels,
+        "bits_per_channel": depth,
+        "color_mode": _PSD_COLOR_MODES.get(color_mode, str(color_mode))
+    }
+
+    # 颜色模式数据段
+    color_data_length = struct.unpack(">I", f.read(4))[0]
+    f.seek(color_data_length, 1)
+
+    # 图像资源段
+    resources_length = struct.unpack(">I", f.read(4))[0]
+    resources_end = f.tell() + resources_length
+    while f.tell() + 12 <= resources_end:
+        block_header = f.read(6)
+        if block_header[:4] != b"8BIM":
+            break
+        resource_id = struct.unpack(">H", block_header[4:6])[0]
+        name_length = f.read(1)[0]
+        f.seek(name_length + (0 if name_length % 2 else 1), 1)  # Pascal 字符串补齐到偶数
+        size = struct.unpack(">I", f.read(4))[0]
+        data_start = f.tell()
+
+        if resource_id == _PSD_THUMBNAIL_RESOURCE and size > 28:
+            thumbnail_header = f.read(28)
+            thumbnail_format, thumbnail_width, thumbnail_height = struct.unpack(">III", thumbnail_header[:12])
+            if thumbnail_format == 1:  # kJpegRGB
+                info["thumbnail_size"] = f"{thumbnail_width}x{thumbnail_height}"
+                if thumbnail_path:
+                    with open(thumbnail_path, "wb") as output:
+                        output.write(f.read(size - 28))
+                    info["thumbnail"] = thumbnail_path
+
+        f.seek(data_start + size + (size & 1))
+
+    # 图层和蒙版信息段：只读取图层数
+    f.seek(resources_end)
+    length_format = ">Q" if psb else ">I"
+    length_size = 8 if psb else 4
+    section_length = struct.unpack(length_format, f.read(length_size))[0]
+    if section_length >= length_size + 2:
+        layer_info_length = struct.unpack(length_format, f.read(length_size))[0]
+        if layer_info_length >= 2:
+            # 负数表示第一个 alpha 通道保存合并结果的透明度
+            info["layers"] = abs(struct.unpack(">h", f.read(2))[0])
+    else:
+        info["layers"] = 0
+    return info
+
+
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def describe_media(media_info: Dict[str, Any]) -> str:
+    """媒体信息的中文描述，用于提示中的技术规格"""
+    parts = []
+    if media_info.get("duration"):
+        parts.append(f"时长 {_format_duration(media_info['duration'])}")
+    if media_info.get("width") and media_info.get("height"):
+        parts.append(f"分辨率 {media_info['width']}x{media_info['height']}")
+    if media_info.get("color_mode"):
+        parts.append(f"{media_info['color_mode']} {media_info.get('bits_per_channel', 8)} 位")
+    if "layers" in media_info:
+        parts.append(f"{media_info['layers']} 个图层")
+    codecs = [media_info[key] for key in ("video_codec", "audio_codec") if media_info.get(key)]
+    if codecs:
+        parts.append(f"编码 {'/'.join(codecs)}")
+    if media_info.get("sample_rate"):
+        parts.append(f"采样率 {media_info['sample_rate'] / 1000:g} kHz")
+    if media_info.get("bitrate"):
+        parts.append(f"码率 {media_info['bitrate']} kbps")
+    if media_info.get("pages"):
+        parts.append(f"共 {media_info['pages']} 页")
+    if media_info.get("title"):
+        parts.append(f"文档标题《{media_info['title']}》")
+    # 3D 模型统计（mesh_probe）
+    for key, label in (("vertices", "顶点"), ("faces", "面"), ("meshes", "网格"),
+                       ("materials", "材质"), ("textures", "贴图"), ("animations", "动画")):
+        if media_info.get(key):
+            parts.append(f"{label} {media_info[key]:,}")
+    return "，".join(parts)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+ResLibs 3D 模型统计
+流式统计 OBJ（逐行扫描）、glTF / GLB（只解析 JSON 部分）和 FBX（二进制节点头 / ASCII 逐行）
+的顶点、面、材质和贴图数量，内存占用与文件大小无关
+"""
+
+import re
+import json
+import zlib
+import struct
+from typing import Any, BinaryIO, Dict, Optional, Set
+
+
+MESH_EXTENSIONS = frozenset({".obj", ".gltf", ".glb", ".fbx"})
+
+# .gltf 可能内嵌 base64 缓冲区，超过该大小不解析
+MAX_GLTF_JSON_BYTES = 64 * 1024 * 1024
+
+# 解压 FBX 索引数组时每次读取的压缩数据量
+FBX_READ_CHUNK = 1024 * 1024
+
+_FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+
+# int32 小端序最高字节 >= 0x80 即为负数；删除其余字节后剩余长度就是负数个数
+_NON_NEGATIVE_HIGH_BYTES = bytes(range(0x80))
+
+# glTF 图元模式 -> 每个面的索引数（4 为三角形列表）
+_GLTF_TRIANGLES = 4
+
+
+class MeshProbeError(Exception):
+    """模型文件格式不符合预期"""
+
+
+def probe_mesh(path: str, file_type: str) -> Optional[Dict[str, Any]]:
+    """
+    统计模型文件（阻塞调用，应在线程池或进程池中执行）
+
+    Returns:
+        统计信息字典，不支持的格式返回 None
+    """
+    file_type = file_type.lower()
+    with open(path, "rb") as f:
+        if file_type == ".obj":
+            return _probe_obj(f)
+        if file_type in (".gltf", ".glb"):
+            return _probe_gltf(f, binary=file_type == ".glb")
+        if file_type == ".fbx":
+            head = f.read(len(_FBX_BINARY_MAGIC))
+            f.seek(0)
+            if head == _FBX_BINARY_MAGIC:
+                return _probe_fbx_binary(f)
+            return _probe_fbx_ascii(f)
+    return None
+
+
+# ---------- OBJ ----------
+
+def _probe_obj(f: BinaryIO) -> Dict[str, Any]:
+    vertices = faces = triangles = 0
+    materials: Set[bytes] = set()
+    objects = 0
+    material_libraries: Set[bytes] = set()
+
+    for line in f:
+        if line.startswith(b"v "):
+            vertices += 1
+        elif line.startswith(b"f "):
+            corners = len(line.split()) - 1
+            faces += 1
+            triangles += max(corners - 2, 0)
+        elif line.startswith(b"usemtl "):
+            materials.add(line[7:].strip())
+        elif line.startswith((b"o ", b"g ")):
+            objects += 1
+        elif line.startswith(b"mtllib "):
+            material_libraries.add(line[7:].strip())
+
+    return {
+        "format": "obj",
+        "vertices": vertices,
+        "faces": faces,
+        "triangles": triangles,
+        "materials": len(materials),
+        "objects": objects,
+        "material_libraries": sorted(name.decode("utf-8", errors="replace") for name in material_libraries)
+    }
+
+
+# ---------- glTF / GLB ----------
+
+def _probe_gltf(f: BinaryIO, binary: bool) -> Dict[str, Any]:
+    if binary:
+        magic, _, _ = struct.unpack("<4sII", f.read(12))
+        if magic != b"glTF":
+            raise MeshProbeError("不是 GLB 文件")
+        chunk_length, chunk_type = struct.unpack("<II", f.read(8))
+        if chunk_type != 0x4E4F534A:  # "JSON"
+            raise MeshProbeError("GLB 第一个块不是 JSON")
+        if chunk_length > MAX_GLTF_JSON_BYTES:
+            raise MeshProbeError("glTF JSON 过大")
+        document = json.loads(f.read(chunk_length))
+    else:
+        size = f.seek(0, 2)
+        f.seek(0)
+        if size > MAX_GLTF_JSON_BYTES:
+            raise MeshProbeError("glTF JSON 过大")
+        document = json.load(f)
+
+    accessors = document.get("accessors", [])
+
+    def accessor_count(index: Optional[int]) -> int:
+        if index is None or index >= len(accessors):
+            return 0
+        return accessors[index].get("count", 0)
+
+    vertices = faces = primitives = 0
+    for mesh in document.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            primitives += 1
+            positions = accessor_count(primitive.get("attributes", {}).get("POSITION"))
+            vertices += positions
+            if primitive.get("mode", _GLTF_TRIANGLES) == _GLTF_TRIANGLES:
+                indices = accessor_count(primitive.get("indices"))
+                faces += (indices or positions) // 3
+
+    return {
+        "format": "glb" if binary else "gltf",
+        "vertices": vertices,
+        "faces": faces,
+        "triangles": faces,
+        "meshes": len(document.get("meshes", [])),
+        "primitives": primitives,
+        "materials": len(document.get("materials", [])),
+        "textures": len(document.get("textures", [])),
+        "animations": len(document.get("animations", [])),
+        "generator": document.get("asset", {}).get("generator", "")
+    }
+
+
+# ---------- FBX 二进制 ----------
+
+class _FbxReader:
+    """按节点头遍历二进制 FBX，节点内容通过 EndOffset 跳过"""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        f.seek(23)
+        self.version = struct.unpack("<I", f.read(4))[0]
+        # 7.5 起节点头字段为 64 位
+        self.wide = self.version >= 7500
+        self.header_format = "<QQQB" if self.wide else "<IIIB"
+        self.header_size = struct.calcsize(self.header_format)
+
+    def read_node(self, position: int):
+        """读取节点头，返回 (名称, 属性起点, 子节点起点, 结束位置)；遇到空记录返回 None"""
+        self.f.seek(position)
+        end_offset, _, property_length, name_length = struct.unpack(
+            self.header_format, self.f.read(self.header_size)
+        )
+        if end_offset == 0:
+            return None
+        name = self.f.read(name_length).decode("ascii", errors="replace")
+        properties_start = position + self.header_size + name_length
+        return name, properties_start, properties_start + property_length, end_offset
+
+    def children(self, start: int, end: int):
+        """遍历 [start, end) 范围内的子节点"""
+        position = start
+        while position < end:
+            node = self.read_node(position)
+            if node is None:
+                break
+            yield node
+            position = node[3]
+
+    def array_header(self, position: int):
+        """读取数组属性头，返回 (类型, 元素数, 编码, 压缩长度, 数据起点)"""
+        self.f.seek(position)
+        kind = self.f.read(1)
+        if kind not in (b"d", b"f", b"i", b"l", b"b"):
+            return None
+        length, encoding, compressed_length = struct.unpack("<III", self.f.read(12))
+        return kind, length, encoding, compressed_length, position + 13
+
+
+def _count_negative_int32(reader: _FbxReader, header) -> int:
+    """流式统计 int32 数组中的负数个数（FBX 用负数标记每个多边形的最后一个顶点）"""
+    kind, length, encoding, compressed_length, data_start = header
+    if kind != b"i":
+        return 0
+
+    f = reader.f
+    f.seek(data_start)
+    decompressor = zlib.decompressobj() if encoding == 1 else None
+    remaining = compressed_length if encoding == 1 else length * 4
+    pending = b""
+    negatives = 0
+    while remaining > 0:
+        chunk = f.read(min(FBX_READ_CHUNK, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        data = pending + (decompressor.decompress(chunk) if decompressor else chunk)
+        usable = len(data) - len(data) % 4
+        negatives += len(data[3:usable:4].translate(None, _NON_NEGATIVE_HIGH_BYTES))
+        pending = data[usable:]
+    return negatives
+
+
+def _probe_fbx_binary(f: BinaryIO) -> Dict[str, Any]:
+    reader = _FbxReader(f)
+    file_size = f.seek(0, 2)
+    stats: Dict[str, Any] = {
+        "format": "fbx",
+        "fbx_version": reader.version,
+        "vertices": 0,
+        "faces": 0,
+        "meshes": 0,
+        "materials": 0,
+        "textures": 0,
+        "animations": 0
+    }
+
+    for name, _, children_start, end in reader.children(27, file_size):
+        if name != "Objects":
+            continue
+        for child_name, _, child_children, child_end in reader.children(children_start, end):
+            if child_name == "Geometry":
+                stats["meshes"] += 1
+                for field, properties_start, _, _ in reader.children(child_children, child_end):
+                    if field == "Vertices":
+                        header = reader.array_header(properties_start)
+                        if header:
+                            stats["vertices"] += header[1] // 3
+                    elif field == "PolygonVertexIndex":
+                        header = reader.array_header(properties_start)
+                        if header:
+                            stats["faces"] += _count_negative_int32(reader, header)
+            elif child_name == "Material":
+                stats["materials"] += 1
+            elif child_name == "Texture":
+                stats["textures"] += 1
+            elif child_name == "AnimationStack":
+                stats["animations"] += 1
+        break
+    return stats
+
+
+# ---------- FBX ASCII ----------
+
+_FBX_ASCII_OBJECT = re.compile(rb'^\s*(Geometry|Material|Texture|AnimationStack):\s*\d*,?\s*"')
+_FBX_ASCII_VERTICES = re.compile(rb"^\s*Vertices:\s*\*(\d+)")
+_FBX_ASCII_INDICES = re.compile(rb"^\s*PolygonVertexIndex:\s*\*(\d+)")
+
+
+def _probe_fbx_ascii(f: BinaryIO) -> Dict[str, Any]:
+    """ASCII FBX 逐行扫描；面数需要展开索引列表，只统计索引总数"""
+    stats: Dict[str, Any] = {
+        "format": "fbx-ascii", "vertices": 0, "polygon_indices": 0,
+        "meshes": 0, "materials": 0, "textures": 0, "animations": 0
+    }
+    keys = {b"Geometry": "meshes", b"Material": "materials", b"Texture": "textures", b"AnimationStack": "animations"}
+    for line in f:
+        match = _FBX_ASCII_VERTICES.match(line)
+        if match:
+            stats["vertices"] += int(match.group(1)) // 3
+            continue
+        match = _FBX_ASCII_INDICES.match(line)
+        if match:
+            stats["polygon_indices"] += int(match.group(1))
+            continue
+        match = _FBX_ASCII_OBJECT.match(line)
+        if match:
+            stats[keys[match.group(1)]] += 1
+    return stats
+
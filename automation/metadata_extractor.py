@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+ResLibs 元数据提取阶段
+在独立的进程池中执行 MIME 检测、压缩包 / Unity 包解析等 CPU 和磁盘密集的工作，
+按文件大小和格式估算耗时并设置超时，避免阻塞事件循环，批量回填时可利用多核
+"""
+
+import os
+import time
+import hashlib
+import weakref
+import asyncio
+import concurrent.futures
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+from automation.logger import setup_logger
+from automation.analysis_cache import AnalysisCache
+from automation.archive_inspector import (
+    ARCHIVE_EXTENSIONS, extract_previews, list_archive, preview_prefix, read_documents
+)
+from automation.unity_inspector import inspect_unitypackage
+from automation.listing_compactor import compact_listing
+from automation.media_probe import DESIGN_EXTENSIONS, MEDIA_EXTENSIONS, probe_media
+from automation.mesh_probe import MESH_EXTENSIONS, probe_mesh
+
+
+# 提取结果的格式或解析逻辑变化时递增，使分析缓存中的旧结果失效
+EXTRACTOR_VERSION = 1
+
+# 计算文件哈希时每次读取的大小
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# 网盘未提供 md5 时，不超过该大小的文件计算完整 SHA-256，更大的文件只抽样头尾和中间几块，
+# 避免为了缓存键把数 GB 的文件完整读一遍
+FULL_DIGEST_MAX_BYTES = 64 * 1024 * 1024
+FINGERPRINT_SAMPLES = 5
+
+# 进程池因其他文件超时被重置时，受牵连的任务重新提交的最多次数
+MAX_RESUBMITS = 3
+
+# 需要顺序读完整个文件的格式（其余压缩格式只读头部）
+SEQUENTIAL_EXTENSIONS = frozenset({
+    ".unitypackage", ".tgz", ".tar.gz", ".gz", ".bz2", ".tbz2", ".xz", ".txz",
+    ".obj", ".fbx"
+})
+
+# 只读头部的格式按该吞吐量估算（随机读取目录，与文件大小关系很小）
+HEADER_READ_MBPS = 2000.0
+
+# 每个文件的固定开销（进程间传递、打开文件、libmagic），秒
+BASE_COST_SECONDS = 0.2
+
+
+@dataclass(frozen=True)
+class ExtractionOptions:
+    """传给工作进程的提取参数（工作进程不读取全局配置）"""
+    document_max_bytes: int = 8192
+    listing_token_budget: int = 400
+    preview_dir: str = ""  # 为空表示不提取预览图
+    max_previews: int = 5
+
+    def cache_key(self) -> str:
+        """影响提取结果的参数（预览图目录只区分是否提取）"""
+        return f"{self.document_max_bytes}:{self.listing_token_budget}:{bool(self.preview_dir)}:{self.max_previews}"
+
+
+def estimate_cost(file_type: str, size: int, sequential_mbps: float = 100.0) -> float:
+    """估算提取耗时（秒）：顺序读取的格式按吞吐量线性增长，只读头部的格式几乎恒定"""
+    size_mb = size / (1024 * 1024)
+    if file_type in SEQUENTIAL_EXTENSIONS:
+        return BASE_COST_SECONDS + size_mb / max(sequential_mbps, 1.0)
+    if file_type in ARCHIVE_EXTENSIONS:
+        return BASE_COST_SECONDS + size_mb / HEADER_READ_MBPS
+    return BASE_COST_SECONDS
+
+
+def file_digest(path: str) -> str:
+    """流式计算文件 SHA-256（阻塞调用）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """文件内容标识（阻塞调用）：小文件为完整 SHA-256，大文件为 大小 + 均匀抽样块的 SHA-256"""
+    size = os.path.getsize(path)
+    if size <= FULL_DIGEST_MAX_BYTES:
+        return f"sha256:{file_digest(path)}"
+
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        for index in range(FINGERPRINT_SAMPLES):
+            # 第一块为文件头，最后一块为文件尾
+            f.seek((size - DIGEST_CHUNK_SIZE) * index // (FINGERPRINT_SAMPLES - 1))
+            digest.update(f.read(DIGEST_CHUNK_SIZE))
+    return f"sample:{size}:{digest.hexdigest()}"
+
+
+def extract_file_metadata(path: str, file_type: str, options: ExtractionOptions) -> Dict[str, Any]:
+    """
+    提取单个文件的元数据（在工作进程中执行）
+
+    Returns:
+        {"metadata": 元数据, "preview_images": 预览图路径, "warnings": 警告信息,
+         "failed": 是否超时或崩溃, "cacheable": 结果是否可写入分析缓存}
+    """
+    metadata: Dict[str, Any] = {}
+    preview_images: List[str] = []
+    warnings: List[str] = []
+
+    try:
+        import magic
+        metadata["mime_type"] = magic.from_file(path, mime=True)
+    except Exception as e:
+        warnings.append(f"检测 MIME 类型失败: {e}")
+
+    if file_type in ARCHIVE_EXTENSIONS:
+        try:
+            listing = list_archive(path)
+            if listing.encrypted:
+                warnings.append(f"压缩包头部已加密，无法列出内容: {Path(path).name}")
+
+            documents = []
+            try:
+                documents = read_documents(path, listing, options.document_max_bytes)
+            except Exception as e:
+                warnings.append(f"读取压缩包说明文档失败: {e}")
+
+            if options.preview_dir:
+                try:
+                    preview_images = extract_previews(path, listing, options.preview_dir, options.max_previews)
+                except Exception as e:
+                    warnings.append(f"提取压缩包预览图失败: {e}")
+
+            metadata.update({
+                "archive_format": listing.format,
+                "archive_contents": [entry.name for entry in listing.files[:50]],  # 返回前50个文件
+                "file_count": listing.file_count,
+                "archive_total_size": listing.total_size,
+                "archive_outline": compact_listing(
+                    ((entry.name, entry.size) for entry in listing.files), options.listing_token_budget
+                ),
+                "archive_documents": [
+                    {"kind": kind, "path": document_path, "text": text}
+                    for kind, document_path, text in documents
+                ]
+            })
+        except Exception as e:
+            warnings.append(f"读取压缩包目录失败: {e}")
+            metadata["archive_contents"] = []
+
+    if file_type in (".unitypackage", ".unity"):
+        unity_info = {
+            "package_type": file_type.lstrip("."),
+            "unity_version": "unknown",
+            "assets_count": 0
+        }
+        if file_type == ".unitypackage":
+            try:
+                info = inspect_unitypackage(path, options.preview_dir or None, options.max_previews)
+                unity_info = info.to_metadata()
+                preview_images = info.preview_images
+                metadata["archive_outline"] = compact_listing(
+                    zip(info.asset_paths, info.asset_sizes), options.listing_token_budget
+                )
+                if info.assets_count:
+                    metadata["file_count"] = info.assets_count
+            except Exception as e:
+                warnings.append(f"解析 Unity 包失败: {e}")
+        metadata["unity_info"] = unity_info
+
+    if file_type in MEDIA_EXTENSIONS:
+        thumbnail_path = None
+        if options.preview_dir and file_type in DESIGN_EXTENSIONS:
+            Path(options.preview_dir).mkdir(parents=True, exist_ok=True)
+            thumbnail_path = str(Path(options.preview_dir) / f"{preview_prefix(path)}_preview_1.jpg")
+        try:
+            media_info = probe_media(path, file_type, thumbnail_path)
+            if media_info:
+                # 内嵌缩略图作为预览图，不写入元数据
+                thumbnail = media_info.pop("thumbnail", None)
+                if thumbnail:
+                    preview_images = [thumbnail]
+                metadata["media_info"] = media_info
+        except Exception as e:
+            warnings.append(f"读取媒体文件头失败: {e}")
+
+    if file_type in MESH_EXTENSIONS:
+        try:
+            mesh_info = probe_mesh(path, file_type)
+            if mesh_info:
+                # 与媒体信息共用同一字段，进入提示和数据库
+                metadata["media_info"] = mesh_info
+        except Exception as e:
+            warnings.append(f"统计 3D 模型失败: {e}")
+
+    return {
+        "metadata": metadata, "preview_images": preview_images, "warnings": warnings,
+        "failed": False, "cacheable": True
+    }
+
+
+class MetadataExtractor:
+    """进程池元数据提取器"""
+
+    def __init__(self, workers: int = 0, min_timeout: float = 30.0,
+                 timeout_factor: float = 4.0, sequential_mbps: float = 100.0,
+                 cache: Optional[AnalysisCache] = None):
+        """
+        Args:
+            workers: 工作进程数，0 表示 CPU 核数
+            min_timeout: 单个文件的最短超时（秒）
+            timeout_factor: 超时 = 估算耗时 × 该系数（不低于 min_timeout）
+            sequential_mbps: 顺序读取格式的估算吞吐量（MB/s）
+            cache: 分析缓存，为空表示每次都重新提取
+        """
+        self.logger = setup_logger("MetadataExtractor")
+        self.workers = workers or os.cpu_count() or 1
+        self.min_timeout = min_timeout
+        self.timeout_factor = timeout_factor
+        self.sequential_mbps = sequential_mbps
+        self.cache = cache
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        # 因任务超时被主动结束的进程池，其中其他任务的 BrokenProcessPool 属于牵连失败
+        self._terminated_pools: "weakref.WeakSet[concurrent.futures.ProcessPoolExecutor]" = weakref.WeakSet()
+        # 只在有空闲工作进程时提交，使超时只计算执行时间而不含排队时间
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def timeout_for(self, file_type: str, size: int) -> float:
+        """按估算耗时计算超时"""
+        return max(self.min_timeout, estimate_cost(file_type, size, self.sequential_mbps) * self.timeout_factor)
+
+    async def extract(
+        self,
+        path: str,
+        file_type: str,
+        options: ExtractionOptions,
+        md5: str = ""
+    ) -> Dict[str, Any]:
+        """
+        提取元数据，启用缓存时先按文件内容哈希查找
+
+        Args:
+            md5: 网盘提供的文件 md5，为空时用 file_fingerprint 计算（大文件只读取抽样块）
+
+        超时或工作进程崩溃时返回空结果，不影响后续步骤。文件本身超时的结果同样缓存，过期前不再重试；
+        无法确定是否由该文件引起的失败（工作进程崩溃、多次被牵连）不缓存，下次重新提取。
+        """
+        if self.cache is None:
+            return await self._extract(path, file_type, options)
+
+        digest = f"md5:{md5}" if md5 else await asyncio.to_thread(file_fingerprint, path)
+        cache_key = AnalysisCache.make_key(digest, file_type, EXTRACTOR_VERSION, options.cache_key())
+        try:
+            cached = self.cache.get(cache_key)
+        except Exception as e:
+            self.logger.warning(f"读取分析缓存失败: {e}")
+            cached = None
+        if cached is not None:
+            self.logger.info(f"命中分析缓存: {Path(path).name}")
+            return {
+                "metadata": cached["metadata"],
+                "preview_images": self._restore_previews(path, options, cached["previews"]),
+                "warnings": [],
+                "failed": cached["failed"],
+                "cacheable": False  # 已在缓存中
+            }
+
+        result = await self._extract(path, file_type, options)
+        if not result["cacheable"]:
+            return result
+        try:
+            self.cache.put(
+                cache_key, digest, Path(path).name, file_type, result["metadata"],
+                result["warnings"], result["preview_images"], result["failed"]
+            )
+        except Exception as e:
+            self.logger.warning(f"写入分析缓存失败: {e}")
+        return result
+
+    @staticmethod
+    def _restore_previews(path: str, options: ExtractionOptions, previews: List[tuple]) -> List[str]:
+        """把缓存的预览图写回预览目录，命名与提取时一致"""
+        if not options.preview_dir or not previews:
+            return []
+        output_dir = Path(options.preview_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = preview_prefix(path)
+
+        restored = []
+        for index, (extension, data) in enumerate(previews, 1):
+            target = output_dir / f"{prefix}_preview_{index}{extension}"
+            target.write_bytes(data)
+            restored.append(str(target))
+        return restored
+
+    async def _extract(self, path: str, file_type: str, options: ExtractionOptions) -> Dict[str, Any]:
+        """
+        在进程池中提取元数据
+
+        只有超时的文件本身记为失败；同一进程池中因此被结束的其他任务在新进程池中重新提交。
+        """
+        size = Path(path).stat().st_size
+        timeout = self.timeout_for(file_type, size)
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(MAX_RESUBMITS + 1):
+            async with self._slots:
+                pool = self._get_pool()
+                started = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(
+                        loop.run_in_executor(pool, extract_file_metadata, path, file_type, options),
+                        timeout
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    self.logger.warning(f"提取元数据超时（{timeout:.0f} 秒），跳过: {Path(path).name}")
+                    self._reset_pool(pool)
+                    self._terminated_pools.add(pool)
+                    return {"metadata": {}, "preview_images": [], "warnings": [], "failed": True, "cacheable": True}
+                except concurrent.futures.process.BrokenProcessPool:
+                    if pool in self._terminated_pools and attempt < MAX_RESUBMITS:
+                        self.logger.info(f"进程池因其他文件超时被重置，重新提交: {Path(path).name}")
+                        continue
+                    self.logger.error(f"元数据提取进程异常退出: {Path(path).name}")
+                    self._reset_pool(pool)
+                    # 同一进程池中的任务都会失败，无法确定是哪个文件导致崩溃，不缓存
+                    return {"metadata": {}, "preview_images": [], "warnings": [], "failed": True, "cacheable": False}
+
+        for warning in result["warnings"]:
+            self.logger.warning(warning)
+        self.logger.debug(f"元数据提取耗时 {time.monotonic() - started:.2f} 秒: {Path(path).name}")
+        return result
+
+    def _reset_pool(self, pool: concurrent.futures.ProcessPoolExecutor):
+        """
+        丢弃进程池：超时的任务无法取消，只能结束其工作进程，
+        同一进程池中正在执行的其他任务会以 BrokenProcessPool 失败，由 _extract 重新提交
+        """
+        if self._pool is not pool:
+            return  # 已被其他任务重建
+        self._pool = None
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """关闭进程池（下次提取时重新创建）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
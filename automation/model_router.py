@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+ResLibs 模型路由
+按资源类型和元数据复杂度选择模型档位，跟踪各模型的延迟分布，
+主模型变慢时降级或向快速模型发起对冲请求，使生成延迟保持在 SLO 内
+"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+from automation.logger import setup_logger
+
+
+# 资源类型的基础复杂度
+TYPE_COMPLEXITY = {
+    "unity-assets": 2.0,
+    "software-tools": 1.5,
+    "video-courses": 1.5,
+    "3d-models": 1.5,
+    "archives": 1.0,
+    "documents": 1.0,
+    "audio-resources": 0.5,
+    "design-assets": 0.5
+}
+
+# 档位阈值：复杂度低于 fast 上限用快速模型，达到 complex 下限用复杂模型
+FAST_TIER_BELOW = 1.0
+COMPLEX_TIER_FROM = 2.0
+
+# 统计 p95 所需的最少样本数
+MIN_LATENCY_SAMPLES = 10
+
+# 对冲等待时间下限（秒），避免几乎每个请求都被复制
+MIN_HEDGE_DELAY = 0.5
+
+# 延迟样本有效期（秒）：降级后主模型不再有新样本，旧样本过期后自动恢复尝试
+LATENCY_SAMPLE_TTL = 600
+
+
+@dataclass(frozen=True)
+class Route:
+    """一次生成请求的路由结果"""
+    tier: str  # fast / standard / complex
+    model: str
+    hedge_model: Optional[str] = None  # 为空表示不对冲
+    hedge_delay: float = 0.0  # 主模型超过该时间未完成时发起对冲（秒）
+
+
+class ModelRouter:
+    """延迟感知的模型路由器"""
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        latency_slo: float = 30.0,
+        hedge_after: float = 10.0,
+        window: int = 50
+    ):
+        """
+        Args:
+            models: 档位 -> 模型名称
+            latency_slo: 单次生成的目标延迟（秒）
+            hedge_after: 没有足够延迟样本时的对冲等待时间（秒），0 表示不对冲
+            window: 每个模型保留的最近延迟样本数
+        """
+        self.logger = setup_logger("ModelRouter")
+        self.models = models
+        self.latency_slo = latency_slo
+        self.hedge_after = hedge_after
+        self._latencies: Dict[str, Deque[Tuple[float, float]]] = {}
+        self._window = window
+        self._demoted: Dict[str, bool] = {}
+
+    def complexity(self, resource_type: str, metadata: Dict[str, Any]) -> float:
+        """估算资源复杂度：类型基础分 + 体积 + 包含文件数"""
+        score = TYPE_COMPLEXITY.get(resource_type, 1.0)
+
+        size = metadata.get('size', 0) or 0
+        if size > 1024 ** 3:
+            score += 1.0
+        elif size > 100 * 1024 ** 2:
+            score += 0.5
+
+        file_count = metadata.get('file_count', 0) or 0
+        if file_count > 50:
+            score += 0.5
+
+        return score
+
+    def route(self, resource_type: str, metadata: Dict[str, Any]) -> Route:
+        """为资源选择模型档位和对冲策略"""
+        score = self.complexity(resource_type, metadata)
+        if score < FAST_TIER_BELOW:
+            tier = "fast"
+        elif score >= COMPLEX_TIER_FROM:
+            tier = "complex"
+        else:
+            tier = "standard"
+        return self._build_route(tier)
+
+    def fast_route(self) -> Route:
+        """快速档位（用于字段修复等短请求）"""
+        return self._build_route("fast")
+
+    def tier_model(self, tier: str) -> str:
+        """档位配置的模型（不受降级影响，用于缓存键）"""
+        return self.models[tier]
+
+    def _build_route(self, tier: str) -> Route:
+        model = self.models[tier]
+        fast_model = self.models["fast"]
+
+        # 主模型近期 p95 超出 SLO 时降级到更快的档位
+        p95 = self.latency_p95(model)
+        slow = p95 is not None and p95 > self.latency_slo and model != fast_model
+        if slow != self._demoted.get(model, False):
+            self._demoted[model] = slow
+            if slow:
+                self.logger.warning(
+                    f"模型 {model} 近期 p95 延迟 {p95:.1f} 秒超出 SLO {self.latency_slo:.0f} 秒，降级使用 {fast_model}"
+                )
+            else:
+                self.logger.info(f"模型 {model} 延迟恢复，取消降级")
+        if slow:
+            return Route(tier, fast_model)
+
+        if not self.hedge_after or model == fast_model:
+            return Route(tier, model)
+
+        return Route(tier, model, fast_model, self.hedge_delay(model, fast_model))
+
+    def hedge_delay(self, model: str, hedge_model: str) -> float:
+        """
+        对冲等待时间：主模型的 p95 延迟（样本不足时用配置值），
+        且要给对冲请求留出在 SLO 内完成的时间
+        """
+        delay = self.latency_p95(model) or self.hedge_after
+        hedge_p95 = self.latency_p95(hedge_model) or 0.0
+        latest_start = self.latency_slo - hedge_p95
+        return max(min(delay, latest_start), MIN_HEDGE_DELAY)
+
+    def record(self, model: str, latency: float):
+        """记录一次成功调用的延迟"""
+        samples = self._latencies.get(model)
+        if samples is None:
+            samples = self._latencies[model] = deque(maxlen=self._window)
+        samples.append((time.monotonic(), latency))
+
+    def _recent(self, model: str) -> List[float]:
+        """模型有效期内的延迟样本"""
+        cutoff = time.monotonic() - LATENCY_SAMPLE_TTL
+        return [latency for at, latency in self._latencies.get(model, ()) if at >= cutoff]
+
+    def latency_p95(self, model: str) -> Optional[float]:
+        """模型近期 p95 延迟，样本不足返回 None"""
+        samples = self._recent(model)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各模型延迟统计"""
+        return {
+            model: {
+                "samples": len(self._recent(model)),
+                "p95": self.latency_p95(model),
+                "demoted": self._demoted.get(model, False)
+            }
+            for model in self._latencies
+        }
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+ResLibs 产品系列识别
+将文件名归一化为产品系列键并提取版本号，使同一产品的不同版本（如 "LowPolyShooterPack v2" 与
+"Low_Poly_Shooter_Pack_v3"）能复用已生成的内容
+"""
+
+import re
+from typing import Tuple
+
+from automation.resource_classifier import ResourceClassifier
+
+
+# 版本号：v2 / ver 3 / version 1.2 / 1.2.3 / 2021.3
+_VERSION_PATTERN = re.compile(
+    r"(?i)(?<![a-z0-9])(?:v(?:er(?:sion)?)?[\s_\-]*)(\d+(?:\.\d+)*[a-z]?)(?![a-z0-9])"
+    r"|(?<![a-z0-9.])(\d+(?:\.\d+)+)(?![0-9])"
+)
+
+# 紧贴在名称后的版本号，如 "PackV2"
+_ATTACHED_VERSION_PATTERN = re.compile(r"(?<=[a-z])[vV](\d+(?:\.\d+)*)$")
+
+# 与产品无关的修饰词
+_NOISE_WORDS = frozenset({
+    "final", "updated", "update", "latest", "fixed", "repack", "copy", "full",
+    "最新版", "完整版", "更新版", "修正版"
+})
+
+_SEPARATOR_PATTERN = re.compile(r"[\s_\-.()\[\]{}【】（）+,&]+")
+
+# 系列键最短长度，过短的名称（如 "ui"）不足以区分产品
+MIN_FAMILY_KEY_LENGTH = 6
+
+
+def parse_family(filename: str) -> Tuple[str, str]:
+    """
+    解析文件名
+
+    未带版本标记的数字（如 "Part 2"、"Tutorial 03"、"Set 2000"）是名称的一部分，保留在系列键中，
+    否则不同的分集 / 条目会被归为同一系列
+
+    Returns:
+        (产品系列键, 版本号)，无法可靠识别系列或没有版本号时系列键为空
+    """
+    stem, _ = ResourceClassifier.split_extension(filename)
+
+    version = ""
+    match = _VERSION_PATTERN.search(stem)
+    if match:
+        version = (match.group(1) or match.group(2)).lower()
+        stem = stem[:match.start()] + " " + stem[match.end():]
+
+    tokens = []
+    for token in _SEPARATOR_PATTERN.split(stem):
+        if not token:
+            continue
+        attached = _ATTACHED_VERSION_PATTERN.search(token)
+        if attached:
+            version = version or attached.group(1)
+            token = token[:attached.start()]
+        if token.lower() in _NOISE_WORDS:
+            continue
+        tokens.append(token.lower())
+
+    key = "".join(tokens)
+    if not version or len(key) < MIN_FAMILY_KEY_LENGTH:
+        return "", version
+    return key, version
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+ResLibs 提示模板注册表
+启动时从 automation/prompts 目录加载提示模板，按资源类型预编译，并为每个模板计算版本哈希和 token 估算
+"""
+
+import re
+import hashlib
+from string import Template
+from typing import Dict, Optional
+from pathlib import Path
+from dataclasses import dataclass, field
+
+
+# 内置模板目录，PROMPT_TEMPLATES_DIR 中的同名文件会覆盖内置模板
+DEFAULT_PROMPT_DIR = Path(__file__).parent / "prompts"
+
+# 通用类型模板文件名（未知资源类型使用）
+GENERAL_TYPE = "general"
+
+_FIELD_LINE_PATTERN = re.compile(r'^\s*"(\w+)"\s*:', re.MULTILINE)
+_CJK_PATTERN = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文按每字 1 个，其余按每 4 个字符 1 个"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """按估算 token 数截断文本（二分查找最长前缀），截断时末尾加省略号"""
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget - 1:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + "…"
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """预编译的提示模板"""
+    name: str
+    text: str
+    version: str
+    estimated_tokens: int  # 不含占位符替换内容的静态部分
+    template: Template = field(repr=False, compare=False)
+
+    @classmethod
+    def compile(cls, name: str, text: str) -> "PromptTemplate":
+        version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        return cls(name, text, version, estimate_tokens(text), Template(text))
+
+    def render(self, **values) -> str:
+        return self.template.substitute(values)
+
+
+class PromptRegistry:
+    """
+    提示模板注册表
+
+    模板使用 string.Template 语法（${name}）。加载时将资源类型说明、通用要求、
+    输出字段等静态片段预先代入骨架模板，运行时只需替换资源相关的部分。
+    模板中如需字面的 $ 请写为 $$。
+    """
+
+    def __init__(self, directory: str = "", type_names: Optional[Dict[str, str]] = None):
+        self.directory = Path(directory) if directory else None
+        self.type_names = type_names or {}
+
+        self.resource_block = PromptTemplate.compile("resource_block", self._read("resource_block.txt"))
+        self.repair = PromptTemplate.compile("repair", self._read("repair.txt"))
+        self.delta = PromptTemplate.compile("delta", self._read("delta.txt"))
+        self.output_fields: Dict[str, str] = {}
+        self._single: Dict[str, PromptTemplate] = {}
+        self._batch: Dict[str, PromptTemplate] = {}
+        self._compile()
+
+    @classmethod
+    def load(cls, directory: str = "", type_names: Optional[Dict[str, str]] = None) -> "PromptRegistry":
+        """加载模板，directory 为空时只使用内置模板"""
+        return cls(directory, type_names)
+
+    def _read(self, relative: str) -> str:
+        """读取模板文件，自定义目录优先"""
+        if self.directory:
+            custom = self.directory / relative
+            if custom.exists():
+                return custom.read_text(encoding='utf-8').rstrip()
+        return (DEFAULT_PROMPT_DIR / relative).read_text(encoding='utf-8').rstrip()
+
+    def _type_files(self) -> Dict[str, str]:
+        """收集所有资源类型模板，返回 {资源类型: 模板内容}"""
+        names = {path.stem for path in (DEFAULT_PROMPT_DIR / "types").glob("*.txt")}
+        if self.directory and (self.directory / "types").is_dir():
+            names.update(path.stem for path in (self.directory / "types").glob("*.txt"))
+        return {name: self._read(f"types/{name}.txt") for name in sorted(names)}
+
+    def _compile(self):
+        """将静态片段代入骨架模板，为每个资源类型生成预编译模板"""
+        # 骨架中的字面 $$ 要经过两次替换，先加倍保留
+        single = self._read("single.txt").replace("$$", "$$$$")
+        batch = self._read("batch.txt").replace("$$", "$$$$")
+        shared = {
+            "requirements": self._read("requirements.txt"),
+            "output_fields": self._read("output_fields.txt")
+        }
+
+        # 输出字段说明按字段名索引，修复提示只列出失败字段
+        for line in shared["output_fields"].splitlines():
+            match = _FIELD_LINE_PATTERN.match(line)
+            if match:
+                self.output_fields[match.group(1)] = line.rstrip(",")
+
+        for resource_type, type_template in self._type_files().items():
+            static = dict(
+                shared,
+                type_template=type_template,
+                type_name=self.type_names.get(resource_type, "数字资源")
+            )
+            # 静态片段中的 $ 需转义，避免被当作占位符
+            static = {key: value.replace("$", "$$") for key, value in static.items()}
+
+            self._single[resource_type] = PromptTemplate.compile(
+                f"single/{resource_type}", Template(single).safe_substitute(static)
+            )
+            self._batch[resource_type] = PromptTemplate.compile(
+                f"batch/{resource_type}", Template(batch).safe_substitute(static)
+            )
+
+    def single(self, resource_type: str) -> PromptTemplate:
+        """单资源提示模板"""
+        return self._single.get(resource_type) or self._single[GENERAL_TYPE]
+
+    def batch(self, resource_type: str) -> PromptTemplate:
+        """批量提示模板"""
+        return self._batch.get(resource_type) or self._batch[GENERAL_TYPE]
+
+    def version(self, resource_type: str) -> str:
+        """
+        资源类型的提示版本，用于缓存键和效果对比
+
+        组合生成内容可能用到的全部模板（单资源 / 批量骨架、资源信息块、修复和增量模板），
+        修改其中任何一个都会使缓存失效
+        """
+        templates = (
+            self.single(resource_type), self.batch(resource_type),
+            self.resource_block, self.repair, self.delta
+        )
+        combined = ":".join(template.version for template in templates)
+        return hashlib.sha256(combined.encode('utf-8')).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self._single)
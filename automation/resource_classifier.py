@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+ResLibs 资源类型分类器
+基于可配置规则的编译式分类引擎：扩展名哈希表 + 文件名词元自动机 + 可选的文件头魔数嗅探
+"""
+
+import re
+import json
+from typing import Dict, List, Optional, Tuple, Any
+from pathlib import Path
+from dataclasses import dataclass
+
+
+# 默认分类规则，可通过 RESOURCE_RULES_FILE 指向的 JSON 文件覆盖
+DEFAULT_RULES: Dict[str, Any] = {
+    # 扩展名 -> 资源类型（确定性规则，置信度最高）
+    "extensions": {
+        "unity-assets": [".unitypackage", ".unity"],
+        "software-tools": [".exe", ".msi", ".dmg", ".pkg", ".deb", ".rpm", ".appimage"],
+        "design-assets": [".psd", ".ai", ".sketch", ".fig", ".svg", ".xd"],
+        "video-courses": [".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv"],
+        "audio-resources": [".mp3", ".wav", ".flac", ".aac", ".m4a", ".ogg"],
+        "documents": [".pdf", ".epub", ".mobi", ".azw", ".azw3", ".doc", ".docx"],
+        "3d-models": [".fbx", ".obj", ".3ds", ".blend", ".max", ".c4d", ".gltf", ".glb"],
+        "archives": [".zip", ".rar", ".7z", ".tar", ".gz", ".tgz", ".tar.gz", ".bz2", ".xz"]
+    },
+    # 容器类扩展名：内容不确定，允许文件名关键词覆盖
+    "containers": [".zip", ".rar", ".7z", ".tar", ".gz", ".tgz", ".tar.gz", ".bz2", ".xz"],
+    # 关键词按完整词元匹配（支持多词短语），避免 "ui" 命中 "build" 之类的子串误判
+    "keywords": {
+        "unity-assets": ["unity", "unity3d", "urp", "hdrp", "asset store"],
+        "software-tools": ["setup", "installer", "portable", "crack", "keygen", "软件"],
+        "design-assets": ["ui", "ux", "ui kit", "mockup", "icons", "icon pack", "psd", "figma", "素材"],
+        "video-courses": ["course", "tutorial", "tutorials", "masterclass", "lesson", "lessons",
+                          "udemy", "教程", "课程"],
+        "audio-resources": ["sfx", "sound effects", "soundtrack", "music", "audio", "音效"],
+        "documents": ["ebook", "handbook", "guide", "manual", "电子书"],
+        "3d-models": ["3d model", "3d models", "low poly", "lowpoly", "fbx", "obj", "模型"]
+    },
+    # 文件头魔数：offset 为签名起始位置，signature 为十六进制字符串
+    "magic": [
+        {"type": "archives", "offset": 0, "signature": "504b0304"},
+        {"type": "archives", "offset": 0, "signature": "1f8b"},
+        {"type": "archives", "offset": 0, "signature": "377abcaf271c"},
+        {"type": "archives", "offset": 0, "signature": "526172211a07"},
+        {"type": "archives", "offset": 257, "signature": "7573746172"},
+        {"type": "documents", "offset": 0, "signature": "25504446"},
+        {"type": "design-assets", "offset": 0, "signature": "38425053"},
+        {"type": "video-courses", "offset": 4, "signature": "66747970"},
+        {"type": "video-courses", "offset": 0, "signature": "1a45dfa3"},
+        {"type": "audio-resources", "offset": 0, "signature": "494433"},
+        {"type": "audio-resources", "offset": 0, "signature": "664c6143"},
+        {"type": "audio-resources", "offset": 8, "signature": "57415645"},
+        {"type": "video-courses", "offset": 8, "signature": "41564920"},
+        {"type": "software-tools", "offset": 0, "signature": "4d5a"},
+        {"type": "3d-models", "offset": 0, "signature": "4b617964617261204642582042696e617279"},
+        {"type": "3d-models", "offset": 0, "signature": "676c5446"}
+    ]
+}
+
+# 置信度常量
+CONFIDENCE_EXTENSION = 0.95
+CONFIDENCE_MAGIC = 0.9
+CONFIDENCE_KEYWORD_IN_CONTAINER = 0.75
+CONFIDENCE_KEYWORD_ONLY = 0.6
+CONFIDENCE_CONTAINER = 0.5
+
+# 文件名词元：先按非字母边界粗分，仅对大小写混合的片段再做驼峰拆分
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+|[\u4e00-\u9fff]+")
+_CAMEL_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+[A-Za-z]?")
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+
+@dataclass(frozen=True)
+class Classification:
+    """分类结果"""
+    resource_type: str
+    confidence: float
+    source: str  # extension / keyword / container / magic / none
+
+
+class ResourceClassifier:
+    """编译式资源类型分类器"""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        rules = rules or DEFAULT_RULES
+        self._compile(rules)
+
+    @classmethod
+    def load(cls, rules_file: str = "") -> "ResourceClassifier":
+        """从规则文件加载分类器，文件中的字段覆盖默认规则"""
+        rules = dict(DEFAULT_RULES)
+        if rules_file and Path(rules_file).exists():
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                rules.update(json.load(f))
+        return cls(rules)
+
+    def _compile(self, rules: Dict[str, Any]):
+        """将规则编译为查找结构"""
+        self._containers = frozenset(ext.lower() for ext in rules.get("containers", []))
+
+        # 扩展名哈希表：预先构造结果对象，命中时零分配返回
+        self._extension_map: Dict[str, Classification] = {}
+        for resource_type, extensions in rules.get("extensions", {}).items():
+            for ext in extensions:
+                ext = ext.lower()
+                if ext in self._containers:
+                    confidence, source = CONFIDENCE_CONTAINER, "container"
+                else:
+                    confidence, source = CONFIDENCE_EXTENSION, "extension"
+                self._extension_map[ext] = Classification(resource_type, confidence, source)
+
+        # 关键词词元自动机（按词元的前缀树），中文关键词单独做子串匹配
+        self._keyword_trie: Dict[str, Any] = {}
+        self._cjk_keywords: List[Tuple[str, str]] = []
+        for resource_type, keywords in rules.get("keywords", {}).items():
+            for keyword in keywords:
+                if _CJK_PATTERN.search(keyword):
+                    self._cjk_keywords.append((keyword, resource_type))
+                    continue
+                node = self._keyword_trie
+                for token in keyword.lower().split():
+                    node = node.setdefault(token, {})
+                node[None] = resource_type
+
+        # 关键词命中结果预先构造：[无容器扩展名, 容器扩展名]
+        self._keyword_results: Dict[str, Tuple[Classification, Classification]] = {
+            resource_type: (
+                Classification(resource_type, CONFIDENCE_KEYWORD_ONLY, "keyword"),
+                Classification(resource_type, CONFIDENCE_KEYWORD_IN_CONTAINER, "keyword")
+            )
+            for resource_type in rules.get("keywords", {})
+        }
+        self._unknown = Classification("unknown", 0.0, "none")
+
+        # 魔数签名按 (offset, bytes) 编译
+        self._magic: List[Tuple[int, bytes, str]] = [
+            (int(rule.get("offset", 0)), bytes.fromhex(rule["signature"]), rule["type"])
+            for rule in rules.get("magic", [])
+        ]
+        self.sniff_length = max(
+            (offset + len(signature) for offset, signature, _ in self._magic), default=0
+        )
+
+    @staticmethod
+    def split_extension(filename: str) -> Tuple[str, str]:
+        """拆分文件名为 (主干, 扩展名)，识别 .tar.gz 这类双扩展名"""
+        lower = filename.lower()
+        if lower.endswith(".tar.gz"):
+            return filename[:-7], ".tar.gz"
+        dot = filename.rfind('.')
+        if dot <= 0:
+            return filename, ""
+        return filename[:dot], lower[dot:]
+
+    def classify(self, filename: str) -> Classification:
+        """根据文件名分类"""
+        stem, extension = self.split_extension(filename)
+
+        by_extension = self._extension_map.get(extension)
+        if by_extension is not None and by_extension.source == "extension":
+            return by_extension
+
+        keyword_type = self._match_keywords(stem)
+        if keyword_type:
+            return self._keyword_results[keyword_type][by_extension is not None]
+
+        if by_extension is not None:
+            return by_extension
+
+        return self._unknown
+
+    def _match_keywords(self, stem: str) -> Optional[str]:
+        """在文件名词元上运行关键词自动机，返回得分最高的类型"""
+        trie = self._keyword_trie
+        tokens = []
+        has_hit = False
+        has_cjk = False
+        for word in _WORD_PATTERN.findall(stem):
+            if word[0] >= '\u4e00':
+                has_cjk = True
+                continue
+            lower = word.lower()
+            if lower in trie or lower == word or word.isupper() or word[1:] == lower[1:]:
+                tokens.append(lower)
+                has_hit = has_hit or lower in trie
+            else:
+                for part in _CAMEL_PATTERN.findall(word):
+                    part = part.lower()
+                    tokens.append(part)
+                    has_hit = has_hit or part in trie
+
+        # 绝大多数文件名没有任何关键词，直接返回
+        if not has_hit and not has_cjk:
+            return None
+
+        scores: Dict[str, int] = {}
+        for start in range(len(tokens)):
+            node = trie.get(tokens[start])
+            position = start
+            while node is not None:
+                resource_type = node.get(None)
+                if resource_type:
+                    # 多词短语更具体，权重按匹配长度累加
+                    scores[resource_type] = scores.get(resource_type, 0) + position - start + 1
+                position += 1
+                if position >= len(tokens):
+                    break
+                node = node.get(tokens[position])
+
+        if has_cjk:
+            for keyword, resource_type in self._cjk_keywords:
+                if keyword in stem:
+                    scores[resource_type] = scores.get(resource_type, 0) + 1
+
+        if not scores:
+            return None
+        return max(scores, key=scores.get)
+
+    def sniff(self, header: bytes) -> Optional[str]:
+        """根据文件头魔数判断类型"""
+        for offset, signature, resource_type in self._magic:
+            if header[offset:offset + len(signature)] == signature:
+                return resource_type
+        return None
+
+    def refine_with_file(self, classification: Classification, file_path: str,
+                         sniff_bytes: int = 4096) -> Classification:
+        """读取文件头部，对低置信度的文件名分类结果进行校正"""
+        try:
+            with open(file_path, 'rb') as f:
+                header = f.read(max(sniff_bytes, self.sniff_length))
+        except OSError:
+            return classification
+
+        sniffed = self.sniff(header)
+        if not sniffed:
+            return classification
+
+        if sniffed == classification.resource_type:
+            return Classification(sniffed, max(classification.confidence, CONFIDENCE_MAGIC), "magic")
+
+        # 压缩包魔数只说明是容器，不推翻基于关键词的判断
+        if sniffed == "archives" and classification.source == "keyword":
+            return classification
+
+        if classification.confidence < CONFIDENCE_MAGIC:
+            return Classification(sniffed, CONFIDENCE_MAGIC, "magic")
+
+        return classification
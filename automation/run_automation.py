@@ -117,6 +117,7 @@ async def run_single_file_test():
             resource_type=test_file['resource_type'],
             max_images=3  # 减少数量以加快测试
         )
+        await image_manager.close()
 
         if images:
             print(f"✅ 图片下载成功: {len(images)} 张")
@@ -64,12 +64,19 @@ class SimpleDatabaseManager:
                 download_links TEXT,  -- JSON 字符串
                 image_urls TEXT,      -- JSON 字符串
                 tags TEXT,            -- JSON 字符串
+                media_info TEXT,      -- JSON 字符串，媒体文件头信息（时长、分辨率、页数等）
                 status TEXT DEFAULT 'draft',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
 
+        # 旧版本数据库补充新增的列
+        cursor.execute('PRAGMA table_info(resources)')
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'media_info' not in columns:
+            cursor.execute('ALTER TABLE resources ADD COLUMN media_info TEXT')
+
         # 分类表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS categories (
@@ -98,14 +105,16 @@ class SimpleDatabaseManager:
             download_links_json = json.dumps(resource_data.get('download_links', []))
             image_urls_json = json.dumps(resource_data.get('image_urls', []))
             tags_json = json.dumps(resource_data.get('tags', []))
+            media_info = resource_data.get('media_info')
+            media_info_json = json.dumps(media_info, ensure_ascii=False) if media_info else None
 
             cursor.execute('''
                 INSERT INTO resources (
                     title, title_en, description, meta_description,
                     resource_type, file_size, file_format,
-                    download_links, image_urls, tags, status,
+                    download_links, image_urls, tags, media_info, status,
                     created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 resource_data.get('title'),
                 resource_data.get('title_en'),
@@ -117,6 +126,7 @@ class SimpleDatabaseManager:
                 download_links_json,
                 image_urls_json,
                 tags_json,
+                media_info_json,
                 resource_data.get('status', 'published'),
                 datetime.now(),
                 datetime.now()
@@ -174,7 +184,7 @@ class SimpleDatabaseManager:
             values = []
 
             for key, value in updates.items():
-                if key in ['download_links', 'image_urls', 'tags']:
+                if key in ['download_links', 'image_urls', 'tags', 'media_info']:
                     # JSON 字段需要序列化
                     set_clauses.append(f"{key} = ?")
                     values.append(json.dumps(value))
@@ -369,6 +379,12 @@ class SimpleDatabaseManager:
             else:
                 result[field] = []
 
+        if result.get('media_info'):
+            try:
+                result['media_info'] = json.loads(result['media_info'])
+            except json.JSONDecodeError:
+                result['media_info'] = None
+
         return result
 
     async def backup_database(self, backup_path: str) -> bool:
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+ResLibs 流式中转
+将百度网盘下载流通过有界内存缓冲直接分发给多个上传流，不落盘
+"""
+
+import queue
+import threading
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+# 队列结束标记
+_END_OF_STREAM = object()
+
+
+class StreamRelayError(Exception):
+    """数据源读取失败时传递给消费者的异常"""
+
+
+class FanoutReader:
+    """单个消费者的读取端，按顺序迭代数据块"""
+
+    def __init__(self, index: int, max_buffered_chunks: int):
+        self.index = index
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_buffered_chunks)
+        self.detached = threading.Event()
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            item = self.queue.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, BaseException):
+                raise StreamRelayError(f"数据源读取失败: {item}") from item
+            yield item
+
+    def close(self):
+        """消费者退出（完成或失败），不再接收数据"""
+        self.detached.set()
+        # 清空缓冲，唤醒可能阻塞在 put 上的生产者
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class StreamFanout:
+    """
+    单生产者多消费者的流分发器
+
+    生产者每读取一个数据块就放入所有仍在消费的读取端队列，队列满时阻塞，
+    因此整体速度受最慢的上传流约束（背压），内存占用上限为
+    消费者数量 × max_buffered_chunks × 数据块大小。
+    """
+
+    def __init__(self, source: Iterable[bytes], consumers: int, max_buffered_chunks: int = 16):
+        self._source = source
+        self.readers: List[FanoutReader] = [
+            FanoutReader(index, max_buffered_chunks) for index in range(consumers)
+        ]
+        self.bytes_relayed = 0
+
+    def run(self):
+        """生产者主循环（阻塞，应在线程池中执行）"""
+        try:
+            for chunk in self._source:
+                if not chunk:
+                    continue
+                if not self._publish(chunk):
+                    # 所有消费者都已退出，不必继续读取数据源
+                    break
+                self.bytes_relayed += len(chunk)
+        except Exception as e:
+            self._publish(e)
+            return
+        finally:
+            close = getattr(self._source, 'close', None)
+            if close:
+                close()
+
+        self._publish(_END_OF_STREAM)
+
+    def _publish(self, item) -> bool:
+        """将数据块放入所有活跃队列，返回是否仍有活跃消费者"""
+        active = False
+        for reader in self.readers:
+            while not reader.detached.is_set():
+                try:
+                    reader.queue.put(item, timeout=0.5)
+                    active = True
+                    break
+                except queue.Full:
+                    continue
+        return active
+
+
+class MultipartStreamBody:
+    """
+    流式 multipart/form-data 请求体
+
+    实现 __len__ 使 requests 设置准确的 Content-Length，
+    实现 __iter__ 使请求体按块发送而不是整体载入内存。
+    """
+
+    def __init__(
+        self,
+        field_name: str,
+        filename: str,
+        chunks: Iterable[bytes],
+        size: int,
+        fields: Optional[Dict[str, str]] = None
+    ):
+        self.boundary = uuid.uuid4().hex
+        self._chunks = chunks
+        self._size = size
+
+        preamble = []
+        for name, value in (fields or {}).items():
+            preamble.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        preamble.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        )
+        self._preamble = "".join(preamble).encode('utf-8')
+        self._epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self._preamble) + self._size + len(self._epilogue)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._preamble
+        for chunk in self._chunks:
+            yield chunk
+        yield self._epilogue
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+ResLibs LLM 输出 JSON 处理测试
+验证流式结构监视器与 extract_json 对同一段输出的判断一致
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from automation.llm_json import MalformedStreamError, StreamingJsonMonitor, extract_json
+
+
+def test_preamble_bracket_does_not_abort_object_stream():
+    """说明文字中的 [ 不应被当作顶层结构"""
+    text = 'Per spec [v2], here you go: {"title": "x"}'
+
+    monitor = StreamingJsonMonitor('{')
+    assert monitor.feed(text) is True
+    assert monitor.finish() == '{"title": "x"}'
+    assert extract_json(text, '{') == {"title": "x"}
+
+
+def test_preamble_bracket_split_across_chunks():
+    """分段到达时同样跳过说明文字中的括号"""
+    monitor = StreamingJsonMonitor('{')
+    assert monitor.feed('Per spec [v') is False
+    assert monitor.feed('2], here: {"title": ') is False
+    assert monitor.feed('"x"} trailing') is True
+    assert monitor.finish() == '{"title": "x"}'
+
+
+def test_mismatched_bracket_still_aborts():
+    """JSON 开始后的括号不匹配仍然立即中止"""
+    monitor = StreamingJsonMonitor('{')
+    with pytest.raises(MalformedStreamError):
+        monitor.feed('{"title": "x"]')
+
+
+def test_truncated_stream_raises_on_finish():
+    """未闭合的输出在结束时报告截断"""
+    monitor = StreamingJsonMonitor('{')
+    monitor.feed('{"title": "x", "tags": ["a"')
+    with pytest.raises(MalformedStreamError):
+        monitor.finish()
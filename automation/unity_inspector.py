@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+ResLibs Unity 资源包检查器
+.unitypackage 是按 GUID 分目录的 gzip tar，每个目录含 pathname、asset、asset.meta 和可选的 preview.png。
+顺序流式读取一遍，只读取小文件（pathname、版本文件），asset 数据直接跳过，内存占用恒定
+"""
+
+import os
+import re
+import heapq
+import tarfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+
+from automation.archive_inspector import PREVIEW_MAX_BYTES, preview_prefix
+
+
+# 只读取不超过该大小的 asset，用于查找版本信息
+VERSION_HINT_MAX_BYTES = 16 * 1024
+
+# 版本信息来源，按可信度排序
+_VERSION_SOURCES = ("ProjectSettings/ProjectVersion.txt", "package.json", "packagemanagermanifest")
+
+_EDITOR_VERSION_PATTERN = re.compile(rb"m_EditorVersion:\s*([0-9][0-9A-Za-z.]*)")
+_PACKAGE_UNITY_PATTERN = re.compile(rb'"unity"\s*:\s*"([0-9]{4}\.[0-9]+)"')
+_PACKAGE_RELEASE_PATTERN = re.compile(rb'"unityRelease"\s*:\s*"([0-9A-Za-z.]+)"')
+
+
+@dataclass
+class UnityPackageInfo:
+    """Unity 资源包内容概要"""
+    asset_paths: List[str] = field(default_factory=list)
+    asset_sizes: List[int] = field(default_factory=list)  # 与 asset_paths 一一对应
+    extension_counts: Dict[str, int] = field(default_factory=dict)
+    unity_version: str = ""
+    total_asset_bytes: int = 0
+    folder_count: int = 0
+    preview_count: int = 0
+    preview_images: List[str] = field(default_factory=list)  # 已保存的预览图路径，按大小降序
+
+    @property
+    def assets_count(self) -> int:
+        return len(self.asset_paths)
+
+    def top_folders(self, limit: int = 10) -> List[str]:
+        """资源数最多的二级目录（Assets/ 下一层）"""
+        counts: Dict[str, int] = {}
+        for path in self.asset_paths:
+            parts = path.split("/")
+            if len(parts) > 2:
+                key = "/".join(parts[:2])
+                counts[key] = counts.get(key, 0) + 1
+        return [folder for folder, _ in sorted(counts.items(), key=lambda item: -item[1])[:limit]]
+
+    def to_metadata(self, max_paths: int = 50) -> Dict[str, Any]:
+        """转换为元数据字典"""
+        return {
+            "package_type": "unitypackage",
+            "unity_version": self.unity_version or "unknown",
+            "assets_count": self.assets_count,
+            "folder_count": self.folder_count,
+            "preview_count": self.preview_count,
+            "total_asset_bytes": self.total_asset_bytes,
+            "extension_counts": dict(
+                sorted(self.extension_counts.items(), key=lambda item: -item[1])
+            ),
+            "top_folders": self.top_folders(),
+            "asset_paths": self.asset_paths[:max_paths]
+        }
+
+
+def inspect_unitypackage(
+    path: str,
+    preview_dir: Optional[str] = None,
+    max_previews: int = 5
+) -> UnityPackageInfo:
+    """
+    流式解析 .unitypackage（阻塞调用，应在线程池中执行）
+
+    tar 中同一 GUID 的 pathname 可能出现在 asset 之后，因此先按 GUID 记录大小和版本线索，
+    读取结束后再与路径对应。指定 preview_dir 时在同一遍读取中保留最大的几张 preview.png。
+    """
+    pathnames: Dict[str, str] = {}
+    asset_sizes: Dict[str, int] = {}
+    version_hints: Dict[str, str] = {}
+    previews = 0
+    kept_previews: List[tuple] = []  # (大小, GUID, 内容) 小顶堆
+
+    with tarfile.open(path, mode="r|gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            guid, _, leaf = member.name.lstrip("./").partition("/")
+            if not guid or not leaf:
+                continue
+
+            if leaf == "pathname":
+                pathnames[guid] = _read_pathname(archive, member)
+            elif leaf == "asset":
+                asset_sizes[guid] = member.size
+                if member.size <= VERSION_HINT_MAX_BYTES:
+                    hint = _version_hint(archive.extractfile(member).read())
+                    if hint:
+                        version_hints[guid] = hint
+            elif leaf == "preview.png":
+                previews += 1
+                if preview_dir and max_previews > 0 and member.size <= PREVIEW_MAX_BYTES:
+                    if len(kept_previews) < max_previews or member.size > kept_previews[0][0]:
+                        item = (member.size, guid, archive.extractfile(member).read())
+                        if len(kept_previews) < max_previews:
+                            heapq.heappush(kept_previews, item)
+                        else:
+                            heapq.heapreplace(kept_previews, item)
+            # 其余成员（含大于阈值的 asset）不读取，迭代到下一个成员时流式跳过
+
+    info = UnityPackageInfo(preview_count=previews)
+    for guid, pathname in sorted(pathnames.items(), key=lambda item: item[1]):
+        size = asset_sizes.get(guid)
+        if size is None:
+            # 只有 pathname 没有 asset 的是文件夹
+            info.folder_count += 1
+            continue
+        info.asset_paths.append(pathname)
+        info.asset_sizes.append(size)
+        info.total_asset_bytes += size
+        extension = os.path.splitext(pathname)[1].lower() or "(无扩展名)"
+        info.extension_counts[extension] = info.extension_counts.get(extension, 0) + 1
+
+    info.unity_version = _resolve_version(pathnames, version_hints)
+    if kept_previews:
+        info.preview_images = _save_previews(path, preview_dir, kept_previews)
+    return info
+
+
+def _save_previews(path: str, preview_dir: str, kept_previews: List[tuple]) -> List[str]:
+    """把保留的预览图写入目录，按大小降序"""
+    output_dir = Path(preview_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefix = preview_prefix(path)
+
+    saved = []
+    for index, (_, _, content) in enumerate(sorted(kept_previews, reverse=True), 1):
+        target = output_dir / f"{prefix}_preview_{index}.png"
+        target.write_bytes(content)
+        saved.append(str(target))
+    return saved
+
+
+def _read_pathname(archive: tarfile.TarFile, member: tarfile.TarInfo) -> str:
+    """pathname 文件第一行是资源路径，第二行可能是旧版本写入的 00"""
+    raw = archive.extractfile(member).read(4096)
+    return raw.decode("utf-8", errors="replace").splitlines()[0].strip() if raw.strip() else ""
+
+
+def _version_hint(data: bytes) -> Optional[str]:
+    """从小文件内容中提取 Unity 版本号"""
+    match = _EDITOR_VERSION_PATTERN.search(data)
+    if match:
+        return match.group(1).decode("ascii")
+
+    match = _PACKAGE_UNITY_PATTERN.search(data)
+    if match:
+        version = match.group(1).decode("ascii")
+        release = _PACKAGE_RELEASE_PATTERN.search(data)
+        return f"{version}.{release.group(1).decode('ascii')}" if release else version
+    return None
+
+
+def _resolve_version(pathnames: Dict[str, str], version_hints: Dict[str, str]) -> str:
+    """按来源可信度选择版本线索，无法对应路径的线索不采用"""
+    best_rank = len(_VERSION_SOURCES)
+    best = ""
+    for guid, hint in version_hints.items():
+        pathname = pathnames.get(guid, "") or guid
+        for rank, source in enumerate(_VERSION_SOURCES):
+            if pathname.endswith(source) and rank < best_rank:
+                best_rank, best = rank, hint
+    return best
+
+
+def describe_unity_info(unity_info: Dict[str, Any], max_extensions: int = 8) -> Dict[str, str]:
+    """把 Unity 包概要整理为提示中的内容结构和技术规格描述"""
+    if not unity_info.get("assets_count"):
+        return {}
+
+    extensions = list(unity_info.get("extension_counts", {}).items())[:max_extensions]
+    structure = f"Unity 资源包，共 {unity_info['assets_count']} 个资源"
+    if extensions:
+        structure += "（" + "、".join(f"{ext} {count} 个" for ext, count in extensions) + "）"
+    folders = unity_info.get("top_folders") or []
+    if folders:
+        structure += "；主要目录: " + ", ".join(folders)
+
+    specs = []
+    version = unity_info.get("unity_version", "unknown")
+    if version != "unknown":
+        specs.append(f"Unity 版本: {version}")
+    specs.append(f"资源总大小: {unity_info.get('total_asset_bytes', 0) / (1024 * 1024):.1f} MB")
+
+    return {"content_structure": structure, "technical_specs": "，".join(specs)}
+